@@ -0,0 +1,82 @@
+"""
+매수 목표가 인덱스 (실시간 틱 판정용)
+- 종목 → 슬롯 번호, 슬롯별 목표가 3개(0.5x/1x/2x)를 연속 배열에 저장
+- 당일 이미 발생한 레벨은 비트마스크로 기록해 같은 레벨을 다시 판정하지 않음
+"""
+
+from array import array
+from datetime import date
+from typing import Dict, List
+
+LEVELS = ('05x', '1x', '2x')  # 목표가 내림차순 (0.5x > 1x > 2x)
+
+
+class ThresholdIndex:
+    """종목별 매수 목표가 배열"""
+
+    def __init__(self, target_prices: Dict[str, dict]):
+        """
+        Args:
+            target_prices: {ticker: {'05x': 가격, '1x': 가격, '2x': 가격, ...}}
+        """
+        self.slots = {}
+        self.thresholds = array('d')
+        for ticker, targets in target_prices.items():
+            self.slots[ticker] = len(self.slots)
+            self.thresholds.extend(targets[level] for level in LEVELS)
+
+        self.fired = bytearray(len(self.slots))  # 슬롯별 발생 레벨 비트마스크
+        self.fired_date = date.today()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def set_targets(self, ticker: str, targets: dict):
+        """
+        종목 목표가 교체 (새 거래일 목표가, 발생 기록도 초기화)
+
+        Args:
+            targets: {'05x': 가격, '1x': 가격, '2x': 가격} (None이면 판정하지 않음)
+        """
+        slot = self.slots.get(ticker)
+        if slot is None:
+            return
+        base = slot * 3
+        for i, level in enumerate(LEVELS):
+            self.thresholds[base + i] = targets[level] if targets else float('-inf')
+        self.fired[slot] = 0
+
+    def crossed(self, ticker: str, price: float, today: date = None) -> List[str]:
+        """
+        현재가로 새로 도달한 레벨 반환 (대부분의 틱은 비교 1회로 종료)
+
+        Args:
+            today: 기준 날짜 (기본값: 오늘, 과거 데이터 재생 시 해당 거래일)
+
+        Returns:
+            새로 도달한 레벨 리스트 (예: ['05x', '1x'])
+        """
+        slot = self.slots.get(ticker)
+        if slot is None:
+            return []
+
+        base = slot * 3
+        if price > self.thresholds[base]:  # 0.5x 목표가 위
+            return []
+
+        # 날짜가 바뀌면 발생 기록 초기화
+        today = today or date.today()
+        if today != self.fired_date:
+            self.fired = bytearray(len(self.slots))
+            self.fired_date = today
+
+        mask = self.fired[slot]
+        levels = []
+        for i, level in enumerate(LEVELS):
+            bit = 1 << i
+            if price <= self.thresholds[base + i] and not mask & bit:
+                mask |= bit
+                levels.append(level)
+
+        self.fired[slot] = mask
+        return levels
@@ -0,0 +1,172 @@
+"""
+알림 발송 큐 워커 (at-least-once)
+- 알림은 먼저 alert_outbox 테이블에 pending으로 기록 (실시간 틱 처리는 네트워크를 기다리지 않음)
+- 백그라운드 스레드가 주기적으로(또는 깨우면 묶음 창만큼 기다린 뒤) 모아서 발송
+- 같은 토픽 알림은 한 메시지로 병합, 성공 시 sent / 실패 시 지수 백오프로 재시도
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from database import StockDatabase, current_db_path
+from log_utils import log_debug
+from ntfy_alert import MAX_PARALLEL, merge_payloads, post_payload
+
+POLL_INTERVAL = float(os.environ.get('ALERT_OUTBOX_POLL_SECONDS', '2'))
+COALESCE_SECONDS = float(os.environ.get('NTFY_COALESCE_SECONDS', '2'))  # 깨운 뒤 토픽별 묶음 창 (초)
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 5      # 5s, 10s, 20s, ... (최대 RETRY_MAX_SECONDS)
+RETRY_MAX_SECONDS = 600
+LEASE_SECONDS = 60          # 가져간 알림을 다른 워커가 다시 가져가지 않는 시간
+
+
+def retry_delay(attempts: int) -> float:
+    """재시도 대기 시간 (attempts: 지금까지 실패 횟수)"""
+    return min(RETRY_BASE_SECONDS * (2 ** attempts), RETRY_MAX_SECONDS)
+
+
+class OutboxWorker:
+    """알림 발송 큐 워커"""
+
+    def __init__(self, db_path: str = None,
+                 poll_interval: float = POLL_INTERVAL, batch_size: int = BATCH_SIZE,
+                 max_parallel: int = MAX_PARALLEL, coalesce_seconds: float = COALESCE_SECONDS):
+        # 알림을 등록한 DB와 같은 파일 (없으면 프로세스에서 초기화한 DB)
+        self.db_path = db_path or current_db_path()
+        self.poll_interval = poll_interval
+        self.coalesce_seconds = coalesce_seconds
+        self.batch_size = batch_size
+
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='outbox-send')
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._idle = threading.Event()
+        self._thread = None
+
+        self.sent = 0      # 발송 성공 알림 수
+        self.retried = 0   # 재시도 예약 알림 수
+        self.failed = 0    # 재시도 한도 초과 알림 수
+
+    def start(self):
+        """워커 스레드 시작"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='alert-outbox', daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        """새 알림 등록 알림 (다음 주기를 기다리지 않고 묶음 창이 지나면 발송)"""
+        with self._lock:
+            self._idle.clear()
+            self._wakeup.set()
+
+    def _run(self):
+        # 워커 스레드 전용 연결 (Peewee 연결은 스레드별)
+        db = StockDatabase(self.db_path)
+        try:
+            # 첫 알림 등록으로 시작된 경우에도 같은 묶음 창 적용
+            self._stopping.wait(self.coalesce_seconds)
+            while not self._stopping.is_set():
+                self._wakeup.clear()
+                try:
+                    delivered = self.deliver_batch(db)
+                except Exception as e:
+                    print(f"❌ 알림 큐 처리 오류: {e}")
+                    delivered = 0
+
+                # 한 배치를 꽉 채웠으면 남은 알림이 있을 수 있으므로 바로 다음 배치
+                if delivered < self.batch_size:
+                    with self._lock:
+                        if not self._wakeup.is_set():
+                            self._idle.set()
+                    if self._wakeup.wait(self.poll_interval):
+                        # 깨운 직후 바로 가져가지 않고 묶음 창만큼 대기
+                        # (05x/1x/2x처럼 연달아 등록되는 알림을 토픽별 한 메시지로 병합)
+                        self._stopping.wait(self.coalesce_seconds)
+        finally:
+            self._idle.set()
+            db.close()
+
+    def deliver_batch(self, db: StockDatabase) -> int:
+        """
+        발송 대기 알림 한 배치 발송
+
+        Returns:
+            가져온 알림 수
+        """
+        rows = db.claim_outbox_batch(self.batch_size, LEASE_SECONDS)
+        if not rows:
+            return 0
+
+        # (서버, 토픽)별로 묶어서 한 메시지로 발송
+        groups = {}
+        for row in rows:
+            groups.setdefault((row['server'], row['topic']), []).append(row)
+
+        futures = {
+            key: self._executor.submit(post_payload, key[0],
+                                       merge_payloads([row['payload'] for row in group]))
+            for key, group in groups.items()
+        }
+
+        for key, future in futures.items():
+            group = groups[key]
+            ids = [row['id'] for row in group]
+            if future.result():
+                db.complete_outbox(ids)
+                self.sent += len(ids)
+            else:
+                # 같은 그룹이라도 실패 횟수가 다를 수 있으므로 최대값 기준으로 대기
+                attempts = max(row['attempts'] for row in group)
+                failed = db.retry_outbox(ids, retry_delay(attempts),
+                                         f"{key[0]}/{key[1]} 발송 실패", MAX_ATTEMPTS)
+                self.retried += len(ids) - failed
+                self.failed += failed
+                if failed:
+                    print(f"❌ 알림 {failed}건 재시도 한도 초과 ({key[1]})")
+
+        log_debug(f"📮 알림 큐 {len(rows)}건 처리 ({len(groups)}개 메시지)")
+        return len(rows)
+
+    def drain(self, timeout: float = 30) -> bool:
+        """현재 발송 가능한 알림을 모두 처리할 때까지 대기 (재시도 대기 중인 알림은 제외)"""
+        self.wake()
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float = 30):
+        """남은 알림 처리 후 종료 (미발송 알림은 DB에 남아 다음 실행 시 발송)"""
+        if self._thread is None:
+            return
+        self.drain(timeout)
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+        self._thread = None
+        if self.sent or self.retried or self.failed:
+            print(f"📮 알림 큐: 발송 {self.sent}건, 재시도 {self.retried}건, 실패 {self.failed}건")
+
+
+_worker: Optional[OutboxWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_outbox_worker(db_path: str = None) -> OutboxWorker:
+    """
+    프로세스 공용 워커 (처음 호출 시 시작, 종료 시 남은 알림 발송)
+
+    Args:
+        db_path: 알림 큐 DB 경로 (없으면 프로세스에서 초기화한 DB)
+    """
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = OutboxWorker(db_path).start()
+                atexit.register(_worker.close)
+    return _worker
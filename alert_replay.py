@@ -0,0 +1,274 @@
+"""
+저장된 분봉으로 알림 판정 재생 (로컬 DB만 사용)
+- minute_prices를 여러 종목/기간에 걸쳐 시각 순으로 스트리밍
+- 거래일별 목표가: daily_prices의 전일 종가 + 전일까지의 롤링 표준편차
+  (RollingVolatility와 같은 계산: % 수익률, 표본 표준편차, 252일 창)
+- 판정: 실시간 모니터와 같은 ThresholdIndex (0.5x/1x/2x, 종목·거래일별 레벨당 1회)
+- 결과: 알림 건수, 레벨별 최초 도달 시각(장 시작 후 경과 분), 슬리피지 (도달 분봉 가격 - 목표가)
+
+사용법:
+    python alert_replay.py --start 2024-01-01 --end 2024-03-31
+    python alert_replay.py --start 2024-01-01 --end 2024-03-31 -t 005930 AAPL --csv replay.csv
+"""
+
+import argparse
+import csv
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from alert_index import LEVELS, ThresholdIndex
+from database import StockDatabase
+from minute_archive import archived_tickers, merge_archived_bars
+from rolling_volatility import DEFAULT_WINDOW, MIN_RETURNS
+
+SIGMAS = {'05x': 0.5, '1x': 1.0, '2x': 2.0}
+US_SESSION_SHIFT = timedelta(hours=12)  # 미국장(한국시간 22:30~07:00) → 미국 거래일
+
+# 종목 목록 × 기간 분봉 (종목별 (ticker, datetime) 인덱스 범위 조회 후 시각 순 정렬)
+MINUTE_BARS_SQL = '''
+    WITH t AS (SELECT value AS ticker FROM json_each(?))
+    SELECT mp.ticker, mp.datetime, mp.market_date, mp.price
+    FROM minute_prices mp
+    JOIN t ON mp.ticker = t.ticker
+    WHERE mp.datetime >= ? AND mp.datetime < ? AND mp.price IS NOT NULL
+    ORDER BY mp.datetime, mp.ticker
+'''
+
+# DB에 분봉이 남아 있는 종목 (종목별 인덱스 조회)
+MINUTE_TICKERS_SQL = '''
+    SELECT symbol FROM tickers
+    WHERE EXISTS (SELECT 1 FROM minute_prices WHERE ticker = tickers.symbol)
+'''
+
+
+def guess_country(ticker: str) -> str:
+    """종목 코드로 국가 추정 (숫자로 시작하면 한국)"""
+    return 'KR' if ticker[:1].isdigit() else 'US'
+
+
+class DailyTargets:
+    """종목별 거래일 목표가 (전일 종가 + 전일까지의 표준편차)"""
+
+    def __init__(self, db: StockDatabase, tickers: List[str], start_date: str, end_date: str,
+                 window: int = DEFAULT_WINDOW):
+        # 표준편차 창만큼 앞선 일봉부터 로드 (거래일 252일 ≈ 달력 365일)
+        load_from = (datetime.strptime(start_date, '%Y-%m-%d')
+                     - timedelta(days=int(window * 1.5) + 30)).strftime('%Y-%m-%d')
+        prices = db.load_daily_prices_columnar(tickers, start_date=load_from, end_date=end_date)
+
+        self._series = {}
+        for ticker in tickers:
+            close = prices.view(ticker, 'close')
+            if len(close) < 2:
+                continue
+            returns = np.diff(close) / close[:-1] * 100
+            std = (pd.Series(returns)
+                   .rolling(window=window, min_periods=MIN_RETURNS)
+                   .std()
+                   .to_numpy())
+            # std[i]: close[i + 1]까지의 표준편차 → 종가 위치에 맞춤
+            self._series[ticker] = (prices.view(ticker, 'date'), close,
+                                    np.concatenate([[np.nan], std]))
+
+    def get(self, ticker: str, market_day: str) -> Optional[Dict]:
+        """
+        해당 거래일 목표가 (analyze_daily_volatility 결과와 같은 키, 데이터 부족 시 None)
+        """
+        series = self._series.get(ticker)
+        if series is None:
+            return None
+
+        dates, close, std = series
+        i = int(np.searchsorted(dates, int(market_day.replace('-', '')), side='left')) - 1
+        if i < 0 or np.isnan(std[i]):
+            return None
+
+        prev_close = float(close[i])
+        targets = {'prev_close': prev_close}
+        for level, sigma in SIGMAS.items():
+            drop = float(std[i]) * sigma
+            targets[f'drop_{level}'] = drop
+            targets[level] = prev_close * (1 - drop / 100)
+        return targets
+
+
+def market_day(ticker: str, dt_str: str, market_date: Optional[str]) -> str:
+    """분봉의 거래일 (market_date 우선, 없으면 미국장은 12시간 당겨 계산)"""
+    if market_date:
+        return str(market_date)[:10]
+    if guess_country(ticker) == 'US':
+        return (datetime.fromisoformat(str(dt_str)[:19]) - US_SESSION_SHIFT).strftime('%Y-%m-%d')
+    return str(dt_str)[:10]
+
+
+def iter_minute_bars(db: StockDatabase, tickers: List[str], start_date: str,
+                     end_date: str) -> Iterator[tuple]:
+    """
+    분봉을 시각 순으로 스트리밍 (전체를 메모리에 올리지 않음)
+    - 보관 파일(minute_archive)로 옮겨진 분봉도 DB 분봉과 병합
+
+    Yields:
+        (ticker, datetime 문자열, market_date, price)
+    """
+    start = f"{start_date} 00:00:00"
+    # 미국장은 다음날 오전까지 이어지므로 하루 더 조회 후 거래일로 거름
+    end = f"{(datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=2)).strftime('%Y-%m-%d')} 00:00:00"
+
+    cursor = db.connect().execute(MINUTE_BARS_SQL, (json.dumps(tickers), start, end))
+    yield from merge_archived_bars(tickers, start, end, cursor)
+
+
+def replay_alerts(tickers: List[str] = None, start_date: str = None, end_date: str = None,
+                  window: int = DEFAULT_WINDOW, db: StockDatabase = None) -> Dict:
+    """
+    분봉 재생으로 알림 판정
+
+    Args:
+        tickers: 종목 리스트 (None이면 DB 또는 보관 파일에 분봉이 있는 전체 종목)
+        start_date, end_date: 거래일 범위 (YYYY-MM-DD, 포함)
+
+    Returns:
+        {'alerts': [{'ticker', 'market_day', 'level', 'time', 'minutes_from_open', 'price',
+                     'target', 'prev_close', 'drop', 'slippage', 'slippage_pct'}, ...],
+         'bars': 재생한 분봉 수, 'ticker_days': 종목·거래일 수,
+         'no_target_days': 목표가를 계산하지 못한 종목·거래일 수}
+    """
+    own_db = db is None
+    db = db or StockDatabase()
+    try:
+        if tickers is None:
+            hot = {row[0] for row in db.connect().execute(MINUTE_TICKERS_SQL)}
+            tickers = sorted(hot.union(archived_tickers()))
+        end_date = end_date or date.today().isoformat()
+        start_date = start_date or end_date
+
+        daily = DailyTargets(db, tickers, start_date, end_date, window)
+        index = ThresholdIndex({ticker: dict.fromkeys(LEVELS, float('-inf')) for ticker in tickers})
+        current_day = {}   # {ticker: 거래일}
+        current = {}       # {ticker: 목표가}
+        session_start = {}  # {ticker: 거래일 첫 분봉 시각}
+        alerts = []
+        bars = 0
+        ticker_days = 0
+        no_target_days = 0
+
+        for ticker, dt_str, mdate, price in iter_minute_bars(db, tickers, start_date, end_date):
+            day = market_day(ticker, dt_str, mdate)
+            if day < start_date or day > end_date:
+                continue
+            bars += 1
+
+            # 종목별 새 거래일: 목표가 교체 + 발생 기록 초기화
+            if current_day.get(ticker) != day:
+                current_day[ticker] = day
+                session_start[ticker] = datetime.fromisoformat(str(dt_str)[:19])
+                current[ticker] = daily.get(ticker, day)
+                index.set_targets(ticker, current[ticker])
+                ticker_days += 1
+                if current[ticker] is None:
+                    no_target_days += 1
+
+            levels = index.crossed(ticker, price, today=date.fromisoformat(day))
+            if not levels:
+                continue
+
+            targets = current[ticker]
+            elapsed = (datetime.fromisoformat(str(dt_str)[:19])
+                       - session_start[ticker]).total_seconds() / 60
+            for level in levels:
+                target = targets[level]
+                alerts.append({
+                    'ticker': ticker,
+                    'market_day': day,
+                    'level': level,
+                    'time': str(dt_str)[:19],
+                    'minutes_from_open': elapsed,
+                    'price': price,
+                    'target': target,
+                    'prev_close': targets['prev_close'],
+                    'drop': targets[f'drop_{level}'],
+                    'slippage': price - target,
+                    'slippage_pct': (price - target) / target * 100,
+                })
+
+        return {
+            'alerts': alerts,
+            'bars': bars,
+            'ticker_days': ticker_days,
+            'no_target_days': no_target_days,
+        }
+    finally:
+        if own_db:
+            db.close()
+
+
+def summarize(result: Dict) -> pd.DataFrame:
+    """레벨별 알림 건수 / 평균·최악 슬리피지 / 도달 시점 (장 시작 후 경과 분)"""
+    alerts = pd.DataFrame(result['alerts'])
+    if alerts.empty:
+        return pd.DataFrame(columns=['alerts', 'tickers', 'avg_slippage_pct',
+                                     'worst_slippage_pct', 'median_minutes', 'first_minutes'])
+
+    summary = alerts.groupby('level').agg(
+        alerts=('ticker', 'size'),
+        tickers=('ticker', 'nunique'),
+        avg_slippage_pct=('slippage_pct', 'mean'),
+        worst_slippage_pct=('slippage_pct', 'min'),
+        median_minutes=('minutes_from_open', 'median'),
+        first_minutes=('minutes_from_open', 'min'),
+    )
+    return summary.reindex([level for level in LEVELS if level in summary.index])
+
+
+def print_report(result: Dict):
+    """재생 결과 출력"""
+    print(f"\n{'='*60}")
+    print(f"📊 알림 재생: 분봉 {result['bars']:,}건, 종목·거래일 {result['ticker_days']:,}개 "
+          f"(목표가 없음 {result['no_target_days']:,}개)")
+    print(f"{'='*60}")
+
+    summary = summarize(result)
+    if summary.empty:
+        print("\n   ❌ 목표가 도달 없음")
+        return
+
+    level_names = {'05x': '테스트(0.5σ)', '1x': '1차(1σ)', '2x': '2차(2σ)'}
+    for level, row in summary.to_dict('index').items():
+        print(f"\n   🔔 {level_names[level]}: {row['alerts']:,}건 ({row['tickers']}개 종목)")
+        print(f"      슬리피지: 평균 {row['avg_slippage_pct']:+.3f}%, 최악 {row['worst_slippage_pct']:+.3f}%")
+        print(f"      도달 시점: 장 시작 후 중앙값 {row['median_minutes']:.0f}분 (최단 {row['first_minutes']:.0f}분)")
+
+
+def save_csv(result: Dict, path: str):
+    """알림 목록 CSV 저장"""
+    fields = ['ticker', 'market_day', 'level', 'time', 'minutes_from_open', 'price', 'target',
+              'prev_close', 'drop', 'slippage', 'slippage_pct']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(result['alerts'])
+    print(f"\n💾 알림 {len(result['alerts']):,}건 저장: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='저장된 분봉으로 알림 판정 재생')
+    parser.add_argument('--start', '-s', required=True, help='시작 거래일 (YYYY-MM-DD)')
+    parser.add_argument('--end', '-e', help='종료 거래일 (YYYY-MM-DD, 기본값: 시작일)')
+    parser.add_argument('--tickers', '-t', nargs='+', help='종목 코드 (기본값: 전체)')
+    parser.add_argument('--window', '-w', type=int, default=DEFAULT_WINDOW, help='표준편차 계산 기간')
+    parser.add_argument('--csv', help='알림 목록 CSV 저장 경로')
+
+    args = parser.parse_args()
+
+    result = replay_alerts(args.tickers, args.start, args.end or args.start, args.window)
+    print_report(result)
+    if args.csv:
+        save_csv(result, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+웹 분석 결과 캐시 (프로세스 내 TTL 캐시)
+- 키: (종류, 종목, 시장 기준일) → 새 거래일이 시작되면 자동으로 새 키
+- TTL: 장중 ANALYSIS_CACHE_TTL초, 장 마감 후에는 다음 개장까지
+- 같은 키 동시 요청은 한 번만 계산하고 나머지는 결과를 기다림 (single-flight)
+- 목표가 요약은 statistics_cache 테이블에도 저장/조회 (ANALYSIS_CACHE_SQLITE=false로 끔)
+"""
+
+import os
+import threading
+import time as _time
+from concurrent.futures import Future
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, Optional
+
+from database import StockDatabase
+from price_source import get_daily_history
+from volatility_analysis import analyze_daily_volatility
+
+# 장 시간 (한국시간 기준, 실시간 모니터와 동일)
+KR_OPEN, KR_CLOSE = time(9, 0), time(15, 30)
+US_OPEN, US_CLOSE = time(22, 30), time(7, 0)
+
+OPEN_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', '300'))   # 장중 TTL (초)
+NEGATIVE_TTL = 60                                               # 분석 실패(None) 결과 TTL
+USE_SQLITE = os.environ.get('ANALYSIS_CACHE_SQLITE', 'true').lower() != 'false'
+CHART_OHLC_DAYS = 90
+
+
+def is_market_open(country: str, now: datetime = None) -> bool:
+    """장중 여부 (주말 제외)"""
+    now = now or datetime.now()
+    t = now.time()
+    if country == 'KR':
+        return now.weekday() < 5 and KR_OPEN <= t <= KR_CLOSE
+    # 미국장: 한국시간 22:30 ~ 다음날 07:00 (월 22:30 ~ 토 07:00)
+    if t >= US_OPEN:
+        return now.weekday() < 5
+    if t <= US_CLOSE:
+        return 0 < now.weekday() <= 5
+    return False
+
+
+def _session_open(country: str, day) -> datetime:
+    return datetime.combine(day, KR_OPEN if country == 'KR' else US_OPEN)
+
+
+def market_date(country: str, now: datetime = None) -> str:
+    """가장 최근에 시작한 거래일 (장 시작 전이면 이전 거래일)"""
+    now = now or datetime.now()
+    day = now.date()
+    while day.weekday() >= 5 or _session_open(country, day) > now:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def cache_ttl(country: str, now: datetime = None) -> float:
+    """캐시 유효 시간 (장중: OPEN_TTL, 장외: 다음 개장까지)"""
+    now = now or datetime.now()
+    if is_market_open(country, now):
+        return OPEN_TTL
+
+    day = now.date()
+    while day.weekday() >= 5 or _session_open(country, day) <= now:
+        day += timedelta(days=1)
+    return max((_session_open(country, day) - now).total_seconds(), NEGATIVE_TTL)
+
+
+class TTLCache:
+    """TTL 캐시 + single-flight"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = {}   # {key: (만료 시각, 값)}
+        self._inflight = {}  # {key: Future}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0   # 다른 요청의 계산 결과를 기다린 횟수
+
+    def get_or_load(self, key, loader: Callable, ttl: float):
+        """
+        캐시 조회, 없으면 loader() 결과 저장 후 반환
+
+        Args:
+            key: 캐시 키 (hashable)
+            loader: 값 계산 함수 (예외는 캐시하지 않고 대기 중인 요청에도 전달)
+            ttl: 유효 시간 (초), 값이 None이면 NEGATIVE_TTL과 작은 쪽
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > _time.monotonic():
+                self.hits += 1
+                return entry[1]
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.waits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        if value is None:
+            ttl = min(ttl, NEGATIVE_TTL)
+        with self._lock:
+            self._entries[key] = (_time.monotonic() + ttl, value)
+            self._inflight.pop(key, None)
+            if len(self._entries) > self.max_entries:
+                self._evict()
+        future.set_result(value)
+        return value
+
+    def _evict(self):
+        """만료 항목 삭제, 그래도 많으면 오래된 항목부터 삭제 (lock 보유 상태에서 호출)"""
+        now = _time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, ticker: str = None):
+        """캐시 삭제 (ticker 지정 시 해당 종목만)"""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[1] == ticker]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict:
+        """캐시 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'hit_rate': round(self.hits / total * 100, 1) if total else 0.0,
+            }
+
+
+_cache = TTLCache()
+
+
+def _key(kind: str, ticker: str, country: str):
+    return (kind, ticker, country, market_date(country))
+
+
+def _date_str(value) -> Optional[str]:
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10] if value else None
+
+
+def _summary_from_analysis(data: dict, ticker: str, name: str, country: str) -> dict:
+    return {
+        'ticker': ticker,
+        'name': name,
+        'country': country,
+        'current_price': float(data['current_price']),
+        'data_date': _date_str(data.get('data_date')),
+        'target_05x': float(data['target_05x']),
+        'target_1x': float(data['target_1x']),
+        'target_2x': float(data['target_2x']),
+        'drop_05x': float(data['drop_05x']),
+        'drop_1x': float(data['drop_1x']),
+        'drop_2x': float(data['drop_2x']),
+        'mean_return': float(data['mean_return']),
+        'std_return': float(data['std_return']),
+    }
+
+
+def _save_summary(summary: dict):
+    """statistics_cache에 요약 저장 (다른 프로세스/재시작 후 재사용)"""
+    db = StockDatabase()
+    try:
+        db.update_statistics_cache(
+            ticker=summary['ticker'],
+            date=datetime.now().strftime('%Y-%m-%d'),
+            ticker_name=summary['name'],
+            country=summary['country'],
+            data_date=summary['data_date'],
+            mean_return=summary['mean_return'],
+            std_dev=summary['std_return'],
+            current_price=summary['current_price'],
+            target_05sigma=summary['target_05x'],
+            target_1sigma=summary['target_1x'],
+            target_2sigma=summary['target_2x'],
+            drop_05x=summary['drop_05x'],
+            drop_1x=summary['drop_1x'],
+            drop_2x=summary['drop_2x']
+        )
+    finally:
+        db.close()
+
+
+def _load_saved_summary(ticker: str, name: str, country: str) -> Optional[dict]:
+    """statistics_cache의 당일 요약 (손상/누락 필드가 있으면 None)"""
+    db = StockDatabase()
+    try:
+        cached = db.get_statistics_cache(ticker)
+    finally:
+        db.close()
+
+    fields = ('current_price', 'target_05x', 'target_1x', 'target_2x',
+              'drop_05x', 'drop_1x', 'drop_2x', 'std_return')
+    if not cached or any(not isinstance(cached.get(f), (int, float)) for f in fields):
+        return None
+
+    summary = {f: float(cached[f]) for f in fields}
+    summary.update({
+        'ticker': ticker,
+        'name': cached.get('ticker_name') or name,
+        'country': cached.get('country') or country,
+        'data_date': cached.get('data_date'),
+        'mean_return': float(cached.get('mean_return') or 0),
+    })
+    return summary
+
+
+def get_analysis(ticker: str, name: str, country: str) -> Optional[dict]:
+    """변동성 분석 결과 (analyze_daily_volatility, 캐시)"""
+    def load():
+        data = analyze_daily_volatility(ticker, name, country=country, create_chart=False)
+        if data and USE_SQLITE:
+            _save_summary(_summary_from_analysis(data, ticker, name, country))
+        return data
+
+    return _cache.get_or_load(_key('analysis', ticker, country), load, cache_ttl(country))
+
+
+def get_summary(ticker: str, name: str, country: str) -> Optional[dict]:
+    """
+    목표가 요약 (메모리 → statistics_cache → 분석 순)
+
+    Returns:
+        {'ticker', 'name', 'country', 'current_price', 'data_date', 'target_05x/1x/2x',
+         'drop_05x/1x/2x', 'mean_return', 'std_return'} 또는 None
+    """
+    def load():
+        if USE_SQLITE:
+            saved = _load_saved_summary(ticker, name, country)
+            if saved:
+                return saved
+        data = get_analysis(ticker, name, country)
+        return _summary_from_analysis(data, ticker, name, country) if data else None
+
+    return _cache.get_or_load(_key('summary', ticker, country), load, cache_ttl(country))
+
+
+def get_chart_data(ticker: str, name: str, country: str) -> Optional[dict]:
+    """
+    인터랙티브 차트용 데이터 (목표가 요약 + 최근 일봉 OHLC, 캐시)
+
+    Returns:
+        {'summary': get_summary 형식, 'ohlc': [{'x', 'o', 'h', 'l', 'c'}, ...]} 또는 None
+    """
+    def load():
+        summary = get_summary(ticker, name, country)
+        if not summary:
+            return None
+
+        end_date = datetime.now()
+        df = get_daily_history(ticker, end_date - timedelta(days=CHART_OHLC_DAYS), end_date,
+                               country=country, ticker_name=name)
+
+        ohlc = []
+        if df is not None and not df.empty:
+            for idx, row in df.iterrows():
+                ohlc.append({
+                    'x': idx.strftime('%Y-%m-%d'),
+                    'o': float(row.get('Open', row.get('Close', 0))),
+                    'h': float(row.get('High', row.get('Close', 0))),
+                    'l': float(row.get('Low', row.get('Close', 0))),
+                    'c': float(row.get('Close', 0))
+                })
+        return {'summary': summary, 'ohlc': ohlc}
+
+    return _cache.get_or_load(_key('chart', ticker, country), load, cache_ttl(country))
+
+
+def invalidate(ticker: str = None):
+    """캐시 삭제 (종목 추가/데이터 갱신 후)"""
+    _cache.invalidate(ticker)
+
+
+def cache_stats() -> Dict:
+    """캐시 적중/미스 통계"""
+    return _cache.stats()
@@ -14,6 +14,170 @@ plt.rcParams['font.family'] = 'AppleGothic'
 plt.rcParams['axes.unicode_minus'] = False
 
 
+def add_volatility_columns(df: pd.DataFrame, window: int = 252) -> pd.DataFrame:
+    """일일 수익률(%)과 롤링 표준편차 컬럼 추가 후 NaN 행 제거"""
+    df = df.copy()
+    df['Returns'] = df['Close'].pct_change() * 100
+    df['Volatility'] = df['Returns'].rolling(window=window).std()
+    return df.dropna()
+
+
+def simulate_buys(close: np.ndarray, returns: np.ndarray, volatility: np.ndarray,
+                  amount_1sigma: float = 1000, amount_2sigma: float = 2000,
+                  sigma_1: float = 1.0, sigma_2: float = 2.0) -> dict:
+    """
+    1시그마/2시그마 하락 매수 전략 (벡터 연산, 날짜 순회 없음)
+    
+    1차원(날짜) 또는 2차원(날짜 × 종목) 배열을 받으며, NaN인 날은 매수하지 않습니다.
+    sigma_1/sigma_2로 매수 기준 배수를 바꿀 수 있습니다 (큰 하락이 우선).
+    
+    Returns:
+        {'signal_1sigma', 'signal_2sigma': 매수일 마스크,
+         'invested': 누적 투자금, 'shares': 누적 보유 주식 수, 'portfolio_values': 평가액}
+    """
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.asarray(returns, dtype=np.float64)
+    volatility = np.asarray(volatility, dtype=np.float64)
+    
+    signal_2sigma = returns <= -sigma_2 * volatility
+    signal_1sigma = (returns <= -sigma_1 * volatility) & ~signal_2sigma
+    
+    spend = np.where(signal_2sigma, float(amount_2sigma),
+                     np.where(signal_1sigma, float(amount_1sigma), 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bought = np.where(spend > 0, spend / close, 0.0)
+    
+    shares = np.cumsum(bought, axis=0)
+    return {
+        'signal_1sigma': signal_1sigma,
+        'signal_2sigma': signal_2sigma,
+        'invested': np.cumsum(spend, axis=0),
+        'shares': shares,
+        'portfolio_values': shares * close,
+    }
+
+
+def _performance(invested, shares, initial_price, final_price) -> dict:
+    """최종 투자금/주식 수로 전략 및 Buy & Hold 성과 계산 (스칼라 또는 종목별 배열)"""
+    invested = np.asarray(invested, dtype=np.float64)
+    has_cash = invested > 0
+    safe_cash = np.where(has_cash, invested, 1.0)
+    
+    final_value = shares * final_price
+    total_return = np.where(has_cash, (final_value - invested) / safe_cash * 100, 0.0)
+    buy_hold_shares = np.where(has_cash, invested / initial_price, 0.0)
+    buy_hold_value = buy_hold_shares * final_price
+    buy_hold_return = np.where(has_cash, (buy_hold_value - invested) / safe_cash * 100, 0.0)
+    
+    return {
+        'total_invested': invested,
+        'final_shares': shares,
+        'final_price': final_price,
+        'final_value': final_value,
+        'total_profit': final_value - invested,
+        'total_return_pct': total_return,
+        'buy_hold_shares': buy_hold_shares,
+        'buy_hold_value': buy_hold_value,
+        'buy_hold_profit': buy_hold_value - invested,
+        'buy_hold_return_pct': buy_hold_return,
+        'outperformance': total_return - buy_hold_return,
+        'initial_price': initial_price,
+    }
+
+
+def pack_closes(series: list) -> tuple:
+    """
+    종목별 종가 배열을 거래일 순서로 맞춘 2차원 배열로 묶음 (짧은 종목은 뒤를 NaN으로 채움)
+    
+    Returns:
+        (close[날짜 순서, 종목], 종목별 길이)
+    """
+    series = [np.asarray(s, dtype=np.float64) for s in series]
+    series = [s[~np.isnan(s)] for s in series]
+    lengths = np.array([len(s) for s in series], dtype=np.int64)
+    
+    close = np.full((int(lengths.max(initial=0)), len(series)), np.nan)
+    for i, s in enumerate(series):
+        close[:len(s), i] = s
+    return close, lengths
+
+
+def volatility_matrix(close: np.ndarray, window: int = 252) -> tuple:
+    """종목별 일일 수익률(%)과 롤링 표준편차 (add_volatility_columns와 같은 계산)"""
+    returns = np.full_like(close, np.nan)
+    returns[1:] = (close[1:] / close[:-1] - 1) * 100
+    volatility = pd.DataFrame(returns).rolling(window=window).std().to_numpy()
+    return returns, volatility
+
+
+def evaluate_matrix(close: np.ndarray, returns: np.ndarray, volatility: np.ndarray,
+                    lengths: np.ndarray, window: int = 252,
+                    amount_1sigma: float = 1000, amount_2sigma: float = 2000,
+                    sigma_1: float = 1.0, sigma_2: float = 2.0) -> dict:
+    """
+    pack_closes/volatility_matrix 결과로 종목별 전략 성과 계산
+    
+    Returns:
+        {'period_days', 'buy_1sigma_count', ..., 'outperformance': 종목별 배열}
+        (표준편차 계산 기간보다 짧은 종목은 period_days 0)
+    """
+    n_tickers = close.shape[1]
+    
+    # load_data의 dropna와 같은 시작일: 종목별 첫 번째 표준편차 계산일
+    start = window
+    period_days = np.where(lengths > start, lengths - start, 0)
+    
+    if len(close) > start:
+        sim = simulate_buys(close[start:], returns[start:], volatility[start:],
+                            amount_1sigma, amount_2sigma, sigma_1, sigma_2)
+        cols = np.arange(n_tickers)
+        last = np.maximum(period_days - 1, 0)
+        initial_price = close[start]
+        final_price = close[start:][last, cols]
+        invested = sim['invested'][last, cols]
+        shares = sim['shares'][last, cols]
+        buy_1sigma = sim['signal_1sigma'].sum(axis=0)
+        buy_2sigma = sim['signal_2sigma'].sum(axis=0)
+    else:
+        initial_price = final_price = np.full(n_tickers, np.nan)
+        invested = shares = np.zeros(n_tickers)
+        buy_1sigma = buy_2sigma = np.zeros(n_tickers, dtype=np.int64)
+    
+    return {
+        'period_days': period_days,
+        'period_years': period_days / 252,
+        'buy_1sigma_count': buy_1sigma,
+        'buy_2sigma_count': buy_2sigma,
+        'total_buys': buy_1sigma + buy_2sigma,
+        **_performance(invested, shares, initial_price, final_price),
+    }
+
+
+def backtest_many(prices: dict, window: int = 252, amount_1sigma: float = 1000,
+                  amount_2sigma: float = 2000, sigma_1: float = 1.0,
+                  sigma_2: float = 2.0) -> pd.DataFrame:
+    """
+    여러 종목 백테스트 (종목 × 날짜 2차원 배열로 한 번에 계산)
+    
+    종목마다 상장일/거래일이 다르므로 날짜가 아니라 각 종목의 거래일 순서로 맞춰
+    종목별 VolatilityBacktest와 같은 결과를 냅니다.
+    
+    Args:
+        prices: {ticker: 종가 Series 또는 배열 (날짜 오름차순)}
+    
+    Returns:
+        종목별 결과 DataFrame (index: ticker, 컬럼: run_strategy 결과의 요약 항목)
+    """
+    tickers = list(prices)
+    close, lengths = pack_closes([prices[t] for t in tickers])
+    returns, volatility = volatility_matrix(close, window)
+    result = evaluate_matrix(close, returns, volatility, lengths, window,
+                             amount_1sigma, amount_2sigma, sigma_1, sigma_2)
+    
+    result = pd.DataFrame(result, index=pd.Index(tickers, name='ticker'))
+    return result[result['period_days'] > 0]
+
+
 class VolatilityBacktest:
     """변동성 기반 매수 전략 백테스트"""
     
@@ -39,16 +203,10 @@ class VolatilityBacktest:
         print(f"   기간: {start_date.strftime('%Y-%m-%d')} ~ {end_date.strftime('%Y-%m-%d')}")
         
         try:
-            self.df = fdr.DataReader(self.ticker, start_date, end_date)
+            df = fdr.DataReader(self.ticker, start_date, end_date)
             
-            # 일일 수익률 계산
-            self.df['Returns'] = self.df['Close'].pct_change() * 100
-            
-            # 롤링 표준편차 계산 (1년 윈도우)
-            self.df['Volatility'] = self.df['Returns'].rolling(window=self.window).std()
-            
-            # NaN 제거
-            self.df = self.df.dropna()
+            # 일일 수익률 + 롤링 표준편차 (1년 윈도우), NaN 제거
+            self.df = add_volatility_columns(df, self.window)
             
             print(f"✅ 데이터 로드 완료: {len(self.df)}일")
             return True
@@ -69,64 +227,32 @@ class VolatilityBacktest:
         print(f"   • 1시그마 하락 시: ${amount_1sigma:,.0f} 매수")
         print(f"   • 2시그마 하락 시: ${amount_2sigma:,.0f} 매수")
         
-        # 전략 초기화
-        cash = 0  # 사용한 현금
-        shares = 0  # 보유 주식 수
-        portfolio_value = []
-        buy_signals = []
-        
-        # 매수 카운터
-        buy_1sigma_count = 0
-        buy_2sigma_count = 0
-        
-        # 각 날짜별로 전략 실행
-        for idx, row in self.df.iterrows():
-            returns = row['Returns']
-            volatility = row['Volatility']
-            price = row['Close']
-            
-            # 매수 신호 확인
-            if returns <= -2 * volatility:  # 2시그마 이상 하락
-                shares_to_buy = amount_2sigma / price
-                shares += shares_to_buy
-                cash += amount_2sigma
-                buy_2sigma_count += 1
-                buy_signals.append({
-                    'date': idx,
-                    'type': '2sigma',
-                    'price': price,
-                    'returns': returns,
-                    'volatility': volatility,
-                    'amount': amount_2sigma
-                })
-                
-            elif returns <= -volatility:  # 1시그마 이상 하락
-                shares_to_buy = amount_1sigma / price
-                shares += shares_to_buy
-                cash += amount_1sigma
-                buy_1sigma_count += 1
-                buy_signals.append({
-                    'date': idx,
-                    'type': '1sigma',
-                    'price': price,
-                    'returns': returns,
-                    'volatility': volatility,
-                    'amount': amount_1sigma
-                })
-            
-            # 현재 포트폴리오 가치
-            portfolio_value.append(shares * price)
-        
-        # 최종 결과
-        final_price = self.df['Close'].iloc[-1]
-        final_portfolio_value = shares * final_price
-        total_return = ((final_portfolio_value - cash) / cash * 100) if cash > 0 else 0
-        
-        # Buy and Hold 비교
-        initial_price = self.df['Close'].iloc[0]
-        buy_hold_shares = cash / initial_price if cash > 0 else 0
-        buy_hold_value = buy_hold_shares * final_price
-        buy_hold_return = ((buy_hold_value - cash) / cash * 100) if cash > 0 else 0
+        close = self.df['Close'].to_numpy(dtype=np.float64)
+        returns = self.df['Returns'].to_numpy(dtype=np.float64)
+        volatility = self.df['Volatility'].to_numpy(dtype=np.float64)
+        
+        sim = simulate_buys(close, returns, volatility, amount_1sigma, amount_2sigma)
+        
+        # 매수 내역 (매수일만 순회)
+        signal_2sigma = sim['signal_2sigma']
+        buy_days = np.flatnonzero(sim['signal_1sigma'] | signal_2sigma)
+        dates = self.df.index[buy_days]
+        buy_signals = [{
+            'date': date,
+            'type': '2sigma' if signal_2sigma[i] else '1sigma',
+            'price': close[i],
+            'returns': returns[i],
+            'volatility': volatility[i],
+            'amount': amount_2sigma if signal_2sigma[i] else amount_1sigma
+        } for i, date in zip(buy_days.tolist(), dates)]
+        
+        buy_1sigma_count = int(sim['signal_1sigma'].sum())
+        buy_2sigma_count = int(signal_2sigma.sum())
+        performance = {
+            key: float(value)
+            for key, value in _performance(sim['invested'][-1], sim['shares'][-1],
+                                           close[0], close[-1]).items()
+        }
         
         # 결과 저장
         self.results = {
@@ -140,29 +266,12 @@ class VolatilityBacktest:
             'buy_2sigma_count': buy_2sigma_count,
             'total_buys': buy_1sigma_count + buy_2sigma_count,
             
-            # 투자 금액
-            'total_invested': cash,
-            'final_shares': shares,
-            
-            # 전략 수익
-            'final_price': final_price,
-            'final_value': final_portfolio_value,
-            'total_profit': final_portfolio_value - cash,
-            'total_return_pct': total_return,
-            
-            # Buy and Hold 비교
-            'buy_hold_shares': buy_hold_shares,
-            'buy_hold_value': buy_hold_value,
-            'buy_hold_profit': buy_hold_value - cash,
-            'buy_hold_return_pct': buy_hold_return,
-            
-            # 성과 차이
-            'outperformance': total_return - buy_hold_return,
+            # 투자 금액, 전략 수익, Buy and Hold 비교, 성과 차이
+            **performance,
             
             # 상세 데이터
             'buy_signals': buy_signals,
-            'portfolio_values': portfolio_value,
-            'initial_price': initial_price
+            'portfolio_values': sim['portfolio_values']
         }
         
         return self.results
@@ -221,19 +330,16 @@ class VolatilityBacktest:
         ax1.plot(self.df.index, self.df['Close'], 'b-', linewidth=1.5, label='가격', alpha=0.7)
         
         # 매수 신호 표시
-        buy_1sigma = [b for b in r['buy_signals'] if b['type'] == '1sigma']
-        buy_2sigma = [b for b in r['buy_signals'] if b['type'] == '2sigma']
+        signals = pd.DataFrame(r['buy_signals'], columns=['date', 'type', 'price'])
+        buy_1sigma = signals[signals['type'] == '1sigma']
+        buy_2sigma = signals[signals['type'] == '2sigma']
         
-        if buy_1sigma:
-            dates_1 = [b['date'] for b in buy_1sigma]
-            prices_1 = [b['price'] for b in buy_1sigma]
-            ax1.scatter(dates_1, prices_1, c='orange', s=50, marker='^', 
+        if len(buy_1sigma):
+            ax1.scatter(buy_1sigma['date'], buy_1sigma['price'], c='orange', s=50, marker='^', 
                        label=f'1σ 매수 ({len(buy_1sigma)}회)', zorder=5)
         
-        if buy_2sigma:
-            dates_2 = [b['date'] for b in buy_2sigma]
-            prices_2 = [b['price'] for b in buy_2sigma]
-            ax1.scatter(dates_2, prices_2, c='red', s=100, marker='^',
+        if len(buy_2sigma):
+            ax1.scatter(buy_2sigma['date'], buy_2sigma['price'], c='red', s=100, marker='^',
                        label=f'2σ 매수 ({len(buy_2sigma)}회)', zorder=5)
         
         ax1.set_title(f'{r["ticker_name"]} - 가격 차트 & 매수 시점', fontsize=14, fontweight='bold')
@@ -247,7 +353,7 @@ class VolatilityBacktest:
         ax2.plot(self.df.index, r['portfolio_values'], 'g-', linewidth=2, label='전략 포트폴리오')
         
         # Buy & Hold 포트폴리오 계산
-        buy_hold_values = [r['buy_hold_shares'] * price for price in self.df['Close']]
+        buy_hold_values = r['buy_hold_shares'] * self.df['Close'].to_numpy()
         ax2.plot(self.df.index, buy_hold_values, 'b--', linewidth=2, label='Buy & Hold', alpha=0.7)
         
         # 투자금 라인
@@ -263,10 +369,8 @@ class VolatilityBacktest:
         # 그래프 3: 누적 수익률
         ax3 = axes[2]
         
-        strategy_returns = [(v - r['total_invested']) / r['total_invested'] * 100 
-                           for v in r['portfolio_values']]
-        buy_hold_returns = [(v - r['total_invested']) / r['total_invested'] * 100 
-                           for v in buy_hold_values]
+        strategy_returns = (np.asarray(r['portfolio_values']) - r['total_invested']) / r['total_invested'] * 100
+        buy_hold_returns = (buy_hold_values - r['total_invested']) / r['total_invested'] * 100
         
         ax3.plot(self.df.index, strategy_returns, 'g-', linewidth=2, label='전략 수익률')
         ax3.plot(self.df.index, buy_hold_returns, 'b--', linewidth=2, label='Buy & Hold 수익률', alpha=0.7)
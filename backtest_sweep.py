@@ -0,0 +1,243 @@
+"""
+변동성 매수 전략 파라미터 스윕
+- daily_prices 전체 종목 종가를 한 번만 로드해 공유 메모리에 올리고
+  프로세스 풀 워커가 복사 없이 같은 배열을 사용 (FDR 재다운로드 없음)
+- (표준편차 기간, 백테스트 기간)별로 수익률/표준편차를 한 번 계산하고
+  매수 기준 배수 조합 × 매수 금액 조합을 벡터 연산으로 평가
+- 결과는 backtest_results 테이블에 실행 ID별로 저장
+
+사용법:
+    python backtest_sweep.py                          # 기본 그리드
+    python backtest_sweep.py --windows 126 252 --years 5 10 --sigmas 0.5 1 2
+    python backtest_sweep.py --summary                # 최근 실행 요약
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import List, Sequence
+
+import numpy as np
+
+from backtest_strategy import evaluate_matrix, volatility_matrix
+from database import StockDatabase
+
+# 기본 그리드
+SWEEP_WINDOWS = (126, 252, 504)
+SWEEP_SIGMAS = (0.5, 1.0, 1.5, 2.0, 3.0)
+SWEEP_AMOUNTS = ((1000, 1000), (1000, 2000), (1000, 3000))
+SWEEP_YEARS = (3, 5, 10, 20)
+
+SWEEP_WORKERS = int(os.environ.get('BACKTEST_WORKERS', str(os.cpu_count() or 1)))
+TRADING_DAYS = 252
+
+# 워커 프로세스 공유 데이터 (_init_worker에서 설정)
+_shm = None
+_closes = None     # 전체 종목 종가 (종목 순서대로 이어 붙인 1차원 배열)
+_bounds = None     # 종목별 [start, end) 위치
+_tickers = None
+
+
+def build_grid(windows: Sequence[int] = SWEEP_WINDOWS, sigmas: Sequence[float] = SWEEP_SIGMAS,
+               amounts: Sequence[tuple] = SWEEP_AMOUNTS,
+               years: Sequence[int] = SWEEP_YEARS) -> List[tuple]:
+    """
+    스윕 작업 목록 (워커 1건 = 표준편차 기간 × 백테스트 기간)
+
+    Returns:
+        [(window, years, [(sigma_1, sigma_2, amount_1, amount_2), ...]), ...]
+    """
+    levels = [(s1, s2) for s1, s2 in itertools.combinations(sorted(set(sigmas)), 2)]
+    combos = [(s1, s2, a1, a2) for (s1, s2), (a1, a2) in itertools.product(levels, amounts)]
+    return [(window, year, combos) for window, year in itertools.product(windows, years)]
+
+
+def tail_matrix(closes: np.ndarray, bounds: np.ndarray, days: int) -> tuple:
+    """
+    종목별 최근 days일 종가를 거래일 순서로 맞춘 2차원 배열 (pack_closes와 같은 형태)
+
+    Args:
+        days: 종목별 최근 거래일 수 (0이면 전체)
+    """
+    counts = np.diff(bounds)
+    lengths = np.minimum(counts, days) if days else counts
+    starts = bounds[1:] - lengths
+
+    rows = np.arange(int(lengths.max(initial=0)))[:, None]
+    mask = rows < lengths[None, :]
+    index = np.where(mask, starts[None, :] + rows, 0)
+    return np.where(mask, closes[index], np.nan), lengths
+
+
+def _init_worker(shm_name: str, n_values: int, tickers: List[str]):
+    """워커 초기화: 공유 메모리의 종가 배열 연결 (복사 없음)"""
+    global _shm, _closes, _bounds, _tickers
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _closes = np.ndarray((n_values,), dtype=np.float64, buffer=_shm.buf)
+    _bounds = np.ndarray((len(tickers) + 1,), dtype=np.int64, buffer=_shm.buf,
+                         offset=n_values * 8)
+    _tickers = tickers
+
+
+def _run_group(task: tuple) -> List[tuple]:
+    """표준편차 기간 × 백테스트 기간 1건 평가 (BACKTEST_RESULT_FIELDS 순서의 행 반환)"""
+    window, years, combos = task
+    days = years * TRADING_DAYS + window if years else 0
+    close, lengths = tail_matrix(_closes, _bounds, days)
+    returns, volatility = volatility_matrix(close, window)
+
+    rows = []
+    for sigma_1, sigma_2, amount_1, amount_2 in combos:
+        result = evaluate_matrix(close, returns, volatility, lengths, window,
+                                 amount_1, amount_2, sigma_1, sigma_2)
+        columns = zip(result['period_days'].tolist(), result['buy_1sigma_count'].tolist(),
+                      result['buy_2sigma_count'].tolist(), result['total_invested'].tolist(),
+                      result['final_value'].tolist(), result['total_return_pct'].tolist(),
+                      result['buy_hold_return_pct'].tolist(), result['outperformance'].tolist())
+        for ticker, (period_days, buys_1, buys_2, invested, value,
+                     strategy, buy_hold, diff) in zip(_tickers, columns):
+            if period_days:
+                rows.append((ticker, window, years, sigma_1, sigma_2, amount_1, amount_2,
+                             period_days, buys_1, buys_2, invested, value,
+                             strategy, buy_hold, diff))
+    return rows
+
+
+def _sweep_pool(workers: int, shm_name: str, n_values: int, tickers: List[str]):
+    """스윕 프로세스 풀 (fork 가능하면 fork로 빠르게 시작)"""
+    import multiprocessing
+
+    context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=_init_worker,
+                               initargs=(shm_name, n_values, tickers))
+
+
+def run_sweep(windows: Sequence[int] = SWEEP_WINDOWS, sigmas: Sequence[float] = SWEEP_SIGMAS,
+              amounts: Sequence[tuple] = SWEEP_AMOUNTS, years: Sequence[int] = SWEEP_YEARS,
+              tickers: List[str] = None, workers: int = SWEEP_WORKERS) -> str:
+    """
+    파라미터 그리드 백테스트 실행 후 backtest_results에 저장
+
+    Args:
+        tickers: 대상 종목 (None이면 daily_prices 전체)
+        workers: 프로세스 수 (1이면 현재 프로세스에서 실행)
+
+    Returns:
+        실행 ID
+    """
+    run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+    grid = build_grid(windows, sigmas, amounts, years)
+    db = StockDatabase()
+
+    started = time.monotonic()
+    columns = db.load_daily_prices_columnar(tickers)
+    tickers = [t for t in columns.tickers if columns.count(t) > 0]
+    if not tickers or not grid:
+        print("⚠️  백테스트할 종목 또는 파라미터가 없습니다.")
+        db.close()
+        return run_id
+
+    closes = np.concatenate([columns.view(t, 'close') for t in tickers])
+    bounds = np.concatenate([[0], np.cumsum([columns.count(t) for t in tickers])]).astype(np.int64)
+    del columns
+
+    n_combos = sum(len(combos) for _, _, combos in grid)
+    print(f"📊 백테스트 스윕 {run_id}: {len(tickers)}개 종목, {len(closes):,}일봉, "
+          f"{n_combos}개 파라미터 조합 ({time.monotonic() - started:.1f}초 로드)")
+
+    # 종가 + 종목 구간을 공유 메모리 한 블록에 배치
+    shm = shared_memory.SharedMemory(create=True, size=max(closes.nbytes + bounds.nbytes, 1))
+    saved = 0
+    try:
+        np.ndarray(closes.shape, dtype=np.float64, buffer=shm.buf)[:] = closes
+        np.ndarray(bounds.shape, dtype=np.int64, buffer=shm.buf, offset=closes.nbytes)[:] = bounds
+        del closes
+
+        if workers > 1 and len(grid) > 1:
+            with _sweep_pool(min(workers, len(grid)), shm.name, int(bounds[-1]), tickers) as pool:
+                for rows in pool.map(_run_group, grid):
+                    saved += db.save_backtest_results(run_id, rows)
+        else:
+            _init_worker(shm.name, int(bounds[-1]), tickers)
+            try:
+                for task in grid:
+                    saved += db.save_backtest_results(run_id, _run_group(task))
+            finally:
+                _release_worker()
+    finally:
+        shm.close()
+        shm.unlink()
+        db.close()
+
+    print(f"✅ 백테스트 스윕 완료: {saved:,}건 저장 ({time.monotonic() - started:.1f}초)")
+    return run_id
+
+
+def _release_worker():
+    """현재 프로세스에서 실행한 경우 공유 메모리 참조 해제"""
+    global _shm, _closes, _bounds, _tickers
+    _closes = _bounds = _tickers = None
+    if _shm is not None:
+        _shm.close()
+        _shm = None
+
+
+def print_summary(run_id: str = None, limit: int = 20):
+    """파라미터 조합별 결과 (평균 초과수익 높은 순)"""
+    db = StockDatabase()
+    summary = db.get_backtest_summary(run_id, limit)
+    db.close()
+
+    if not summary:
+        print("⚠️  저장된 백테스트 결과가 없습니다.")
+        return
+
+    print(f"\n{'기간':>6} {'년':>4} {'σ1':>5} {'σ2':>5} {'금액1':>7} {'금액2':>7} "
+          f"{'종목':>5} {'수익률':>9} {'초과수익':>9} {'승률':>7} {'매수':>6}")
+    print("-" * 86)
+    for r in summary:
+        print(f"{r['window']:>6} {r['years'] or '전체':>4} {r['sigma_1']:>5.1f} {r['sigma_2']:>5.1f} "
+              f"{r['amount_1']:>7,.0f} {r['amount_2']:>7,.0f} {r['tickers']:>5} "
+              f"{r['avg_return']:>8.1f}% {r['avg_outperformance']:>+8.1f}%p "
+              f"{r['win_rate']:>6.1f}% {r['avg_buys']:>6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='변동성 매수 전략 파라미터 스윕')
+    parser.add_argument('--windows', type=int, nargs='+', default=list(SWEEP_WINDOWS),
+                        help='표준편차 계산 기간 (거래일)')
+    parser.add_argument('--sigmas', type=float, nargs='+', default=list(SWEEP_SIGMAS),
+                        help='매수 기준 배수 (두 개씩 조합)')
+    parser.add_argument('--amounts', type=float, nargs='+',
+                        default=[a for pair in SWEEP_AMOUNTS for a in pair],
+                        help='매수 금액 쌍 (1차 2차 1차 2차 ...)')
+    parser.add_argument('--years', type=int, nargs='+', default=list(SWEEP_YEARS),
+                        help='백테스트 기간 (년, 0이면 전체)')
+    parser.add_argument('--tickers', nargs='+', help='대상 종목 (기본: 전체)')
+    parser.add_argument('--workers', type=int, default=SWEEP_WORKERS, help='프로세스 수')
+    parser.add_argument('--summary', action='store_true', help='최근 실행 요약만 출력')
+
+    args = parser.parse_args()
+
+    if args.summary:
+        print_summary()
+        return
+
+    if len(args.amounts) % 2:
+        parser.error('--amounts는 (1차, 2차) 쌍으로 입력하세요.')
+    amounts = list(zip(args.amounts[::2], args.amounts[1::2]))
+
+    run_id = run_sweep(args.windows, args.sigmas, amounts, args.years,
+                       tickers=args.tickers, workers=args.workers)
+    print_summary(run_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+변동성 차트 캐시 (입력 데이터 해시 기반)
+- 파일명: charts/{ticker}/{데이터 기준일}_{ticker}_{해시}.png
+- 해시 키: 종목, 종목명, 데이터 기준일, 현재가, 표준편차, 목표가, 차트 버전
+  → 같은 입력이면 다시 그리지 않음
+- 디스크 예산(CHART_CACHE_MAX_MB) 초과 시 가장 오래 사용하지 않은 차트부터 삭제
+  (종목별 최신 차트 1개는 유지)
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+from volatility_analysis import CHART_VERSION, visualize_volatility
+
+CHARTS_DIR = Path('charts')
+CHART_CACHE_MAX_BYTES = int(float(os.environ.get('CHART_CACHE_MAX_MB', '500')) * 1024 * 1024)
+
+
+def chart_key(data: dict) -> str:
+    """차트 입력 해시 (소수점 오차로 키가 바뀌지 않도록 유효숫자 10자리로 정규화)"""
+    parts = [
+        data['ticker'],
+        data['ticker_name'],
+        data.get('country') or '',
+        str(data['data_date']),
+        CHART_VERSION,
+    ]
+    parts += [f"{float(data[k]):.10g}" for k in (
+        'current_price', 'std_return', 'mean_return',
+        'target_05x', 'target_1x', 'target_2x',
+    )]
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def chart_path(data: dict) -> Path:
+    """차트 캐시 파일 경로"""
+    ticker = data['ticker']
+    return CHARTS_DIR / ticker / f"{data['data_date']}_{ticker}_{chart_key(data)}.png"
+
+
+def cached_chart(data: dict) -> Optional[str]:
+    """캐시된 차트 경로 (없으면 None, 있으면 사용 시각 갱신)"""
+    path = chart_path(data)
+    try:
+        os.utime(path)  # LRU 기준 (mtime)
+    except FileNotFoundError:
+        return None
+    return str(path)
+
+
+def render_chart(data: dict) -> str:
+    """차트 렌더링 후 캐시 경로에 저장 (임시 파일 → rename으로 원자적 교체)"""
+    path = chart_path(data)
+    # 웹 요청 스레드가 같은 차트를 동시에 그릴 수 있으므로 프로세스+스레드별 임시 파일
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}.png")
+    try:
+        visualize_volatility(data, output_path=tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return str(path)
+
+
+def get_chart(data: dict) -> str:
+    """캐시된 차트 반환, 없으면 렌더링 (렌더링 후 디스크 예산 정리)"""
+    path = cached_chart(data)
+    if path:
+        return path
+
+    path = render_chart(data)
+    collect_garbage()
+    return path
+
+
+def collect_garbage(max_bytes: int = CHART_CACHE_MAX_BYTES) -> Tuple[int, int]:
+    """
+    디스크 예산 초과분 삭제 (오래 사용하지 않은 순)
+
+    Returns:
+        (삭제 파일 수, 확보 바이트)
+    """
+    if not CHARTS_DIR.exists():
+        return 0, 0
+
+    files = []
+    for path in CHARTS_DIR.glob('*/*.png'):
+        if path.name.startswith('.'):
+            continue  # 렌더링 중인 임시 파일
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    if total <= max_bytes:
+        return 0, 0
+
+    # 종목별 최신 차트는 삭제 대상에서 제외
+    latest = {}
+    for mtime, _, path in files:
+        ticker = path.parent.name
+        if ticker not in latest or mtime > latest[ticker][0]:
+            latest[ticker] = (mtime, path)
+    keep = {path for _, path in latest.values()}
+
+    removed = 0
+    freed = 0
+    for mtime, size, path in sorted(files, key=lambda f: f[0]):
+        if total - freed <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += size
+
+    if removed:
+        print(f"🧹 차트 캐시 정리: {removed}개 삭제 ({freed / 1024 / 1024:.1f}MB)")
+    return removed, freed
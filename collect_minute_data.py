@@ -9,6 +9,7 @@ import argparse
 from datetime import datetime, timedelta
 from database import StockDatabase
 from kis_api import KISApi
+import kis_http
 import time
 
 # yfinance 임포트 (미국 주식 분봉용)
@@ -413,6 +414,8 @@ def main():
         print("")
         print("  # 관심 종목 전체 수집")
         print("  python collect_minute_data.py --all -s 2024-12-10")
+    
+    kis_http.print_latency_stats()
 
 
 if __name__ == "__main__":
@@ -3,16 +3,25 @@
 월-금 8:50 AM에 실행되어 매수 추천 종목을 분석하고 ntfy로 전송
 """
 
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from pathlib import Path
 import os
+import time
 
 from database import StockDatabase
-from volatility_analysis import analyze_daily_volatility, visualize_volatility
+from price_source import get_daily_history
+from volatility_analysis import analyze_volatility_batch
+import chart_cache
 from ntfy_alert import NtfyAlert
 from scheduler_config import SCHEDULE_CONFIG
 from kis_api import KISApi
 
+# 일봉 조회 스레드 수 (네트워크 I/O)
+FETCH_WORKERS = int(os.environ.get('ANALYSIS_FETCH_WORKERS', '8'))
+# 차트 렌더링 프로세스 수 (CPU, 기본: 코어 수 / NAS 2코어면 2)
+CHART_WORKERS = int(os.environ.get('ANALYSIS_CHART_WORKERS', str(os.cpu_count() or 1)))
+
 
 def send_ntfy_message(ntfy_topic: str, message: str, title: str = None) -> bool:
     """ntfy 메시지 전송 wrapper"""
@@ -60,13 +69,18 @@ def get_stock_name(ticker: str, fallback_name: str) -> str:
 
 
 def get_unique_tickers():
-    """모든 사용자의 종목을 중복 없이 가져오기"""
+    """
+    모든 사용자의 종목을 중복 없이 가져오기
+    
+    Returns:
+        {ticker: (name, country)} (종목명 보충은 분석 단계에서 병렬로 수행)
+    """
     db = StockDatabase()
     
     # 활성 사용자와 종목 가져오기
     users = db.get_all_users()
     
-    unique_tickers = {}  # {ticker: name}
+    unique_tickers = {}  # {ticker: (name, country)}
     for user in users:
         if not user['enabled']:
             continue
@@ -74,19 +88,67 @@ def get_unique_tickers():
         # 사용자의 관심 종목 조회
         watchlist = db.get_user_watchlist_with_names(user['name'])
         for stock in watchlist:
-            ticker = stock['ticker']
-            # 종목명이 없거나 티커와 같으면 KIS API에서 가져오기
-            name = get_stock_name(ticker, stock['name'])
-            unique_tickers[ticker] = name
+            unique_tickers[stock['ticker']] = (stock['name'], stock['country'])
     
     db.close()
     return unique_tickers
 
 
+def _fetch_history(ticker: str, name: str, country: str):
+    """
+    종목명 보충 + 1년치 일봉 조회 (I/O, 스레드 풀에서 실행)
+    
+    Returns:
+        (ticker_name, country, close_prices 또는 None)
+    """
+    # 종목명이 없거나 티커와 같으면 KIS API에서 가져오기
+    name = get_stock_name(ticker, name)
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=365)
+    
+    db = StockDatabase()  # 스레드별 연결
+    try:
+        df = get_daily_history(ticker, start_date, end_date, country=country,
+                               ticker_name=name, db=db)
+    finally:
+        db.close()
+    
+    close_prices = df['Close'].dropna() if df is not None and not df.empty else None
+    return name, country, close_prices
+
+
+def _init_chart_worker():
+    """차트 프로세스 초기화 (화면 없는 Agg 백엔드)"""
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+
+
+def _chart_pool():
+    """
+    차트 렌더링 프로세스 풀 (forkserver, 없으면 spawn)
+    - daily_updater처럼 알림 워커/HTTP 스레드가 이미 떠 있는 프로세스에서 fork하면
+      fork 시점에 다른 스레드가 잡고 있던 락 때문에 자식이 멈출 수 있음
+    """
+    import multiprocessing
+    
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['chart_cache'])  # 서버에서 한 번만 import
+    else:
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=context,
+                               initializer=_init_chart_worker)
+
+
 def analyze_and_generate_charts():
     """
     모든 종목 분석 및 차트 생성 (중복 제거)
-    같은 날짜의 차트가 있으면 재사용
+    같은 입력(기준일/현재가/표준편차/목표가)의 차트가 있으면 재사용 (chart_cache)
+    
+    1) 일봉 조회: 스레드 풀 (ANALYSIS_FETCH_WORKERS)
+    2) 통계: 전 종목 한 번에 계산 (analyze_volatility_batch)
+    3) 차트: 프로세스 풀 (ANALYSIS_CHART_WORKERS, 1이면 현재 프로세스에서 렌더링)
     """
     today = datetime.now().strftime('%Y-%m-%d')
     unique_tickers = get_unique_tickers()
@@ -98,39 +160,68 @@ def analyze_and_generate_charts():
     print("="*70)
     print(f"📊 일일 분석 시작 ({today})")
     print(f"📈 분석 종목: {len(unique_tickers)}개")
+    print(f"⚙️  조회 스레드 {FETCH_WORKERS}개 / 차트 프로세스 {CHART_WORKERS}개")
     print("="*70)
     
-    results = {}
+    # 1단계: 일봉 조회 (병렬)
+    started = time.monotonic()
+    histories = {}
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='analysis-fetch') as executor:
+        futures = {
+            executor.submit(_fetch_history, ticker, name, country): ticker
+            for ticker, (name, country) in unique_tickers.items()
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                histories[ticker] = future.result()
+            except Exception as e:
+                print(f"  ❌ {ticker} 데이터 조회 실패: {e}")
+    print(f"\n📥 일봉 조회 완료: {len(histories)}/{len(unique_tickers)}개 ({time.monotonic() - started:.1f}초)")
     
-    for ticker, name in unique_tickers.items():
-        print(f"\n📊 {ticker} ({name}) 분석 중...")
-        
-        # 차트 파일 경로
-        chart_path = Path('charts') / ticker / f"{today}_{ticker}_{name.replace(' ', '_')}_volatility.png"
+    # 2단계: 통계 (전 종목 일괄)
+    started = time.monotonic()
+    analyses = analyze_volatility_batch(histories)
+    for ticker in unique_tickers:
+        if ticker not in analyses:
+            print(f"  ❌ {ticker} 분석 실패 (데이터 없음)")
+    print(f"📐 통계 계산 완료: {len(analyses)}개 ({time.monotonic() - started:.2f}초)")
+    
+    # 3단계: 차트 생성 (같은 입력의 차트가 캐시에 없는 종목만)
+    started = time.monotonic()
+    results = {}
+    to_render = []
+    for ticker, data in analyses.items():
+        chart_file = chart_cache.cached_chart(data)
+        if chart_file is None:
+            to_render.append(ticker)
         
-        # 분석 수행 (매수 목표가 계산 위해 항상 수행)
-        try:
-            data = analyze_daily_volatility(ticker, name)
-            if not data:
-                print(f"  ❌ 분석 실패")
-                continue
-            
-            # 차트가 없으면 생성
-            if chart_path.exists():
-                print(f"  ✅ 기존 차트 사용: {chart_path}")
-                chart_file = str(chart_path)
-            else:
-                chart_file = visualize_volatility(data)
-                print(f"  ✅ 새 차트 생성: {chart_file}")
-            
-            results[ticker] = {
-                'name': name,
-                'chart_path': chart_file,
-                'data': data  # 매수 목표가 계산을 위해 항상 저장
-            }
-        except Exception as e:
-            print(f"  ❌ 분석 실패: {e}")
-            continue
+        results[ticker] = {
+            'name': data['ticker_name'],
+            'chart_path': chart_file,
+            'data': data  # 매수 목표가 계산을 위해 항상 저장
+        }
+    
+    if to_render:
+        if CHART_WORKERS > 1 and len(to_render) > 1:
+            with _chart_pool() as pool:
+                futures = {pool.submit(chart_cache.render_chart, analyses[t]): t for t in to_render}
+                for future in as_completed(futures):
+                    ticker = futures[future]
+                    try:
+                        results[ticker]['chart_path'] = future.result()
+                    except Exception as e:
+                        print(f"  ❌ {ticker} 차트 생성 실패: {e}")
+        else:
+            for ticker in to_render:
+                try:
+                    results[ticker]['chart_path'] = chart_cache.render_chart(analyses[ticker])
+                except Exception as e:
+                    print(f"  ❌ {ticker} 차트 생성 실패: {e}")
+    
+    print(f"🖼️  차트 생성 {len(to_render)}개 / 기존 차트 사용 {len(results) - len(to_render)}개 "
+          f"({time.monotonic() - started:.1f}초)")
+    chart_cache.collect_garbage()
     
     return results
 
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 매일 자동 스케줄러
-- 08:00: 일봉 데이터 업데이트 + 놓친 알림 요약 (월-금)
+- 08:00: 일봉 데이터 업데이트 + 놓친 알림 요약 + 오래된 분봉 보관 (월-금)
 - 08:50: 오늘의 매수 전략 분석 (월-금)
 ※ 토/일요일은 모든 알림 및 모니터링 제외
 """
@@ -31,7 +31,7 @@ def morning_update_job():
     # 1. 일봉 데이터 업데이트
     try:
         log("")
-        log("[1/2] 일봉 데이터 업데이트...")
+        log("[1/3] 일봉 데이터 업데이트...")
         dc = DataCollector()
         dc.update_daily_data()
         dc.close()
@@ -44,13 +44,25 @@ def morning_update_job():
     # 2. 밤 사이 놓친 알림 요약 전송
     try:
         log("")
-        log("[2/2] 밤 사이 놓친 알림 확인...")
+        log("[2/3] 밤 사이 놓친 알림 확인...")
         send_missed_alerts_summary()
     except Exception as e:
         log_error(f"놓친 알림 전송 실패: {e}")
         import traceback
         traceback.print_exc()
     
+    # 3. 오래된 분봉을 보관 파일로 이동 (DB 크기 유지)
+    try:
+        log("")
+        log("[3/3] 오래된 분봉 보관...")
+        from minute_archive import archive_minute_data, HOT_DAYS
+        result = archive_minute_data()
+        log_success(f"분봉 보관 완료: {result['rows']:,}건 ({HOT_DAYS}일 이전)")
+    except Exception as e:
+        log_error(f"분봉 보관 실패: {e}")
+        import traceback
+        traceback.print_exc()
+    
     log("")
     log("="*70)
     log_success("아침 업데이트 완료!")
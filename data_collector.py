@@ -10,6 +10,8 @@
 import FinanceDataReader as fdr
 from datetime import datetime, timedelta
 from database import StockDatabase
+from rolling_volatility import RollingVolatility
+from price_source import daily_frame_to_rows
 from scheduler_config import WATCH_LIST
 import time
 
@@ -19,6 +21,7 @@ class DataCollector:
     
     def __init__(self):
         self.db = StockDatabase()
+        self.volatility = RollingVolatility(self.db)
         self.kis_api = None
         self._init_kis_api()
     
@@ -82,6 +85,10 @@ class DataCollector:
             print(f"  ⚠️  FDR 오류: {e}")
             return None
     
+    def _to_daily_rows(self, ticker: str, name: str, df) -> list:
+        """일봉 DataFrame → insert_daily_prices_bulk용 튜플 리스트"""
+        return daily_frame_to_rows(ticker, name, df)
+    
     def initialize_historical_data(self, years=1):
         """
         초기 히스토리 데이터 로드 (최초 1회만)
@@ -134,22 +141,13 @@ class DataCollector:
                     continue
                 
                 # DB에 저장할 데이터 준비
-                data_to_insert = []
-                for date, row in df.iterrows():
-                    data_to_insert.append((
-                        ticker,
-                        name,
-                        date.strftime('%Y-%m-%d'),
-                        float(row.get('Open', row['Close'])),
-                        float(row.get('High', row['Close'])),
-                        float(row.get('Low', row['Close'])),
-                        float(row['Close']),
-                        int(row.get('Volume', 0))
-                    ))
+                data_to_insert = self._to_daily_rows(ticker, name, df)
                 
                 # 대량 삽입
-                if self.db.insert_daily_prices_bulk(data_to_insert):
-                    print(f"  ✅ {len(data_to_insert)}개 데이터 저장 완료")
+                saved = self.db.insert_daily_prices_bulk(data_to_insert)
+                if saved:
+                    print(f"  ✅ {len(data_to_insert)}개 데이터 저장 완료 "
+                          f"(신규 {saved['inserted']}, 갱신 {saved['updated']})")
                     success_count += 1
                     total_rows += len(data_to_insert)
                 else:
@@ -218,21 +216,11 @@ class DataCollector:
                     continue
                 
                 # DB에 저장
-                data_to_insert = []
-                for date, row in df.iterrows():
-                    data_to_insert.append((
-                        ticker,
-                        name,
-                        date.strftime('%Y-%m-%d'),
-                        float(row.get('Open', row['Close'])),
-                        float(row.get('High', row['Close'])),
-                        float(row.get('Low', row['Close'])),
-                        float(row['Close']),
-                        int(row.get('Volume', 0))
-                    ))
+                data_to_insert = self._to_daily_rows(ticker, name, df)
                 
-                if self.db.insert_daily_prices_bulk(data_to_insert):
-                    print(f"✅ {len(data_to_insert)}개 추가")
+                saved = self.db.insert_daily_prices_bulk(data_to_insert)
+                if saved:
+                    print(f"✅ {saved['inserted']}개 추가, {saved['updated']}개 갱신")
                     success_count += 1
                     new_data_count += len(data_to_insert)
                 else:
@@ -303,37 +291,18 @@ class DataCollector:
         """
         print("\n📊 통계 계산 중...")
         
-        today = datetime.now().strftime('%Y-%m-%d')
         success_count = 0
         
+        # 새로 저장된 일봉만 롤링 상태에 반영 (상태가 없는 종목은 재계산)
+        applied = self.volatility.sync(list(WATCH_LIST.keys()))
+        print(f"  📈 신규 일봉 {applied}개 반영")
+        
         for ticker, name in WATCH_LIST.items():
             try:
-                # 1년치 데이터 가져오기
-                df = self.db.get_daily_prices(ticker, days=252)
-                
-                if df.empty or len(df) < 30:
-                    print(f"  ⚠️  {name}: 데이터 부족")
-                    continue
-                
-                # 일일 수익률 계산
-                returns = df['close'].pct_change() * 100
-                returns = returns.dropna()
-                
-                # 통계 계산
-                mean_return = returns.mean()
-                std_dev = returns.std()
-                current_price = df['close'].iloc[-1]
-                
-                # 목표가 계산
-                target_1sigma = current_price * (1 - std_dev / 100)
-                target_2sigma = current_price * (1 - 2 * std_dev / 100)
-                
-                # 캐시에 저장
-                if self.db.update_statistics_cache(
-                    ticker, today, mean_return, std_dev, 
-                    current_price, target_1sigma, target_2sigma
-                ):
+                if self.volatility.cache_targets(ticker, ticker_name=name):
                     success_count += 1
+                else:
+                    print(f"  ⚠️  {name}: 데이터 부족")
                 
             except Exception as e:
                 print(f"  ❌ {name}: {e}")
@@ -3,18 +3,198 @@ SQLite 데이터베이스 관리 (Peewee ORM)
 일봉 & 분봉 데이터 저장/조회
 """
 
+import json
+import os
+import threading
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+import numpy as np
 import pandas as pd
-from peewee import fn, IntegrityError
+from peewee import fn, IntegrityError, JOIN
 
 from models import (
     db, init_db, close_db,
     User, UserWatchlist, DailyPrice, MinutePrice,
-    StatisticsCache, Setting, AlertHistory
+    StatisticsCache, VolatilityState, Setting, Ticker, ExchangeCode, StockListing, AlertHistory,
+    AlertOutbox, BacktestResult, SUBSCRIBERS_VERSION_KEY, CURRENCIES,
+    OUTBOX_PENDING, OUTBOX_HELD, OUTBOX_SENT, OUTBOX_SUMMARIZED, OUTBOX_FAILED
 )
 
 
+# 일봉 컬럼형 로딩용 레코드 타입 (종목 인덱스, YYYYMMDD 정수 날짜, OHLCV)
+_DAILY_ROW_DTYPE = np.dtype([
+    ('code', np.int32),
+    ('date', np.int32),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+])
+
+# 종목 목록 스냅샷 설정 키 (국가별)
+STOCK_LISTING_VERSION_KEY = 'stock_listing_version_{}'   # 교체할 때마다 1 증가
+STOCK_LISTING_CHECKED_KEY = 'stock_listing_checked_{}'   # 마지막 갱신 시도 시각
+
+# 종목 정보 UPSERT (이름/국가는 값이 있을 때만 갱신, 거래소는 상장 목록 → 해외 거래소 코드 순)
+_TICKER_UPSERT_SQL = '''
+    INSERT INTO tickers (symbol, name, country, exchange, currency, updated_at)
+    VALUES (:symbol, :name, :country,
+            COALESCE((SELECT market FROM stock_listings
+                      WHERE country = :country AND ticker = :symbol),
+                     (SELECT exchange FROM exchange_codes WHERE ticker = :symbol)),
+            :currency, :now)
+    ON CONFLICT (symbol) DO UPDATE SET
+        name = COALESCE(excluded.name, tickers.name),
+        country = COALESCE(:given_country, tickers.country),
+        currency = COALESCE(:given_currency, tickers.currency),
+        exchange = COALESCE(tickers.exchange, excluded.exchange),
+        updated_at = excluded.updated_at
+'''
+
+# 자주 실행되는 직접 SQL (query_plan.py에서 같은 문장으로 실행 계획 점검)
+WATCHED_STOCKS_SQL = '''
+    SELECT uw.ticker, t.name, uw.country
+    FROM users u
+    JOIN user_watchlist uw ON uw.user_id = u.id
+    LEFT JOIN tickers t ON t.symbol = uw.ticker
+    WHERE u.enabled = 1 AND uw.enabled = 1
+    ORDER BY u.id, uw.id
+'''
+
+RECENT_MINUTES_SQL = '''
+    SELECT datetime, price FROM minute_prices
+    WHERE ticker = ?
+    ORDER BY datetime DESC
+    LIMIT ?
+'''
+
+TICKER_ALERTS_SQL = '''
+    SELECT ah.ticker, COALESCE(t.name, ah.ticker), t.country, ah.alert_level, ah.target_price,
+           ah.current_price, ah.drop_rate, ah.alert_time, ah.sent
+    FROM alert_history ah
+    LEFT JOIN tickers t ON t.symbol = ah.ticker
+    WHERE ah.ticker IN (SELECT value FROM json_each(?))
+    ORDER BY ah.alert_time DESC
+    LIMIT ?
+'''
+
+# 대량 저장/삭제 후 ANALYZE 기준 (프로세스 내 테이블별 누적 변경 행 수)
+ANALYZE_MIN_ROWS = int(os.environ.get('DB_ANALYZE_MIN_ROWS', '10000'))
+ANALYZE_SAMPLE_ROWS = 1000   # 인덱스별 통계 표본 행 수 (PRAGMA analysis_limit)
+_changed_rows: Dict[str, int] = {}
+
+# 프로세스 내 저장된 종목 정보 {(db_path, symbol): (name, country)} (같은 값 반복 저장 방지)
+_saved_tickers: Dict[tuple, tuple] = {}
+
+# 백테스트 스윕 결과 행 컬럼 순서 (save_backtest_results)
+BACKTEST_RESULT_FIELDS = (
+    'ticker', 'window', 'years', 'sigma_1', 'sigma_2', 'amount_1', 'amount_2',
+    'period_days', 'buy_1_count', 'buy_2_count', 'total_invested', 'final_value',
+    'total_return_pct', 'buy_hold_return_pct', 'outperformance',
+)
+
+
+def int_dates_to_datetime64(dates: np.ndarray) -> np.ndarray:
+    """YYYYMMDD 정수 배열 → datetime64[D] 배열 (벡터 연산)"""
+    dates = np.asarray(dates, dtype=np.int64)
+    years = (dates // 10000 - 1970).astype('datetime64[Y]')
+    months = ((dates // 100) % 100 - 1).astype('timedelta64[M]')
+    days = (dates % 100 - 1).astype('timedelta64[D]')
+    return (years.astype('datetime64[M]') + months).astype('datetime64[D]') + days
+
+
+def current_db_path() -> str:
+    """프로세스에서 초기화한 DB 파일 경로 (init_db 전이면 기본 경로)"""
+    return db.database or 'data/stock_data.db'
+
+
+def shutdown_executor(executor, workers: int, wait: bool = True, timeout: float = 5.0):
+    """
+    DB를 사용한 스레드 풀 종료 (작업 스레드마다 열린 Peewee 연결 닫기)
+    - Peewee 연결은 스레드별이라 각 작업 스레드에서 close_db를 실행해야 함
+    - workers개 작업이 Barrier에서 모두 만나야 진행하므로 스레드마다 1번씩 실행됨
+      (멈춘 스레드가 있으면 timeout 후 가능한 스레드만 닫음)
+
+    Args:
+        workers: 스레드 풀 max_workers
+        wait: 종료 대기 여부 (이벤트 루프에서는 False)
+    """
+    barrier = threading.Barrier(workers)
+
+    def close():
+        try:
+            barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            pass
+        close_db()
+
+    for _ in range(workers):
+        executor.submit(close)
+    executor.shutdown(wait=wait)
+
+
+class DailyPriceColumns:
+    """
+    여러 종목 일봉 데이터 (컬럼형 NumPy 배열)
+    
+    행은 (종목, 날짜) 순으로 정렬되어 있어 종목별 데이터는 연속 구간이며,
+    종목별 조회는 슬라이스(view)라 복사가 없습니다.
+    """
+    
+    COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+    
+    def __init__(self, tickers: List[str], rows: np.ndarray):
+        self.tickers = list(tickers)
+        self.codes = np.ascontiguousarray(rows['code'])
+        self.dates = np.ascontiguousarray(rows['date'])
+        self.columns = {col: np.ascontiguousarray(rows[col]) for col in self.COLUMNS}
+        
+        # 종목별 [start, end) 구간 (정렬되어 있으므로 searchsorted로 계산)
+        bounds = np.searchsorted(self.codes, np.arange(len(self.tickers) + 1))
+        self._slices = {
+            ticker: (int(bounds[i]), int(bounds[i + 1]))
+            for i, ticker in enumerate(self.tickers)
+        }
+    
+    def __len__(self) -> int:
+        return len(self.dates)
+    
+    def __contains__(self, ticker: str) -> bool:
+        start, end = self._slices.get(ticker, (0, 0))
+        return end > start
+    
+    def count(self, ticker: str) -> int:
+        """종목별 행 수"""
+        start, end = self._slices.get(ticker, (0, 0))
+        return end - start
+    
+    def view(self, ticker: str, column: str = 'close') -> np.ndarray:
+        """종목별 컬럼 배열 (복사 없는 view, 'date'는 YYYYMMDD 정수)"""
+        start, end = self._slices.get(ticker, (0, 0))
+        if column == 'date':
+            return self.dates[start:end]
+        return self.columns[column][start:end]
+    
+    def to_frame(self, ticker: str) -> pd.DataFrame:
+        """종목별 DataFrame (get_daily_prices와 동일한 컬럼 구성)"""
+        if ticker not in self:
+            return pd.DataFrame()
+        
+        data = {'date': int_dates_to_datetime64(self.view(ticker, 'date'))}
+        for col in self.COLUMNS:
+            data[col] = self.view(ticker, col)
+        return pd.DataFrame(data, copy=False)
+    
+    def to_multi_frame(self) -> pd.DataFrame:
+        """전체 종목 DataFrame (MultiIndex: ticker, date)"""
+        index = pd.MultiIndex.from_arrays([
+            pd.Categorical.from_codes(self.codes, categories=self.tickers),
+            int_dates_to_datetime64(self.dates)
+        ], names=['ticker', 'date'])
+        return pd.DataFrame(self.columns, index=index, copy=False)
+
+
 class StockDatabase:
     """주식 데이터 관리 (Peewee ORM)"""
     
@@ -26,6 +206,10 @@ class StockDatabase:
         """DB 연결 종료"""
         close_db()
     
+    def connect(self):
+        """sqlite3 연결 객체 반환 (직접 SQL 실행용)"""
+        return db.connection()
+    
     # ========================================
     # 일봉 데이터
     # ========================================
@@ -35,9 +219,9 @@ class StockDatabase:
                           close: float, volume: int) -> bool:
         """일봉 데이터 저장"""
         try:
+            self.save_tickers([(ticker, ticker_name)])
             DailyPrice.insert(
                 ticker=ticker,
-                ticker_name=ticker_name,
                 date=date,
                 open=open_price,
                 high=high,
@@ -51,7 +235,8 @@ class StockDatabase:
                     DailyPrice.high: high,
                     DailyPrice.low: low,
                     DailyPrice.close: close,
-                    DailyPrice.volume: volume
+                    DailyPrice.volume: volume,
+                    DailyPrice.created_at: datetime.now()
                 }
             ).execute()
             return True
@@ -59,73 +244,168 @@ class StockDatabase:
             print(f"❌ 일봉 데이터 저장 실패 ({ticker}): {e}")
             return False
     
-    def insert_daily_prices_bulk(self, data: List[tuple]) -> bool:
-        """일봉 데이터 대량 저장"""
+    def _upsert_many(self, model, fields: list, rows: List[tuple],
+                     conflict_target: list, update_fields: list) -> Dict:
+        """
+        다중 행 UPSERT (INSERT ... ON CONFLICT DO UPDATE를 executemany로 일괄 실행)
+        
+        Args:
+            model: Peewee 모델
+            fields: rows 튜플의 필드 순서
+            rows: 저장할 행 튜플 리스트 (created_at 필드가 있으면 현재 시각 자동 추가)
+            conflict_target: 충돌 기준 필드 (UNIQUE 인덱스, 첫 필드는 종목 코드)
+            update_fields: 충돌 시 갱신할 필드
+        
+        Returns:
+            {'inserted': 신규 행 수, 'updated': 갱신 행 수}
+        """
+        result = {'inserted': 0, 'updated': 0}
+        if not rows:
+            return result
+        
+        table = model._meta.table_name
+        columns = [f.column_name for f in fields]
+        stamp = ('created_at' in model._meta.fields
+                 and all(f.name != 'created_at' for f in fields))
+        if stamp:
+            columns.append('created_at')
+        key_columns = [f.column_name for f in conflict_target]
+        sql = (
+            f'INSERT INTO "{table}" ({", ".join(columns)}) '
+            f'VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT ({", ".join(key_columns)}) DO UPDATE SET '
+            + ', '.join(f'{f.column_name} = excluded.{f.column_name}' for f in update_fields)
+        )
+        
+        # 신규/갱신 건수는 이번 배치의 키 중 이미 저장된 키 수로 계산 (UNIQUE 인덱스 조회)
+        # (Peewee 필드는 == 연산자가 오버로드되어 있으므로 이름으로 위치를 찾음)
+        names = [f.name for f in fields]
+        key_pos = [names.index(f.name) for f in conflict_target]
+        keys = list({tuple(row[i] for i in key_pos) for row in rows})
+        key_names = [f'k{i}' for i in range(len(key_columns))]
+        count_sql = (
+            f'WITH k({", ".join(key_names)}) AS (SELECT '
+            + ', '.join(f"json_extract(value, '$[{i}]')" for i in range(len(key_columns)))
+            + f' FROM json_each(?)) SELECT COUNT(*) FROM "{table}" t JOIN k ON '
+            + ' AND '.join(f't.{col} = k.{name}' for col, name in zip(key_columns, key_names))
+        )
+        
+        extra = (str(datetime.now()),) if stamp else ()
+        conn = self.connect()
+        with db.atomic():
+            existing = conn.execute(count_sql, (json.dumps(keys, default=str),)).fetchone()[0]
+            conn.executemany(sql, (tuple(row) + extra for row in rows))
+        
+        result['inserted'] = len(keys) - existing
+        result['updated'] = existing
+        self.track_bulk_change(table, result['inserted'])
+        return result
+    
+    def insert_daily_prices_bulk(self, data: List[tuple]) -> Optional[Dict]:
+        """
+        일봉 데이터 대량 저장 (다중 행 UPSERT)
+        
+        Args:
+            data: (ticker, ticker_name, date, open, high, low, close, volume) 튜플 리스트
+        
+        Returns:
+            {'inserted': 신규 행 수, 'updated': 갱신 행 수} 또는 실패 시 None
+        """
         try:
-            with db.atomic():
-                for row in data:
-                    ticker, ticker_name, date, open_price, high, low, close, volume = row
-                    DailyPrice.insert(
-                        ticker=ticker,
-                        ticker_name=ticker_name,
-                        date=date,
-                        open=open_price,
-                        high=high,
-                        low=low,
-                        close=close,
-                        volume=volume
-                    ).on_conflict(
-                        conflict_target=[DailyPrice.ticker, DailyPrice.date],
-                        update={
-                            DailyPrice.open: open_price,
-                            DailyPrice.high: high,
-                            DailyPrice.low: low,
-                            DailyPrice.close: close,
-                            DailyPrice.volume: volume
-                        }
-                    ).execute()
-            return True
+            self.save_tickers(self._ticker_names(data))
+            return self._upsert_many(
+                DailyPrice,
+                [DailyPrice.ticker, DailyPrice.date,
+                 DailyPrice.open, DailyPrice.high, DailyPrice.low,
+                 DailyPrice.close, DailyPrice.volume],
+                [(row[0],) + tuple(row[2:8]) for row in data],
+                conflict_target=[DailyPrice.ticker, DailyPrice.date],
+                # 저장 시각도 갱신 (장중에 저장된 잠정 일봉인지 판단용)
+                update_fields=[DailyPrice.open, DailyPrice.high, DailyPrice.low,
+                               DailyPrice.close, DailyPrice.volume, DailyPrice.created_at]
+            )
         except Exception as e:
             print(f"❌ 일봉 데이터 대량 저장 실패: {e}")
-            return False
+            return None
     
     def get_daily_prices(self, ticker: str, days: int = 252) -> pd.DataFrame:
         """일봉 데이터 조회 (최근 N일)"""
-        query = (DailyPrice
-                 .select(DailyPrice.date, DailyPrice.open, DailyPrice.high,
-                        DailyPrice.low, DailyPrice.close, DailyPrice.volume)
-                 .where(DailyPrice.ticker == ticker)
-                 .order_by(DailyPrice.date.desc())
-                 .limit(days))
-        
-        data = list(query.dicts())
-        if not data:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(data)
-        df = df.sort_values('date').reset_index(drop=True)
-        df['date'] = pd.to_datetime(df['date'])
-        return df
+        return self.load_daily_prices_columnar([ticker], days=days).to_frame(ticker)
     
     def get_daily_prices_range(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
         """일봉 데이터 조회 (날짜 범위)"""
-        query = (DailyPrice
-                 .select(DailyPrice.date, DailyPrice.open, DailyPrice.high,
-                        DailyPrice.low, DailyPrice.close, DailyPrice.volume)
-                 .where(
-                     (DailyPrice.ticker == ticker) &
-                     (DailyPrice.date >= start_date) &
-                     (DailyPrice.date <= end_date)
-                 )
-                 .order_by(DailyPrice.date))
+        columns = self.load_daily_prices_columnar([ticker], start_date=start_date, end_date=end_date)
+        return columns.to_frame(ticker)
+    
+    def load_daily_prices_columnar(self, tickers: List[str] = None, days: int = None,
+                                   start_date: str = None, end_date: str = None) -> DailyPriceColumns:
+        """
+        여러 종목 일봉 데이터를 한 번의 쿼리로 NumPy 배열에 적재
         
-        data = list(query.dicts())
-        if not data:
-            return pd.DataFrame()
+        Args:
+            tickers: 종목 코드 리스트 (None이면 저장된 전체 종목)
+            days: 종목별 최근 N일만 조회 (None이면 전체)
+            start_date: 시작일 (YYYY-MM-DD, 포함)
+            end_date: 종료일 (YYYY-MM-DD, 포함)
         
-        df = pd.DataFrame(data)
-        df['date'] = pd.to_datetime(df['date'])
-        return df
+        Returns:
+            DailyPriceColumns (OHLC 누락값은 종가, 거래량 누락값은 0으로 채움)
+        """
+        if tickers is None:
+            tickers = sorted(self.get_all_tickers())
+        tickers = list(dict.fromkeys(tickers))  # 순서 유지 중복 제거
+        
+        if not tickers:
+            return DailyPriceColumns([], np.empty(0, dtype=_DAILY_ROW_DTYPE))
+        
+        sql, params = self._daily_columnar_sql(tickers, days, start_date, end_date)
+        cursor = self.connect().execute(sql, params)
+        rows = np.fromiter(cursor, dtype=_DAILY_ROW_DTYPE)
+        return DailyPriceColumns(tickers, rows)
+    
+    @staticmethod
+    def _daily_columnar_sql(tickers: List[str], days: int = None, start_date: str = None,
+                            end_date: str = None) -> tuple:
+        """load_daily_prices_columnar 쿼리 (sql, params)"""
+        conditions = []
+        params = [json.dumps(tickers)]
+        if start_date:
+            conditions.append('dp.date >= ?')
+            params.append(str(start_date)[:10])
+        if end_date:
+            conditions.append('dp.date <= ?')
+            params.append(str(end_date)[:10])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        # 종목 리스트는 json_each로 한 번에 전달 (SQLite 변수 개수 제한 회피)
+        # 입력 순서가 곧 종목 인덱스(code)
+        sql = f'''
+            WITH t AS (
+                SELECT CAST(key AS INTEGER) AS code, value AS ticker FROM json_each(?)
+            )
+            SELECT t.code AS code,
+                   CAST(REPLACE(dp.date, '-', '') AS INTEGER) AS ymd,
+                   COALESCE(dp.open, dp.close) AS open,
+                   COALESCE(dp.high, dp.close) AS high,
+                   COALESCE(dp.low, dp.close) AS low,
+                   dp.close AS close,
+                   COALESCE(dp.volume, 0) AS volume,
+                   ROW_NUMBER() OVER (PARTITION BY t.code ORDER BY dp.date DESC) AS rn
+            FROM t
+            JOIN daily_prices dp ON dp.ticker = t.ticker
+            {where}
+        '''
+        limit = 'WHERE rn <= ?' if days else ''
+        if days:
+            params.append(int(days))
+        
+        sql = f'''
+            SELECT code, ymd, open, high, low, close, volume
+            FROM ({sql})
+            {limit}
+            ORDER BY code, ymd
+        '''
+        return sql, params
     
     def get_latest_date(self, ticker: str) -> Optional[str]:
         """해당 종목의 최신 데이터 날짜"""
@@ -135,6 +415,16 @@ class StockDatabase:
                   .scalar())
         return str(result) if result else None
     
+    def get_daily_price_saved_at(self, ticker: str, date: str) -> Optional[datetime]:
+        """일봉 저장 시각 (마지막으로 저장/갱신한 시각, 없으면 None)"""
+        result = (DailyPrice
+                  .select(DailyPrice.created_at)
+                  .where((DailyPrice.ticker == ticker) & (DailyPrice.date == date))
+                  .scalar())
+        if isinstance(result, str):
+            result = datetime.fromisoformat(result)
+        return result
+    
     # ========================================
     # 분봉 데이터
     # ========================================
@@ -143,9 +433,9 @@ class StockDatabase:
                            datetime_str: str, price: float, volume: int = 0) -> bool:
         """분봉 데이터 저장"""
         try:
+            self.save_tickers([(ticker, ticker_name)])
             MinutePrice.insert(
                 ticker=ticker,
-                ticker_name=ticker_name,
                 datetime=datetime_str,
                 price=price,
                 volume=volume
@@ -158,26 +448,65 @@ class StockDatabase:
             print(f"❌ 분봉 데이터 저장 실패 ({ticker}): {e}")
             return False
     
-    def insert_minute_prices_bulk(self, data: List[tuple]) -> bool:
-        """분봉 데이터 대량 저장"""
+    def insert_minute_prices_bulk(self, data: List[tuple]) -> Optional[Dict]:
+        """
+        분봉 데이터 대량 저장 (다중 행 UPSERT)
+        
+        Args:
+            data: (ticker, ticker_name, datetime, price, volume) 튜플 리스트
+                  미국 주식은 (..., datetime_utc, market_date)까지 포함 가능
+        
+        Returns:
+            {'inserted': 신규 행 수, 'updated': 갱신 행 수} 또는 실패 시 None
+        """
+        # datetime_utc/market_date는 값이 있는 행만 갱신 (없는 행으로 기존 값을 지우지 않음)
+        base = [MinutePrice.ticker, MinutePrice.datetime, MinutePrice.price, MinutePrice.volume]
+        extended = base + [MinutePrice.datetime_utc, MinutePrice.market_date]
+        groups = [
+            (extended, [(row[0],) + tuple(row[2:7]) for row in data if len(row) >= 7]),
+            (base, [(row[0],) + tuple(row[2:5]) for row in data if len(row) < 7]),
+        ]
+        
         try:
-            with db.atomic():
-                for row in data:
-                    ticker, ticker_name, datetime_str, price, volume = row
-                    MinutePrice.insert(
-                        ticker=ticker,
-                        ticker_name=ticker_name,
-                        datetime=datetime_str,
-                        price=price,
-                        volume=volume
-                    ).on_conflict(
-                        conflict_target=[MinutePrice.ticker, MinutePrice.datetime],
-                        update={MinutePrice.price: price, MinutePrice.volume: volume}
-                    ).execute()
-            return True
+            self.save_tickers(self._ticker_names(data))
+            result = {'inserted': 0, 'updated': 0}
+            for fields, rows in groups:
+                counts = self._upsert_many(
+                    MinutePrice, fields, rows,
+                    conflict_target=[MinutePrice.ticker, MinutePrice.datetime],
+                    update_fields=fields[2:]
+                )
+                result['inserted'] += counts['inserted']
+                result['updated'] += counts['updated']
+            return result
         except Exception as e:
             print(f"❌ 분봉 데이터 대량 저장 실패: {e}")
-            return False
+            return None
+    
+    def insert_minute_bars_bulk(self, bars: List[tuple]) -> Optional[Dict]:
+        """
+        1분봉 OHLCV 대량 저장 (다중 행 UPSERT, 단일 트랜잭션)
+        
+        Args:
+            bars: (ticker, ticker_name, datetime, open, high, low, close, volume) 튜플 리스트
+        
+        Returns:
+            {'inserted': 신규 행 수, 'updated': 갱신 행 수} 또는 실패 시 None
+        """
+        fields = [MinutePrice.ticker, MinutePrice.datetime,
+                  MinutePrice.open, MinutePrice.high, MinutePrice.low,
+                  MinutePrice.price, MinutePrice.volume]
+        
+        try:
+            self.save_tickers(self._ticker_names(bars))
+            return self._upsert_many(
+                MinutePrice, fields, [(row[0],) + tuple(row[2:8]) for row in bars],
+                conflict_target=[MinutePrice.ticker, MinutePrice.datetime],
+                update_fields=fields[2:]
+            )
+        except Exception as e:
+            print(f"❌ 분봉 OHLCV 대량 저장 실패: {e}")
+            return None
     
     def get_minute_prices(self, ticker: str, hours: int = 24) -> pd.DataFrame:
         """분봉 데이터 조회 (최근 N시간)"""
@@ -199,6 +528,84 @@ class StockDatabase:
         df['datetime'] = pd.to_datetime(df['datetime'])
         return df
     
+    def get_recent_minute_prices(self, ticker: str, limit: int = 390) -> List[tuple]:
+        """최근 분봉 N개 [(datetime, price), ...] (시각 순)"""
+        rows = self.connect().execute(RECENT_MINUTES_SQL, (ticker, limit)).fetchall()
+        rows.reverse()
+        return rows
+    
+    # ========================================
+    # 종목 정보
+    # ========================================
+    
+    @staticmethod
+    def _ticker_names(rows: List[tuple]) -> List[tuple]:
+        """(ticker, ticker_name, ...) 행 → 종목별 (ticker, ticker_name) (마지막 이름 우선)"""
+        return list({row[0]: (row[0], row[1]) for row in rows}.values())
+    
+    def save_tickers(self, tickers: List[tuple]) -> int:
+        """
+        종목 정보 저장 (없으면 추가, 이름/국가는 값이 있을 때만 갱신)
+        
+        Args:
+            tickers: (symbol, name) 또는 (symbol, name, country) 튜플 리스트
+                     (종목 코드와 같은 이름은 무시, 국가가 없으면 종목 코드로 추정)
+        
+        Returns:
+            저장한 종목 수 (이 프로세스에서 같은 값으로 저장한 종목은 제외)
+        """
+        now = str(datetime.now())
+        params = []
+        for row in tickers:
+            symbol = row[0]
+            name = (row[1] or '').strip() or None
+            if name == symbol:
+                name = None
+            given_country = row[2] if len(row) > 2 and row[2] else None
+            
+            key = (self.db_path, symbol)
+            saved = _saved_tickers.get(key)
+            if saved and name in (None, saved[0]) and given_country in (None, saved[1]):
+                continue
+            
+            country = given_country or ('KR' if symbol[:1].isdigit() else 'US')
+            params.append({
+                'symbol': symbol, 'name': name, 'country': country,
+                'currency': CURRENCIES.get(country), 'now': now,
+                'given_country': given_country, 'given_currency': CURRENCIES.get(given_country),
+            })
+        
+        if not params:
+            return 0
+        self.connect().executemany(_TICKER_UPSERT_SQL, params)
+        
+        for row in (Ticker
+                    .select(Ticker.symbol, Ticker.name, Ticker.country)
+                    .where(Ticker.symbol.in_([p['symbol'] for p in params]))
+                    .tuples()):
+            _saved_tickers[(self.db_path, row[0])] = (row[1], row[2])
+        return len(params)
+    
+    def get_ticker(self, symbol: str) -> Optional[Dict]:
+        """종목 정보 ({'symbol', 'name', 'country', 'exchange', 'currency'}, 없으면 None)"""
+        ticker = Ticker.get_or_none(Ticker.symbol == symbol)
+        if not ticker:
+            return None
+        return {
+            'symbol': ticker.symbol,
+            'name': ticker.name,
+            'country': ticker.country,
+            'exchange': ticker.exchange,
+            'currency': ticker.currency,
+        }
+    
+    def get_ticker_names(self, symbols: List[str] = None) -> Dict[str, str]:
+        """종목명 {symbol: name} (이름이 저장된 종목만, symbols가 None이면 전체)"""
+        query = Ticker.select(Ticker.symbol, Ticker.name).where(Ticker.name.is_null(False))
+        if symbols is not None:
+            query = query.where(Ticker.symbol.in_(list(symbols)))
+        return dict(query.tuples())
+    
     # ========================================
     # 통계 캐시
     # ========================================
@@ -206,27 +613,36 @@ class StockDatabase:
     def update_statistics_cache(self, ticker: str, date: str,
                                 mean_return: float, std_dev: float,
                                 current_price: float, target_1sigma: float,
-                                target_2sigma: float) -> bool:
+                                target_2sigma: float, ticker_name: str = None,
+                                country: str = None, data_date: str = None,
+                                target_05sigma: float = None, drop_05x: float = None,
+                                drop_1x: float = None, drop_2x: float = None) -> bool:
         """통계 캐시 업데이트"""
+        values = {
+            StatisticsCache.mean_return: mean_return,
+            StatisticsCache.std_dev: std_dev,
+            StatisticsCache.current_price: current_price,
+            StatisticsCache.target_1sigma: target_1sigma,
+            StatisticsCache.target_2sigma: target_2sigma,
+        }
+        # 선택 항목은 값이 있을 때만 저장 (기존 값 유지)
+        optional = {
+            StatisticsCache.ticker_name: ticker_name,
+            StatisticsCache.country: country,
+            StatisticsCache.data_date: str(data_date)[:10] if data_date else None,
+            StatisticsCache.target_05sigma: target_05sigma,
+            StatisticsCache.drop_05x: drop_05x,
+            StatisticsCache.drop_1x: drop_1x,
+            StatisticsCache.drop_2x: drop_2x,
+        }
+        values.update({field: value for field, value in optional.items() if value is not None})
+        
         try:
             StatisticsCache.insert(
-                ticker=ticker,
-                date=date,
-                mean_return=mean_return,
-                std_dev=std_dev,
-                current_price=current_price,
-                target_1sigma=target_1sigma,
-                target_2sigma=target_2sigma
+                {StatisticsCache.ticker: ticker, StatisticsCache.date: date, **values}
             ).on_conflict(
                 conflict_target=[StatisticsCache.ticker, StatisticsCache.date],
-                update={
-                    StatisticsCache.mean_return: mean_return,
-                    StatisticsCache.std_dev: std_dev,
-                    StatisticsCache.current_price: current_price,
-                    StatisticsCache.target_1sigma: target_1sigma,
-                    StatisticsCache.target_2sigma: target_2sigma,
-                    StatisticsCache.updated_at: datetime.now()
-                }
+                update={**values, StatisticsCache.updated_at: datetime.now()}
             ).execute()
             return True
         except Exception as e:
@@ -244,16 +660,87 @@ class StockDatabase:
                 (StatisticsCache.date == date)
             )
             return {
+                'ticker_name': cache.ticker_name,
+                'country': cache.country,
+                'data_date': str(cache.data_date) if cache.data_date else None,
                 'mean_return': cache.mean_return,
                 'std_dev': cache.std_dev,
+                'std_return': cache.std_dev,
                 'current_price': cache.current_price,
                 'target_1sigma': cache.target_1sigma,
                 'target_2sigma': cache.target_2sigma,
+                'target_05x': cache.target_05sigma,
+                'target_1x': cache.target_1sigma,
+                'target_2x': cache.target_2sigma,
+                'drop_05x': cache.drop_05x,
+                'drop_1x': cache.drop_1x,
+                'drop_2x': cache.drop_2x,
                 'updated_at': str(cache.updated_at)
             }
         except StatisticsCache.DoesNotExist:
             return None
     
+    # ========================================
+    # 롤링 변동성 상태
+    # ========================================
+    
+    def get_volatility_state(self, ticker: str, window: int) -> Optional[Dict]:
+        """롤링 변동성 상태 조회"""
+        state = (VolatilityState
+                 .select()
+                 .where((VolatilityState.ticker == ticker) &
+                        (VolatilityState.window == window))
+                 .dicts()
+                 .first())
+        if state:
+            state['first_date'] = str(state['first_date']) if state['first_date'] else None
+            state['last_date'] = str(state['last_date']) if state['last_date'] else None
+        return state
+    
+    def get_volatility_states(self, tickers: List[str], window: int) -> Dict[str, Dict]:
+        """여러 종목 롤링 변동성 상태 조회 ({ticker: state})"""
+        query = (VolatilityState
+                 .select()
+                 .where((VolatilityState.ticker.in_(tickers)) &
+                        (VolatilityState.window == window))
+                 .dicts())
+        states = {}
+        for state in query:
+            state['first_date'] = str(state['first_date']) if state['first_date'] else None
+            state['last_date'] = str(state['last_date']) if state['last_date'] else None
+            states[state['ticker']] = state
+        return states
+    
+    def save_volatility_states(self, states: List[Dict]) -> Optional[Dict]:
+        """롤링 변동성 상태 저장 (다중 행 UPSERT)"""
+        fields = [VolatilityState.ticker, VolatilityState.window, VolatilityState.count,
+                  VolatilityState.sum_return, VolatilityState.sum_sq_return,
+                  VolatilityState.first_date, VolatilityState.last_date,
+                  VolatilityState.last_close, VolatilityState.updated_at]
+        now = str(datetime.now())
+        rows = [(s['ticker'], s['window'], s['count'], s['sum_return'], s['sum_sq_return'],
+                 s['first_date'], s['last_date'], s['last_close'], now) for s in states]
+        
+        try:
+            return self._upsert_many(
+                VolatilityState, fields, rows,
+                conflict_target=[VolatilityState.ticker, VolatilityState.window],
+                update_fields=fields[2:]
+            )
+        except Exception as e:
+            print(f"❌ 롤링 변동성 상태 저장 실패: {e}")
+            return None
+    
+    def get_closes_from(self, ticker: str, start_date: str, limit: int = 2) -> List[tuple]:
+        """기준일부터 (날짜, 종가) N개 조회 (윈도우에서 빠지는 수익률 계산용)"""
+        query = (DailyPrice
+                 .select(DailyPrice.date, DailyPrice.close)
+                 .where((DailyPrice.ticker == ticker) & (DailyPrice.date >= start_date))
+                 .order_by(DailyPrice.date)
+                 .limit(limit)
+                 .tuples())
+        return [(str(d), close) for d, close in query]
+    
     # ========================================
     # 유틸리티
     # ========================================
@@ -290,13 +777,47 @@ class StockDatabase:
             }
         }
     
-    def cleanup_old_minute_data(self, days: int = 30) -> int:
-        """오래된 분봉 데이터 삭제"""
+    def analyze(self, *tables: str):
+        """쿼리 플래너 통계 갱신 (테이블 미지정 시 전체, 인덱스별 표본만 읽어 빠르게)"""
+        conn = self.connect()
+        conn.execute(f'PRAGMA analysis_limit = {ANALYZE_SAMPLE_ROWS}')
+        if not tables:
+            conn.execute('ANALYZE')
+            _changed_rows.clear()
+        for table in tables:
+            conn.execute(f'ANALYZE "{table}"')
+            _changed_rows.pop(table, None)
+    
+    def track_bulk_change(self, table: str, rows: int):
+        """대량 저장/삭제 행 수 누적, ANALYZE_MIN_ROWS 이상이면 해당 테이블 ANALYZE"""
+        total = _changed_rows.get(table, 0) + rows
+        _changed_rows[table] = total
+        if total >= ANALYZE_MIN_ROWS:
+            self.analyze(table)
+    
+    def cleanup_old_minute_data(self, days: int = 30, archive: bool = True) -> int:
+        """
+        오래된 분봉 데이터 정리
+        
+        Args:
+            archive: True면 삭제 전에 보관 파일로 이동 (minute_archive), False면 삭제만
+        """
+        if archive:
+            from minute_archive import archive_minute_data
+            return archive_minute_data(days, db=self)['rows']
+        
         cutoff_date = datetime.now() - timedelta(days=days)
         deleted = MinutePrice.delete().where(MinutePrice.datetime < cutoff_date).execute()
         print(f"✅ {deleted}개 오래된 분봉 데이터 삭제 ({days}일 이전)")
         return deleted
     
+    def delete_minute_prices_before(self, ticker: str, before: str) -> int:
+        """종목 분봉 중 before(한국시간 'YYYY-MM-DD HH:MM:SS') 이전 삭제"""
+        return (MinutePrice
+                .delete()
+                .where((MinutePrice.ticker == ticker) & (MinutePrice.datetime < before))
+                .execute())
+    
     def backup_database(self, backup_path: str) -> bool:
         """데이터베이스 백업"""
         import shutil
@@ -498,6 +1019,19 @@ class StockDatabase:
                  ))
         return [w.ticker for w in query]
     
+    def get_watched_stocks(self) -> Dict[str, Dict]:
+        """
+        활성 사용자의 활성 관심 종목 (중복 제거, 먼저 등록한 사용자의 국가 우선)
+        
+        Returns:
+            {ticker: {'name': 종목명, 'country': 국가}}
+        """
+        stocks = {}
+        for ticker, name, country in self.connect().execute(WATCHED_STOCKS_SQL):
+            if ticker not in stocks:
+                stocks[ticker] = {'name': name or ticker, 'country': country or 'US'}
+        return stocks
+    
     def get_user_watchlist_with_names(self, user_name: str) -> List[Dict]:
         """사용자 관심 종목 목록 (종목명 + 국가 + 투자금액 포함)"""
         user = self.get_user(user_name)
@@ -512,15 +1046,11 @@ class StockDatabase:
                  ))
         
         watchlist = []
+        query = list(query)
+        names = self.get_ticker_names([w.ticker for w in query])
         for w in query:
-            # daily_prices에서 이름 가져오기 (없으면 watchlist 이름 사용)
-            dp = (DailyPrice
-                  .select(DailyPrice.ticker_name)
-                  .where(DailyPrice.ticker == w.ticker)
-                  .order_by(DailyPrice.date.desc())
-                  .first())
-            
-            name = w.name or (dp.ticker_name if dp else w.ticker)
+            # 관심 종목 이름 → 종목 정보 이름 → 종목 코드 순
+            name = w.name or names.get(w.ticker, w.ticker)
             
             watchlist.append({
                 'ticker': w.ticker,
@@ -575,6 +1105,108 @@ class StockDatabase:
         Setting.delete().where(Setting.key == key).execute()
         print(f"✅ 설정 삭제: {key}")
     
+    # ========================================
+    # 거래소 코드
+    # ========================================
+    
+    def get_exchange_codes(self) -> Dict[str, str]:
+        """저장된 해외 종목 거래소 코드 전체 조회 ({ticker: exchange})"""
+        return {ticker: exchange for ticker, exchange in
+                ExchangeCode.select(ExchangeCode.ticker, ExchangeCode.exchange).tuples()}
+    
+    def get_exchange_code(self, ticker: str) -> Optional[str]:
+        """해외 종목 거래소 코드 조회"""
+        row = ExchangeCode.get_or_none(ExchangeCode.ticker == ticker.upper())
+        return row.exchange if row else None
+    
+    def save_exchange_code(self, ticker: str, exchange: str) -> bool:
+        """해외 종목 거래소 코드 저장"""
+        try:
+            ExchangeCode.insert(
+                ticker=ticker.upper(),
+                exchange=exchange
+            ).on_conflict(
+                conflict_target=[ExchangeCode.ticker],
+                update={
+                    ExchangeCode.exchange: exchange,
+                    ExchangeCode.updated_at: datetime.now()
+                }
+            ).execute()
+            return True
+        except Exception as e:
+            print(f"❌ 거래소 코드 저장 실패 ({ticker}): {e}")
+            return False
+    
+    # ========================================
+    # 종목 목록 스냅샷
+    # ========================================
+    
+    def replace_stock_listings(self, country: str, rows: List[tuple]) -> int:
+        """
+        국가별 종목 목록 교체 (한 트랜잭션: 읽는 쪽은 이전 목록 또는 새 목록만 봄)
+        
+        Args:
+            rows: [(ticker, name, market), ...]
+        
+        Returns:
+            새 스냅샷 버전
+        """
+        key = STOCK_LISTING_VERSION_KEY.format(country.lower())
+        now = datetime.now()
+        
+        with db.atomic():
+            StockListing.delete().where(StockListing.country == country).execute()
+            self._upsert_many(
+                StockListing,
+                [StockListing.country, StockListing.ticker, StockListing.name,
+                 StockListing.market, StockListing.updated_at],
+                [(country, ticker, name, market, str(now)) for ticker, name, market in rows],
+                conflict_target=[StockListing.country, StockListing.ticker],
+                update_fields=[StockListing.name, StockListing.market]
+            )
+            Setting.insert(
+                key=key, value='1', description=f'{country} 종목 목록 버전'
+            ).on_conflict(
+                conflict_target=[Setting.key],
+                update={
+                    Setting.value: Setting.value.cast('INTEGER') + 1,
+                    Setting.updated_at: now
+                }
+            ).execute()
+            return self.get_stock_listing_version(country)
+    
+    def get_stock_listings(self, country: str) -> List[tuple]:
+        """국가별 종목 목록 ([(ticker, name, market), ...])"""
+        return list(StockListing
+                    .select(StockListing.ticker, StockListing.name, StockListing.market)
+                    .where(StockListing.country == country)
+                    .order_by(StockListing.id)
+                    .tuples())
+    
+    def get_stock_listing_version(self, country: str) -> int:
+        """종목 목록 스냅샷 버전 (없으면 0)"""
+        setting = Setting.get_or_none(
+            Setting.key == STOCK_LISTING_VERSION_KEY.format(country.lower()))
+        return int(setting.value) if setting else 0
+    
+    def claim_stock_listing_refresh(self, country: str, max_age_hours: float) -> bool:
+        """
+        종목 목록 갱신 권한 획득 (마지막 시도 후 max_age_hours 경과 시 한 프로세스만 True)
+        """
+        key = STOCK_LISTING_CHECKED_KEY.format(country.lower())
+        now = datetime.now()
+        threshold = (now - timedelta(hours=max_age_hours)).isoformat()
+        
+        with db.atomic():
+            Setting.insert(
+                key=key, value='', description=f'{country} 종목 목록 갱신 시각'
+            ).on_conflict_ignore().execute()
+            claimed = (Setting
+                       .update(value=now.isoformat(), updated_at=now)
+                       .where((Setting.key == key) & (Setting.value < threshold))
+                       .execute())
+        return claimed == 1
+    
     # ========================================
     # 알림 이력
     # ========================================
@@ -587,11 +1219,10 @@ class StockDatabase:
         today = now.strftime('%Y-%m-%d')
         
         try:
+            self.save_tickers([(ticker, ticker_name, country)])
             AlertHistory.insert(
                 user=user_id,
                 ticker=ticker,
-                ticker_name=ticker_name,
-                country=country,
                 alert_level=alert_level,
                 alert_date=today,
                 target_price=target_price,
@@ -604,22 +1235,66 @@ class StockDatabase:
         except IntegrityError:
             return False
     
-    def get_user_alerts(self, user_id: int, ticker: str = None, limit: int = 50) -> List[Dict]:
-        """사용자 알림 내역 조회"""
-        query = AlertHistory.select()
-        
-        if ticker:
-            query = query.where(
-                (AlertHistory.user == user_id) &
-                (AlertHistory.ticker == ticker)
-            )
-        else:
-            query = query.where(AlertHistory.user == user_id)
+    def record_alert(self, user_id: int, ticker: str, ticker_name: str,
+                     country: str, alert_level: str, target_price: float,
+                     current_price: float, drop_rate: float, sent: bool = False,
+                     alert_date: str = None) -> bool:
+        """
+        알림 이력 기록 (사용자+종목+날짜+레벨 기준 중복이면 False)
+        """
+        now = datetime.now()
         
-        query = query.order_by(AlertHistory.alert_time.desc()).limit(limit)
+        try:
+            self.save_tickers([(ticker, ticker_name, country)])
+            AlertHistory.insert(
+                user=user_id,
+                ticker=ticker,
+                alert_level=alert_level,
+                alert_date=alert_date or now.strftime('%Y-%m-%d'),
+                target_price=target_price,
+                current_price=current_price,
+                drop_rate=drop_rate,
+                alert_time=now,
+                sent=sent
+            ).execute()
+            return True
+        except IntegrityError:
+            return False
+    
+    def get_alert_subscribers(self) -> Dict[str, List[tuple]]:
+        """
+        종목별 알림 대상 사용자 조회 (활성 사용자 + ntfy 토픽 + 활성 관심 종목)
         
+        Returns:
+            {ticker: [(user_id, ntfy_topic, investment_amount), ...]}
+        """
+        subscribers = {}
+        for ticker, user_id, topic, investment_amount in self._alert_subscribers_query():
+            subscribers.setdefault(ticker, []).append((user_id, topic, investment_amount))
+        return subscribers
+    
+    @staticmethod
+    def _alert_subscribers_query():
+        return (UserWatchlist
+                .select(UserWatchlist.ticker, User.id, User.ntfy_topic,
+                        UserWatchlist.investment_amount)
+                .join(User)
+                .where((User.enabled == True) &
+                       (User.notification_enabled == True) &
+                       (User.ntfy_topic.is_null(False)) &
+                       (UserWatchlist.enabled == True))
+                .order_by(UserWatchlist.ticker, User.id)
+                .tuples())
+    
+    def get_subscribers_version(self) -> int:
+        """알림 대상 변경 버전 (users/user_watchlist 변경 시 트리거로 증가)"""
+        setting = Setting.get_or_none(Setting.key == SUBSCRIBERS_VERSION_KEY)
+        return int(setting.value) if setting else 0
+    
+    def get_user_alerts(self, user_id: int, ticker: str = None, limit: int = 50) -> List[Dict]:
+        """사용자 알림 내역 조회"""
         alerts = []
-        for alert in query:
+        for alert in self._user_alerts_query(user_id, ticker, limit):
             # 투자금액 가져오기
             watchlist = (UserWatchlist
                         .select(UserWatchlist.investment_amount)
@@ -638,7 +1313,7 @@ class StockDatabase:
             alerts.append({
                 'id': alert.id,
                 'ticker': alert.ticker,
-                'ticker_name': alert.ticker_name,
+                'ticker_name': alert.ticker_name or alert.ticker,
                 'country': alert.country,
                 'alert_level': alert.alert_level,
                 'alert_date': alert.alert_date,
@@ -652,6 +1327,34 @@ class StockDatabase:
             })
         return alerts
     
+    @staticmethod
+    def _user_alerts_query(user_id: int, ticker: str = None, limit: int = 50):
+        query = (AlertHistory
+                 .select(AlertHistory, Ticker.name.alias('ticker_name'),
+                         Ticker.country.alias('country'))
+                 .join(Ticker, JOIN.LEFT_OUTER, on=(AlertHistory.ticker == Ticker.symbol))
+                 .objects())
+        
+        if ticker:
+            query = query.where(
+                (AlertHistory.user == user_id) &
+                (AlertHistory.ticker == ticker)
+            )
+        else:
+            query = query.where(AlertHistory.user == user_id)
+        
+        return query.order_by(AlertHistory.alert_time.desc()).limit(limit)
+    
+    def get_ticker_alerts(self, tickers: List[str], limit: int = 50) -> List[tuple]:
+        """
+        종목별 최근 알림 (최신순)
+        
+        Returns:
+            [(ticker, ticker_name, country, alert_level, target_price, current_price,
+              drop_rate, alert_time, sent), ...]
+        """
+        return self.connect().execute(TICKER_ALERTS_SQL, (json.dumps(list(tickers)), limit)).fetchall()
+    
     def check_alert_exists(self, user_id: int, ticker: str, alert_date: str,
                           alert_level: str) -> bool:
         """알림 중복 체크"""
@@ -675,6 +1378,248 @@ class StockDatabase:
             by_ticker[ticker].append(alert)
         
         return by_ticker
+    
+    # ========================================
+    # 알림 발송 큐
+    # ========================================
+    
+    def enqueue_alert(self, user_id: int, ticker: str, ticker_name: str,
+                      country: str, alert_level: str, target_price: float,
+                      current_price: float, drop_rate: float, server: str,
+                      payload: Dict, alert_date: str = None, hold: bool = False) -> Optional[int]:
+        """
+        알림 이력 기록 + 발송 큐 등록 (한 트랜잭션)
+        
+        Args:
+            server: ntfy 서버 URL
+            payload: ntfy JSON body (topic 포함)
+            hold: True면 즉시 발송하지 않고 보류 (알림 시간 외, 아침 요약으로 발송)
+        
+        Returns:
+            발송 큐 ID (사용자+종목+날짜+레벨 기준 중복이면 None)
+        """
+        now = datetime.now()
+        
+        try:
+            with db.atomic():
+                self.save_tickers([(ticker, ticker_name, country)])
+                alert_id = AlertHistory.insert(
+                    user=user_id,
+                    ticker=ticker,
+                    alert_level=alert_level,
+                    alert_date=alert_date or now.strftime('%Y-%m-%d'),
+                    target_price=target_price,
+                    current_price=current_price,
+                    drop_rate=drop_rate,
+                    alert_time=now,
+                    sent=False
+                ).execute()
+                
+                return AlertOutbox.insert(
+                    alert=alert_id,
+                    user=user_id,
+                    server=server,
+                    topic=payload['topic'],
+                    payload=json.dumps(payload, ensure_ascii=False),
+                    status=OUTBOX_HELD if hold else OUTBOX_PENDING,
+                    next_attempt_at=now,
+                    created_at=now
+                ).execute()
+        except IntegrityError:
+            return None
+    
+    def enqueue_notification(self, user_id: Optional[int], server: str, payload: Dict) -> int:
+        """일반 알림 발송 큐 등록 (알림 이력 없음)"""
+        now = datetime.now()
+        return AlertOutbox.insert(
+            user=user_id,
+            server=server,
+            topic=payload['topic'],
+            payload=json.dumps(payload, ensure_ascii=False),
+            status=OUTBOX_PENDING,
+            next_attempt_at=now,
+            created_at=now
+        ).execute()
+    
+    def claim_outbox_batch(self, limit: int = 50, lease_seconds: int = 60) -> List[Dict]:
+        """
+        발송할 알림 가져오기 (가져간 알림은 lease_seconds 동안 다른 워커가 가져가지 않음)
+        
+        Returns:
+            [{'id', 'server', 'topic', 'payload', 'attempts'}, ...]
+        """
+        now = datetime.now()
+        
+        with db.atomic():
+            rows = list(AlertOutbox
+                        .select(AlertOutbox.id, AlertOutbox.server, AlertOutbox.topic,
+                                AlertOutbox.payload, AlertOutbox.attempts)
+                        .where((AlertOutbox.status == OUTBOX_PENDING) &
+                               (AlertOutbox.next_attempt_at <= now))
+                        .order_by(AlertOutbox.id)
+                        .limit(limit)
+                        .dicts())
+            if rows:
+                (AlertOutbox
+                 .update(next_attempt_at=now + timedelta(seconds=lease_seconds))
+                 .where(AlertOutbox.id.in_([row['id'] for row in rows]))
+                 .execute())
+        
+        for row in rows:
+            row['payload'] = json.loads(row['payload'])
+        return rows
+    
+    def complete_outbox(self, outbox_ids: List[int], status: str = OUTBOX_SENT) -> int:
+        """발송 완료 처리 (연결된 알림 이력도 sent=1)"""
+        if not outbox_ids:
+            return 0
+        
+        with db.atomic():
+            (AlertHistory
+             .update(sent=True)
+             .where(AlertHistory.id.in_(
+                 AlertOutbox.select(AlertOutbox.alert).where(AlertOutbox.id.in_(outbox_ids))))
+             .execute())
+            return (AlertOutbox
+                    .update(status=status, sent_at=datetime.now(), last_error=None)
+                    .where(AlertOutbox.id.in_(outbox_ids))
+                    .execute())
+    
+    def retry_outbox(self, outbox_ids: List[int], delay_seconds: float, error: str,
+                     max_attempts: int) -> int:
+        """
+        발송 실패 처리 (delay_seconds 후 재시도, max_attempts 도달 시 failed)
+        
+        Returns:
+            failed 처리된 알림 수
+        """
+        if not outbox_ids:
+            return 0
+        
+        with db.atomic():
+            (AlertOutbox
+             .update(attempts=AlertOutbox.attempts + 1,
+                     next_attempt_at=datetime.now() + timedelta(seconds=delay_seconds),
+                     last_error=error)
+             .where(AlertOutbox.id.in_(outbox_ids))
+             .execute())
+            return (AlertOutbox
+                    .update(status=OUTBOX_FAILED)
+                    .where(AlertOutbox.id.in_(outbox_ids) &
+                           (AlertOutbox.attempts >= max_attempts))
+                    .execute())
+    
+    def get_held_alerts(self) -> List[Dict]:
+        """
+        보류된 알림 조회 (알림 시간 외 발생, 아침 요약 대상)
+        
+        Returns:
+            [{'id', 'user_id', 'ticker', 'ticker_name', 'country', 'alert_level',
+              'target_price', 'current_price', 'drop_rate', 'alert_time'}, ...]
+        """
+        return list(self._held_alerts_query())
+    
+    @staticmethod
+    def _held_alerts_query():
+        return (AlertOutbox
+                .select(AlertOutbox.id, AlertOutbox.user.alias('user_id'),
+                        AlertHistory.ticker,
+                        fn.COALESCE(Ticker.name, AlertHistory.ticker).alias('ticker_name'),
+                        Ticker.country, AlertHistory.alert_level, AlertHistory.target_price,
+                        AlertHistory.current_price, AlertHistory.drop_rate,
+                        AlertHistory.alert_time)
+                .join(AlertHistory)
+                .join(Ticker, JOIN.LEFT_OUTER, on=(AlertHistory.ticker == Ticker.symbol))
+                .where(AlertOutbox.status == OUTBOX_HELD)
+                .order_by(AlertHistory.alert_time)
+                .dicts())
+    
+    def summarize_held_alerts(self, outbox_ids: List[int], user_id: Optional[int],
+                              server: Optional[str], payload: Optional[Dict]) -> Optional[int]:
+        """
+        보류 알림을 요약 알림 1건으로 대체 (한 트랜잭션)
+        
+        Args:
+            outbox_ids: 요약에 포함된 보류 알림 ID
+            server, payload: 요약 알림 (None이면 발송 없이 요약 처리만)
+        
+        Returns:
+            요약 알림 발송 큐 ID
+        """
+        with db.atomic():
+            summary_id = None
+            if payload:
+                summary_id = self.enqueue_notification(user_id, server, payload)
+            self.complete_outbox(outbox_ids, status=OUTBOX_SUMMARIZED)
+            return summary_id
+    
+    def get_outbox_counts(self) -> Dict[str, int]:
+        """발송 큐 상태별 건수"""
+        query = (AlertOutbox
+                 .select(AlertOutbox.status, fn.COUNT(AlertOutbox.id).alias('count'))
+                 .group_by(AlertOutbox.status)
+                 .tuples())
+        return dict(query)
+
+    
+    # ========================================
+    # 백테스트 결과
+    # ========================================
+    
+    def save_backtest_results(self, run_id: str, rows: List[tuple]) -> int:
+        """
+        백테스트 스윕 결과 일괄 저장
+        
+        Args:
+            rows: BACKTEST_RESULT_FIELDS 순서의 튜플 리스트
+        """
+        if not rows:
+            return 0
+        
+        columns = [f'"{c}"' for c in ('run_id',) + BACKTEST_RESULT_FIELDS + ('created_at',)]
+        sql = (f'INSERT INTO "{BacktestResult._meta.table_name}" ({", ".join(columns)}) '
+               f'VALUES ({", ".join("?" * len(columns))})')
+        extra = (str(datetime.now()),)
+        with db.atomic():
+            self.connect().executemany(sql, ((run_id,) + tuple(row) + extra for row in rows))
+        self.track_bulk_change(BacktestResult._meta.table_name, len(rows))
+        return len(rows)
+    
+    def get_backtest_summary(self, run_id: str = None, limit: int = 20) -> List[Dict]:
+        """
+        파라미터 조합별 백테스트 요약 (평균 초과수익 높은 순)
+        
+        Args:
+            run_id: 실행 ID (None이면 가장 최근 실행)
+        
+        Returns:
+            [{'window', 'years', 'sigma_1', 'sigma_2', 'amount_1', 'amount_2', 'tickers',
+              'avg_return', 'avg_outperformance', 'win_rate', 'avg_buys'}, ...]
+        """
+        if run_id is None:
+            run_id = (BacktestResult
+                      .select(BacktestResult.run_id)
+                      .order_by(BacktestResult.id.desc())
+                      .limit(1)
+                      .scalar())
+            if run_id is None:
+                return []
+        
+        r = BacktestResult
+        traded = r.total_invested > 0
+        query = (r
+                 .select(r.window, r.years, r.sigma_1, r.sigma_2, r.amount_1, r.amount_2,
+                         fn.COUNT(r.id).alias('tickers'),
+                         fn.AVG(r.total_return_pct).alias('avg_return'),
+                         fn.AVG(r.outperformance).alias('avg_outperformance'),
+                         (fn.AVG(r.outperformance > 0) * 100).alias('win_rate'),
+                         fn.AVG(r.buy_1_count + r.buy_2_count).alias('avg_buys'))
+                 .where((r.run_id == run_id) & traded)
+                 .group_by(r.window, r.years, r.sigma_1, r.sigma_2, r.amount_1, r.amount_2)
+                 .order_by(fn.AVG(r.outperformance).desc())
+                 .limit(limit)
+                 .dicts())
+        return list(query)
 
 
 # 테스트
@@ -2,10 +2,14 @@
 한국투자증권 Open Trading API 클라이언트
 """
 import requests
+import threading
 import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 from kis_auth import KISAuth
+from database import shutdown_executor
+import kis_http
 
 
 class KISApi:
@@ -37,7 +41,7 @@ class KISApi:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = kis_http.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             result = response.json()
@@ -98,7 +102,7 @@ class KISApi:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = kis_http.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             result = response.json()
@@ -168,7 +172,7 @@ class KISApi:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = kis_http.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             result = response.json()
@@ -257,7 +261,7 @@ class KISApi:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = kis_http.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             result = response.json()
@@ -317,7 +321,39 @@ class KISApi:
             return None
     
     # 거래소 코드 캐시 (티커 → 거래소)
-    _exchange_cache = {}
+    _exchange_cache = {}  # {ticker: exchange} (DB exchange_codes 테이블과 동기화)
+    _exchange_cache_loaded = False
+    
+    # 진행 중인 현재가 조회 (동일 종목 중복 요청 방지)
+    _inflight = {}  # {(market, ticker): Future}
+    _inflight_lock = threading.Lock()
+    
+    def _get_cached_exchange(self, ticker_upper: str) -> Optional[str]:
+        """확인된 거래소 코드 조회 (메모리 → DB)"""
+        if not KISApi._exchange_cache_loaded:
+            try:
+                KISApi._exchange_cache.update(self.auth.db.get_exchange_codes())
+            except Exception as e:
+                print(f"  ⚠️ 거래소 코드 캐시 로드 실패: {e}")
+            KISApi._exchange_cache_loaded = True
+        
+        exchange = self._exchange_cache.get(ticker_upper)
+        if exchange is None:
+            # 다른 프로세스가 저장했을 수 있으므로 DB 재확인
+            try:
+                exchange = self.auth.db.get_exchange_code(ticker_upper)
+            except Exception:
+                exchange = None
+            if exchange:
+                self._exchange_cache[ticker_upper] = exchange
+        return exchange
+    
+    def _save_exchange(self, ticker_upper: str, exchange: str):
+        """확인된 거래소 코드 저장 (메모리 + DB)"""
+        if self._exchange_cache.get(ticker_upper) == exchange:
+            return
+        self._exchange_cache[ticker_upper] = exchange
+        self.auth.db.save_exchange_code(ticker_upper, exchange)
     
     def get_exchange_code(self, ticker: str) -> str:
         """
@@ -332,8 +368,9 @@ class KISApi:
         ticker_upper = ticker.upper()
         
         # 캐시에 있으면 반환
-        if ticker_upper in self._exchange_cache:
-            return self._exchange_cache[ticker_upper]
+        cached_exchange = self._get_cached_exchange(ticker_upper)
+        if cached_exchange:
+            return cached_exchange
         
         # 알려진 ARCA(AMS) 상장 ETF (레버리지/인버스 ETF 대부분)
         arca_etfs = [
@@ -396,8 +433,8 @@ class KISApi:
         ticker_upper = ticker.upper()
         
         # 캐시된 거래소가 있으면 먼저 시도
-        if ticker_upper in self._exchange_cache:
-            cached_exchange = self._exchange_cache[ticker_upper]
+        cached_exchange = self._get_cached_exchange(ticker_upper)
+        if cached_exchange:
             result = self.get_overseas_stock_price(ticker, cached_exchange)
             if result and result.get('current_price', 0) > 0:
                 return result
@@ -418,10 +455,10 @@ class KISApi:
                 rsym = result.get('_rsym', '')
                 actual_exchange = self._extract_exchange_from_rsym(rsym)
                 if actual_exchange:
-                    self._exchange_cache[ticker_upper] = actual_exchange
+                    self._save_exchange(ticker_upper, actual_exchange)
                     print(f"  ✅ {ticker} 거래소 캐싱: {actual_exchange}")
                 else:
-                    self._exchange_cache[ticker_upper] = exchange
+                    self._save_exchange(ticker_upper, exchange)
                     print(f"  ✅ {ticker} 거래소 확인: {exchange}")
                 return result
         
@@ -437,7 +474,7 @@ class KISApi:
         params = {"AUTH": "", "EXCD": exchange, "SYMB": ticker}
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = kis_http.get(url, headers=headers, params=params)
             response.raise_for_status()
             result = response.json()
             
@@ -477,6 +514,84 @@ class KISApi:
         except Exception as e:
             return None
     
+    def _fetch_price_shared(self, ticker: str, is_korean: bool) -> Optional[dict]:
+        """현재가 조회 (동일 종목 조회가 진행 중이면 그 결과를 공유)"""
+        key = ('KR' if is_korean else 'US', ticker.upper())
+        
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            if is_korean:
+                result = self.get_stock_price(ticker)
+            else:
+                result = self.get_overseas_stock_price_auto(ticker)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def get_prices(self, tickers, country: str = None, max_workers: int = 8) -> Dict[str, dict]:
+        """
+        여러 종목 현재가 동시 조회
+        
+        Args:
+            tickers: 종목코드 리스트 또는 {종목코드: 국가} 딕셔너리
+            country: 국가 코드 ('KR'/'US', 리스트일 때만 사용, 없으면 숫자 티커=KR)
+            max_workers: 동시 요청 수 (초당 호출 수는 kis_http에서 제한)
+        
+        Returns:
+            dict: {ticker: {'success': bool, 'data': 시세 정보 또는 None, 'error': 오류 메시지 또는 None}}
+        """
+        if isinstance(tickers, dict):
+            markets = {t: c == 'KR' for t, c in tickers.items()}
+        else:
+            markets = {
+                t: (country == 'KR') if country else t.isdigit()
+                for t in dict.fromkeys(tickers)  # 순서 유지 중복 제거
+            }
+        
+        results = {}
+        if not markets:
+            return results
+        
+        # 시장별로 묶어서 제출 (같은 시장 요청이 연속되도록)
+        ordered = sorted(markets.items(), key=lambda item: not item[1])
+        
+        workers = min(max_workers, len(ordered))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kis-price')
+        try:
+            futures = {
+                executor.submit(self._fetch_price_shared, ticker, is_korean): ticker
+                for ticker, is_korean in ordered
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    data = future.result()
+                    if data:
+                        results[ticker] = {'success': True, 'data': data, 'error': None}
+                    else:
+                        results[ticker] = {'success': False, 'data': None, 'error': '시세 조회 실패'}
+                except Exception as e:
+                    results[ticker] = {'success': False, 'data': None, 'error': str(e)}
+        finally:
+            shutdown_executor(executor, workers)
+        
+        # 입력 순서대로 반환
+        return {ticker: results[ticker] for ticker in markets}
+    
     def get_kr_minute_price(self, ticker: str, date: str, interval: int = 1) -> list:
         """
         한국 주식 분봉 조회
@@ -503,7 +618,7 @@ class KISApi:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = kis_http.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             result = response.json()
@@ -549,7 +664,7 @@ class KISApi:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = kis_http.get(url, headers=headers, params=params)
             response.raise_for_status()
             
             result = response.json()
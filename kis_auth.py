@@ -3,9 +3,11 @@
 """
 import requests
 import json
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 from kis_crypto import KISCrypto
+import kis_http
 from database import StockDatabase
 
 
@@ -21,6 +23,8 @@ class KISAuth:
         self.token = None
         self.token_expired = None
         self.db = StockDatabase()
+        # 여러 스레드가 동시에 만료를 확인해도 토큰은 한 번만 발급 (KIS: 1분당 1회 발급 제한)
+        self._token_lock = threading.Lock()
     
     def get_access_token(self, force_refresh=False):
         """
@@ -36,7 +40,14 @@ class KISAuth:
         if not force_refresh and self._is_token_valid():
             return self.token
         
-        # 새 토큰 발급
+        with self._token_lock:
+            # 기다리는 동안 다른 스레드가 발급했으면 그 토큰 사용
+            if not force_refresh and self._is_token_valid():
+                return self.token
+            return self._issue_token()
+    
+    def _issue_token(self):
+        """새 토큰 발급 (_token_lock 안에서 호출)"""
         url = f"{self.BASE_URL}/oauth2/tokenP"
         
         headers = {
@@ -51,7 +62,7 @@ class KISAuth:
         
         try:
             print("🔑 한국투자증권 접근 토큰 발급 중...")
-            response = requests.post(url, headers=headers, json=data)
+            response = kis_http.post(url, headers=headers, json=data)
             response.raise_for_status()
             
             result = response.json()
@@ -157,7 +168,7 @@ class KISAuth:
                     pass
             
             print("🔑 WebSocket approval key 발급 중...")
-            response = requests.post(url, headers=headers, json=data)
+            response = kis_http.post(url, headers=headers, json=data)
             response.raise_for_status()
             
             result = response.json()
@@ -0,0 +1,137 @@
+"""
+한국투자증권 API HTTP 세션 (연결 풀 공유)
+- Keep-Alive 연결 재사용 (요청마다 TCP/TLS 핸드셰이크 방지)
+- 429/5xx 응답 시 지수 백오프 재시도 (Retry-After 준수)
+- 공용 토큰 버킷으로 초당 호출 수 제한 (재시도 포함)
+- 엔드포인트별 응답 시간 통계
+"""
+
+import os
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limiter import kis_rate_limiter
+
+POOL_SIZE = int(os.environ.get('KIS_HTTP_POOL_SIZE', '10'))
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5      # 0.5s, 1s, 2s ...
+RETRY_STATUS = (429, 500, 502, 503, 504)
+DEFAULT_TIMEOUT = 10      # 초
+
+_session = None
+_session_lock = threading.Lock()
+
+_stats = {}  # {path: {'count', 'errors', 'total_ms', 'max_ms'}}
+_stats_lock = threading.Lock()
+
+
+class _RateLimitedRetry(Retry):
+    """재시도 전 백오프 대기 후 공용 토큰 버킷에서 토큰 획득 (재시도도 호출 한도에 포함)"""
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        kis_rate_limiter.acquire()
+
+
+def get_session() -> requests.Session:
+    """공용 세션 반환 (최초 호출 시 생성)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = _RateLimitedRetry(
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    status_forcelist=RETRY_STATUS,
+                    allowed_methods=frozenset(['GET', 'POST']),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,  # 마지막 응답을 그대로 반환 (raise_for_status로 처리)
+                )
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _record(path: str, elapsed_ms: float, error: bool):
+    """엔드포인트별 응답 시간 기록"""
+    with _stats_lock:
+        stat = _stats.setdefault(path, {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stat['count'] += 1
+        stat['errors'] += int(error)
+        stat['total_ms'] += elapsed_ms
+        stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    공용 세션으로 HTTP 요청
+
+    Args:
+        method: 'GET' 또는 'POST'
+        url: 요청 URL
+        **kwargs: requests 인자 (timeout 기본값: DEFAULT_TIMEOUT)
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    kis_rate_limiter.acquire()
+
+    path = urlsplit(url).path
+    started = time.perf_counter()
+    error = True
+    try:
+        response = get_session().request(method, url, **kwargs)
+        error = response.status_code >= 400
+        return response
+    finally:
+        _record(path, (time.perf_counter() - started) * 1000, error)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
+
+
+def get_latency_stats() -> Dict[str, Dict]:
+    """엔드포인트별 호출 수/오류 수/평균·최대 응답 시간(ms)"""
+    with _stats_lock:
+        return {
+            path: {
+                'count': s['count'],
+                'errors': s['errors'],
+                'avg_ms': s['total_ms'] / s['count'] if s['count'] else 0.0,
+                'max_ms': s['max_ms'],
+            }
+            for path, s in _stats.items()
+        }
+
+
+def print_latency_stats():
+    """응답 시간 통계 출력"""
+    stats = get_latency_stats()
+    if not stats:
+        return
+    print("\n📶 KIS API 응답 시간")
+    for path, s in sorted(stats.items(), key=lambda item: -item[1]['count']):
+        print(f"  {path}: {s['count']}회 (오류 {s['errors']}), "
+              f"평균 {s['avg_ms']:.0f}ms, 최대 {s['max_ms']:.0f}ms")
+
+
+def close_session():
+    """공용 세션 종료"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -8,6 +8,15 @@ import json
 import aes256
 from kis_auth import KISAuth
 
+# H0STCNT0 (국내주식 실시간체결가) 필드 위치
+H0STCNT0_TICKER = 0       # MKSC_SHRN_ISCD 종목코드
+H0STCNT0_TIME = 1         # STCK_CNTG_HOUR 체결시간
+H0STCNT0_PRICE = 2        # STCK_PRPR 현재가
+H0STCNT0_CHANGE = 4       # PRDY_VRSS 전일대비
+H0STCNT0_CHANGE_RATE = 5  # PRDY_CTRT 등락률
+H0STCNT0_TRADE_VOL = 12   # CNTG_VOL 체결거래량
+H0STCNT0_ACML_VOL = 13    # ACML_VOL 누적거래량
+
 
 class KISWebSocket:
     """한국투자증권 WebSocket 클라이언트"""
@@ -150,32 +159,22 @@ class KISWebSocket:
         try:
             async for message in self.websocket:
                 try:
-                    # 데이터 파싱
                     if isinstance(message, bytes):
                         message = message.decode('utf-8')
                     
+                    # 실시간 데이터: '암호화여부|TR_ID|건수|필드^필드^...'
+                    if message[:1] in ('0', '1'):
+                        await self._handle_frame(message)
+                        continue
+                    
+                    # 제어 메시지 (구독 응답 등): JSON
                     data = json.loads(message)
                     
-                    # 데이터 타입 확인
                     if 'header' in data and 'body' in data:
                         tr_id = data['header'].get('tr_id')
                         
                         if tr_id == 'H0STCNT0':  # 실시간 체결가
                             await self._handle_price_data(data)
-                    
-                except json.JSONDecodeError:
-                    # 암호화된 데이터인 경우
-                    try:
-                        decrypted = self._decrypt_data(message)
-                        data = json.loads(decrypted)
-                        
-                        if 'header' in data and 'body' in data:
-                            tr_id = data['header'].get('tr_id')
-                            
-                            if tr_id == 'H0STCNT0':
-                                await self._handle_price_data(data)
-                    except:
-                        pass
                 
                 except Exception as e:
                     print(f"⚠️  메시지 처리 오류: {e}")
@@ -188,6 +187,46 @@ class KISWebSocket:
             print(f"❌ 데이터 수신 오류: {e}")
             self.is_connected = False
     
+    async def _handle_frame(self, message: str):
+        """
+        실시간 데이터 프레임 처리
+        
+        Args:
+            message: '암호화여부|TR_ID|데이터건수|필드^필드^...' 형식 문자열
+        """
+        encrypted, tr_id, count, body = message.split('|', 3)
+        
+        if tr_id != 'H0STCNT0':
+            return
+        
+        # 암호화 플래그가 설정된 경우에만 복호화
+        if encrypted == '1':
+            body = self._decrypt_data(body)
+        
+        fields = body.split('^')
+        count = int(count)
+        size = len(fields) // count if count else 0
+        if size == 0:
+            return  # 체결 건수 0 또는 필드 부족 (잘린 프레임)
+
+        # 한 프레임에 여러 체결 건이 연속으로 들어올 수 있음 (건당 필드 수 고정)
+        for base in range(0, size * count, size):
+            ticker = fields[base + H0STCNT0_TICKER]
+            callback = self.subscriptions.get(ticker)
+            if callback is None:
+                continue
+            
+            price_info = {
+                'ticker': ticker,
+                'current_price': float(fields[base + H0STCNT0_PRICE]),
+                'change_price': float(fields[base + H0STCNT0_CHANGE]),
+                'change_rate': float(fields[base + H0STCNT0_CHANGE_RATE]),
+                'volume': int(fields[base + H0STCNT0_ACML_VOL]),  # 누적거래량
+                'trade_volume': int(fields[base + H0STCNT0_TRADE_VOL]),  # 체결거래량
+                'timestamp': fields[base + H0STCNT0_TIME]  # 체결시간 (HHMMSS)
+            }
+            await callback(price_info)
+    
     async def _handle_price_data(self, data: dict):
         """
         실시간 체결가 데이터 처리
@@ -0,0 +1,276 @@
+"""
+분봉 보관소 (오래된 분봉을 종목/월별 컬럼형 파일로 이동)
+- 최근 MINUTE_HOT_DAYS일은 SQLite minute_prices에 그대로 두고 (실시간 저장/조회)
+  그 이전 거래일은 data/minute_archive/{ticker}/{YYYY-MM}.npy로 옮긴 뒤 DB에서 삭제
+- 파일 형식: 고정 폭 레코드 배열 (UTC epoch 초 int64, 거래일 int32, OHLC/가격 float64,
+  거래량 int32 = 행당 48바이트) → np.load(mmap_mode='r')로 복사 없이 읽음
+  (가격은 DB 값과 같게 재생되도록 float64 유지)
+  (종목명/문자열 날짜/인덱스가 없어 SQLite 행보다 훨씬 작음)
+- 같은 월 파일에 다시 보관하면 기존 데이터와 병합 (같은 시각은 새 값 우선)
+- 파일은 임시 파일 → rename으로 교체하고 DB 삭제는 파일 저장 후 실행
+  (중간에 중단돼도 다시 실행하면 병합으로 복구)
+
+사용법:
+    python minute_archive.py            # 보관 현황
+    python minute_archive.py archive    # MINUTE_HOT_DAYS일 이전 분봉 보관
+"""
+
+import heapq
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from database import StockDatabase
+
+ARCHIVE_DIR = Path(os.environ.get('MINUTE_ARCHIVE_DIR', 'data/minute_archive'))
+HOT_DAYS = int(os.environ.get('MINUTE_HOT_DAYS', '30'))
+
+KST_OFFSET = 9 * 3600
+# 보관 기준 시각 (한국시간): 미국장(~07:00)이 끝나고 한국장(09:00) 시작 전이라 장 중간이 나뉘지 않음
+CUTOFF_TIME = '08:00:00'
+
+ARCHIVE_DTYPE = np.dtype([
+    ('ts', '<i8'),           # UTC epoch 초
+    ('market_date', '<i4'),  # 거래일 YYYYMMDD (미국 주식, 없으면 0)
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('price', '<f8'),        # 종가
+    ('volume', '<i4'),
+])
+
+# 보관 대상 종목 (종목별 (ticker, datetime) 인덱스 조회, minute_prices 전체 스캔 없음)
+ARCHIVE_TICKERS_SQL = '''
+    SELECT symbol FROM tickers
+    WHERE EXISTS (SELECT 1 FROM minute_prices WHERE ticker = tickers.symbol AND datetime < ?)
+'''
+
+
+def archive_path(ticker: str, month: str) -> Path:
+    """보관 파일 경로 (month: YYYY-MM)"""
+    return ARCHIVE_DIR / ticker / f"{month}.npy"
+
+
+def _months(ts: np.ndarray) -> np.ndarray:
+    """UTC epoch → 한국시간 기준 월 (datetime64[M])"""
+    return (ts + KST_OFFSET).astype('datetime64[s]').astype('datetime64[M]')
+
+
+def _fetch_rows(db: StockDatabase, ticker: str, end: str, start: str = None) -> np.ndarray:
+    """DB 분봉을 보관 레코드 배열로 조회 ([start, end) 한국시간, 시각 순)"""
+    cursor = db.connect().execute('''
+        SELECT CAST(strftime('%s', datetime) AS INTEGER) - ?,
+               COALESCE(CAST(REPLACE(market_date, '-', '') AS INTEGER), 0),
+               COALESCE(open, price), COALESCE(high, price), COALESCE(low, price),
+               price, COALESCE(volume, 0)
+        FROM minute_prices
+        WHERE ticker = ? AND datetime >= ? AND datetime < ? AND price IS NOT NULL
+        ORDER BY datetime
+    ''', (KST_OFFSET, ticker, start or '', end))
+    return np.fromiter(cursor, dtype=ARCHIVE_DTYPE)
+
+
+def archived_tickers() -> List[str]:
+    """보관 파일이 있는 종목 목록"""
+    if not ARCHIVE_DIR.exists():
+        return []
+    return sorted(path.name for path in ARCHIVE_DIR.iterdir()
+                  if path.is_dir() and any(path.glob('*.npy')))
+
+
+def read_month(ticker: str, month: str) -> np.ndarray:
+    """월별 보관 데이터 (메모리 맵, 없으면 빈 배열)"""
+    path = archive_path(ticker, month)
+    if not path.exists():
+        return np.empty(0, dtype=ARCHIVE_DTYPE)
+    return np.load(path, mmap_mode='r')
+
+
+def _write_month(ticker: str, month: str, rows: np.ndarray) -> int:
+    """월별 파일에 병합 저장 (같은 시각은 새 값 우선), 저장된 전체 행 수 반환"""
+    path = archive_path(ticker, month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if path.exists():
+        rows = np.concatenate([np.load(path), rows])
+    order = np.argsort(rows['ts'], kind='stable')
+    rows = rows[order]
+    keep = np.append(rows['ts'][1:] != rows['ts'][:-1], True)  # 같은 시각은 마지막(새 값)
+    rows = rows[keep]
+
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, rows)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return len(rows)
+
+
+def archive_minute_data(days: int = HOT_DAYS, db: StockDatabase = None) -> Dict:
+    """
+    days일 이전 분봉을 보관 파일로 이동 (종목별로 처리해 메모리 사용 제한)
+
+    Returns:
+        {'tickers': 종목 수, 'rows': 이동한 행 수, 'files': 갱신한 파일 수}
+    """
+    own_db = db is None
+    db = db or StockDatabase()
+    before = f"{(datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')} {CUTOFF_TIME}"
+    result = {'tickers': 0, 'rows': 0, 'files': 0}
+
+    try:
+        tickers = [row[0] for row in db.connect().execute(ARCHIVE_TICKERS_SQL, (before,))]
+
+        for ticker in tickers:
+            rows = _fetch_rows(db, ticker, before)
+            if len(rows):
+                months = _months(rows['ts'])
+                for month in np.unique(months):
+                    _write_month(ticker, str(month), rows[months == month])
+                    result['files'] += 1
+            db.delete_minute_prices_before(ticker, before)
+            result['tickers'] += 1
+            result['rows'] += len(rows)
+        db.track_bulk_change('minute_prices', result['rows'])
+    finally:
+        if own_db:
+            db.close()
+
+    if result['rows']:
+        print(f"📦 분봉 보관: {result['tickers']}개 종목, {result['rows']:,}건 → "
+              f"{result['files']}개 파일 ({before} 이전)")
+    return result
+
+
+def _epoch(kst: str) -> int:
+    """한국시간 'YYYY-MM-DD HH:MM:SS' → UTC epoch 초"""
+    return int(np.datetime64(kst.replace(' ', 'T'), 's').astype(np.int64)) - KST_OFFSET
+
+
+def _ymd_str(ymd: int) -> Optional[str]:
+    return f"{ymd // 10000:04d}-{ymd // 100 % 100:02d}-{ymd % 100:02d}" if ymd else None
+
+
+def _archive_slices(ticker: str, start: str, end: str) -> Iterator[np.ndarray]:
+    """[start, end) 한국시간 범위의 보관 데이터 (월별 메모리 맵 슬라이스)"""
+    start_ts, end_ts = _epoch(start), _epoch(end)
+    month = np.datetime64(start[:7], 'M')
+    last = np.datetime64(end[:7], 'M')
+    while month <= last:
+        rows = read_month(ticker, str(month))
+        if len(rows):
+            lo, hi = np.searchsorted(rows['ts'], [start_ts, end_ts])
+            if hi > lo:
+                yield rows[lo:hi]
+        month += 1
+
+
+def _to_strings(rows: np.ndarray) -> tuple:
+    """보관 레코드 → (한국시간 datetime 문자열 리스트, market_date 문자열/None 리스트)"""
+    times = np.char.replace(
+        np.datetime_as_string((rows['ts'] + KST_OFFSET).astype('datetime64[s]')), 'T', ' ')
+    labels = {int(ymd): _ymd_str(int(ymd)) for ymd in np.unique(rows['market_date'])}
+    return times.tolist(), [labels[ymd] for ymd in rows['market_date'].tolist()]
+
+
+def iter_archived_bars(ticker: str, start: str, end: str) -> Iterator[tuple]:
+    """
+    보관 분봉 스트리밍 (시각 순)
+
+    Args:
+        start, end: 한국시간 'YYYY-MM-DD HH:MM:SS' ([start, end))
+
+    Yields:
+        (ticker, datetime 문자열, market_date, price) — minute_prices 조회 결과와 같은 형태
+    """
+    for rows in _archive_slices(ticker, start, end):
+        times, dates = _to_strings(rows)
+        yield from zip([ticker] * len(rows), times, dates, rows['price'].tolist())
+
+
+def merge_archived_bars(tickers: List[str], start: str, end: str,
+                        hot_rows: Iterator[tuple]) -> Iterator[tuple]:
+    """보관 분봉 + DB 분봉을 시각 순으로 병합 (DB 분봉은 (ticker, datetime, ...) 시각 순)"""
+    streams = [iter_archived_bars(ticker, start, end) for ticker in tickers]
+    return heapq.merge(*streams, hot_rows, key=lambda row: (str(row[1])[:19], row[0]))
+
+
+def load_minute_bars(ticker: str, start_date: str, end_date: str,
+                     db: StockDatabase = None) -> pd.DataFrame:
+    """
+    보관 파일 + DB 분봉 조회 (날짜 범위, 포함)
+
+    Returns:
+        DataFrame (datetime, market_date, open, high, low, price, volume)
+    """
+    start = f"{start_date} 00:00:00"
+    end = f"{(datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')} 00:00:00"
+
+    frames = []
+    archived = list(_archive_slices(ticker, start, end))
+    if archived:
+        rows = np.concatenate(archived)
+        frames.append(pd.DataFrame({
+            'datetime': (rows['ts'] + KST_OFFSET).astype('datetime64[s]'),
+            'market_date': rows['market_date'],
+            **{col: rows[col] for col in ('open', 'high', 'low', 'price')},
+            'volume': rows['volume'].astype(np.int64),
+        }))
+
+    own_db = db is None
+    db = db or StockDatabase()
+    try:
+        hot = _fetch_rows(db, ticker, end, start)
+    finally:
+        if own_db:
+            db.close()
+    if len(hot):
+        frames.append(pd.DataFrame({
+            'datetime': (hot['ts'] + KST_OFFSET).astype('datetime64[s]'),
+            'market_date': hot['market_date'],
+            **{col: hot[col] for col in ('open', 'high', 'low', 'price')},
+            'volume': hot['volume'].astype(np.int64),
+        }))
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates('datetime', keep='last').sort_values('datetime', ignore_index=True)
+    df['market_date'] = pd.to_datetime(df['market_date'].where(df['market_date'] > 0).astype('string'),
+                                       format='%Y%m%d')
+    return df
+
+
+def archive_stats() -> Dict:
+    """보관 현황 {'tickers', 'files', 'rows', 'bytes', 'first_month', 'last_month'}"""
+    files = sorted(ARCHIVE_DIR.glob('*/*.npy')) if ARCHIVE_DIR.exists() else []
+    months = sorted(path.stem for path in files)
+    return {
+        'tickers': len({path.parent.name for path in files}),
+        'files': len(files),
+        'rows': sum(len(np.load(path, mmap_mode='r')) for path in files),
+        'bytes': sum(path.stat().st_size for path in files),
+        'first_month': months[0] if months else None,
+        'last_month': months[-1] if months else None,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'archive':
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else HOT_DAYS
+        archive_minute_data(days)
+
+    stats = archive_stats()
+    print(f"\n📦 분봉 보관소 ({ARCHIVE_DIR}):")
+    print(f"   종목 {stats['tickers']}개, 파일 {stats['files']}개, "
+          f"{stats['rows']:,}건 ({stats['bytes'] / 1024 / 1024:.1f}MB)")
+    if stats['first_month']:
+        print(f"   기간: {stats['first_month']} ~ {stats['last_month']}")
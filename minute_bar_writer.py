@@ -0,0 +1,132 @@
+"""
+실시간 틱 → 1분봉 집계 저장
+틱마다 DB에 커밋하지 않고 메모리에서 종목별 1분봉(OHLCV)으로 모은 뒤
+N초마다(또는 종료 시) 한 번의 트랜잭션으로 저장 (DB 작업은 이벤트 루프 밖 스레드에서 실행)
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Tuple
+
+from database import StockDatabase
+from log_utils import log_debug
+
+
+class MinuteBarWriter:
+    """종목별 1분봉 버퍼"""
+
+    def __init__(self, db: StockDatabase, flush_interval: int = 10, max_bars: int = 5000):
+        """
+        Args:
+            db: StockDatabase
+            flush_interval: 저장 주기 (초)
+            max_bars: 버퍼 최대 분봉 수 (초과 시 완료된 분봉 즉시 저장)
+        """
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_bars = max_bars
+
+        # {(ticker, 'YYYY-MM-DD HH:MM:00'): [ticker_name, open, high, low, close, volume]}
+        self._bars: Dict[Tuple[str, str], list] = {}
+        # SQLite 쓰기 전용 스레드 (연결 1개 재사용)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='minute-writer')
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._overflow_flush = None  # 버퍼 초과로 예약한 저장 작업
+
+        self.ticks = 0
+        self.flushes = 0
+        self.saved_bars = 0
+
+    def add_tick(self, ticker: str, ticker_name: str, price: float, volume: int = 0,
+                 timestamp: datetime = None):
+        """
+        틱 반영 (이벤트 루프 스레드에서 호출)
+
+        Args:
+            volume: 해당 틱의 체결량 (누적거래량 아님)
+        """
+        minute = (timestamp or datetime.now()).strftime('%Y-%m-%d %H:%M:00')
+        bar = self._bars.get((ticker, minute))
+
+        if bar is None:
+            self._bars[(ticker, minute)] = [ticker_name, price, price, price, price, volume or 0]
+        else:
+            if price > bar[2]:
+                bar[2] = price
+            if price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += volume or 0
+
+        self.ticks += 1
+        # 버퍼 초과: 완료된 분봉만 즉시 저장 (진행 중인 분봉을 저장하면 같은 분의
+        # 다음 틱이 새 분봉으로 시작돼 UPSERT 시 앞부분 시가/고가/저가/거래량을 덮어씀)
+        if (len(self._bars) >= self.max_bars and self._task is not None
+                and (self._overflow_flush is None or self._overflow_flush.done())):
+            self._overflow_flush = asyncio.get_running_loop().create_task(self.flush())
+
+    def _take_bars(self, final: bool) -> list:
+        """저장할 분봉 분리 (final=False면 진행 중인 현재 분은 남김)"""
+        current = datetime.now().strftime('%Y-%m-%d %H:%M:00')
+        rows = []
+        for key in list(self._bars):
+            ticker, minute = key
+            if final or minute < current:
+                name, open_, high, low, close, volume = self._bars.pop(key)
+                rows.append((ticker, name, minute, open_, high, low, close, volume))
+        return rows
+
+    async def flush(self, final: bool = False) -> int:
+        """
+        완료된 분봉 저장
+
+        Args:
+            final: True면 진행 중인 분봉까지 모두 저장 (종료 시)
+
+        Returns:
+            저장한 분봉 수
+        """
+        async with self._flush_lock:
+            rows = self._take_bars(final)
+            if not rows:
+                return 0
+
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, self.db.insert_minute_bars_bulk, rows)
+            if result is None:
+                # 저장 실패 시 다음 주기에 다시 시도 (새로 들어온 틱과 병합)
+                for ticker, name, minute, open_, high, low, close, volume in rows:
+                    bar = self._bars.get((ticker, minute))
+                    if bar is None:
+                        self._bars[(ticker, minute)] = [name, open_, high, low, close, volume]
+                    else:
+                        bar[1] = open_
+                        bar[2] = max(bar[2], high)
+                        bar[3] = min(bar[3], low)
+                        bar[5] += volume
+                return 0
+
+            self.flushes += 1
+            self.saved_bars += len(rows)
+            log_debug(f"💾 분봉 {len(rows)}개 저장 (틱 {self.ticks}개 누적)")
+            return len(rows)
+
+    async def run(self):
+        """주기적 저장 루프"""
+        self._task = asyncio.current_task()
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+    async def close(self):
+        """남은 분봉 모두 저장 후 종료"""
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        await self.flush(final=True)
+        self._executor.shutdown(wait=True)
+        print(f"💾 분봉 저장: 틱 {self.ticks}개 → 분봉 {self.saved_bars}개 ({self.flushes}회 커밋)")
@@ -1,15 +1,23 @@
 """
-놓친 알림 요약 (밤 사이 00:00~06:00)
+놓친 알림 요약 (알림 시간 외에 발생해 발송 큐에 보류된 알림)
 매일 08:00에 실행
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from database import StockDatabase
-from notification import send_notification
+from ntfy_alert import NtfyAlert
+from alert_outbox import get_outbox_worker
+
+
+LEVEL_TEXT = {'05x': '테스트', '1x': '1차', '2x': '2차'}
+
+
+def _to_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
 
 
 def send_missed_alerts_summary():
     """
-    밤 사이 놓친 알림 요약 전송 (00:00~06:00)
+    밤 사이 놓친 알림 요약 전송 (보류된 알림을 사용자별 요약 1건으로 발송 큐에 등록)
     """
     print("\n" + "="*70)
     print("🌙 밤 사이 놓친 알림 확인")
@@ -17,25 +25,8 @@ def send_missed_alerts_summary():
     
     db = StockDatabase()
     
-    # 오늘 00:00 ~ 06:00 사이 놓친 알림 조회
-    today = datetime.now()
-    start_time = today.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_time = today.replace(hour=6, minute=0, second=0, microsecond=0)
-    
-    conn = db.connect()
-    cursor = conn.cursor()
-    
-    # 전송되지 않은 알림 조회
-    cursor.execute('''
-        SELECT ticker, ticker_name, country, alert_level, 
-               target_price, current_price, drop_rate, alert_time
-        FROM alert_history
-        WHERE alert_time >= ? AND alert_time < ?
-          AND sent = 0
-        ORDER BY alert_time DESC
-    ''', (start_time.isoformat(), end_time.isoformat()))
-    
-    missed_alerts = cursor.fetchall()
+    # 알림 시간 외에 기록된(보류) 알림 조회
+    missed_alerts = db.get_held_alerts()
     
     if not missed_alerts:
         print("✅ 놓친 알림 없음")
@@ -44,36 +35,42 @@ def send_missed_alerts_summary():
     
     print(f"📊 놓친 알림: {len(missed_alerts)}개")
     
-    # 사용자별로 알림 전송
-    users = db.get_all_users()
+    # 사용자별로 묶기
+    by_user = {}
+    for alert in missed_alerts:
+        by_user.setdefault(alert['user_id'], []).append(alert)
     
-    for user in users:
-        if not user['enabled'] or not user.get('notification_enabled'):
-            continue
-        
-        # 해당 사용자의 관심 종목만 필터링
-        user_watchlist = db.get_user_watchlist_with_names(user['name'])
-        user_tickers = [stock['ticker'] for stock in user_watchlist]
-        
-        user_missed = [alert for alert in missed_alerts if alert[0] in user_tickers]
+    users = {user['id']: user for user in db.get_all_users()}
+    queued = 0
+    
+    for user_id, user_missed in by_user.items():
+        outbox_ids = [alert['id'] for alert in user_missed]
+        user = users.get(user_id)
         
-        if not user_missed:
+        # 비활성/알림 꺼짐/토픽 미설정 사용자는 발송 없이 요약 처리만
+        if not user or not user.get('notification_enabled') or not user.get('ntfy_topic'):
+            db.summarize_held_alerts(outbox_ids, user_id, None, None)
             continue
         
+        first_time = _to_datetime(user_missed[0]['alert_time'])
+        last_time = _to_datetime(user_missed[-1]['alert_time'])
+        
         # 메시지 구성
         message = f"🌙 {user['name']}님, 밤 사이 매수 기회가 있었습니다!\n\n"
-        message += f"📅 {today.strftime('%Y-%m-%d')} 새벽 (00:00~06:00)\n"
+        message += f"📅 {first_time.strftime('%m-%d %H:%M')} ~ {last_time.strftime('%m-%d %H:%M')}\n"
         message += f"🔔 총 {len(user_missed)}건의 알림\n\n"
         message += "━━━━━━━━━━━━━━━━━━\n\n"
         
         for idx, alert in enumerate(user_missed, 1):
-            ticker, name, country, level, target, current, drop, alert_time = alert
+            country = alert['country']
+            current = alert['current_price']
+            target = alert['target_price']
             
             flag = '🇰🇷' if country == 'KR' else '🇺🇸'
-            level_text = "1차" if level == '1x' else "2차"
+            level_text = LEVEL_TEXT.get(alert['alert_level'], alert['alert_level'])
             currency = "원" if country == 'KR' else "$"
             
-            alert_dt = datetime.fromisoformat(alert_time)
+            alert_dt = _to_datetime(alert['alert_time'])
             
             if country == 'KR':
                 price_format = f"{current:,.0f}{currency}"
@@ -82,36 +79,29 @@ def send_missed_alerts_summary():
                 price_format = f"{currency}{current:,.2f}"
                 target_format = f"{currency}{target:,.2f}"
             
-            message += f"{idx}. {flag} {name} ({ticker})\n"
+            message += f"{idx}. {flag} {alert['ticker_name']} ({alert['ticker']})\n"
             message += f"   {level_text} 매수 시점 도달!\n"
             message += f"   시각: {alert_dt.strftime('%H:%M:%S')}\n"
             message += f"   가격: {price_format}\n"
-            message += f"   목표가: {target_format} ({drop:.2f}% 하락)\n\n"
+            message += f"   목표가: {target_format} ({alert['drop_rate']:.2f}% 하락)\n\n"
         
         message += "━━━━━━━━━━━━━━━━━━\n\n"
         message += "💡 실시간 알림은 09:00~24:00만 전송됩니다.\n"
         message += "   밤 사이 매수 기회는 다음 날 아침에 요약해드립니다."
         
-        # ntfy로 전송
-        try:
-            result = send_notification(user['id'], message, title="🌙 밤 사이 놓친 알림")
-            if result:
-                print(f"  ✅ {user['name']}님에게 전송: {len(user_missed)}건")
-            else:
-                print(f"  ⚠️ {user['name']}님 전송 실패 (ntfy 토픽 미설정?)")
-        except Exception as e:
-            print(f"  ❌ {user['name']}님 전송 실패: {e}")
-    
-    # 전송 완료 표시
-    cursor.execute('''
-        UPDATE alert_history
-        SET sent = 1
-        WHERE alert_time >= ? AND alert_time < ?
-    ''', (start_time.isoformat(), end_time.isoformat()))
+        # 요약 알림을 발송 큐에 등록하고 보류 알림은 요약 처리 (한 트랜잭션)
+        ntfy = NtfyAlert(user['ntfy_topic'])
+        payload = ntfy.build_payload(message, title="🌙 밤 사이 놓친 알림", priority=4)
+        db.summarize_held_alerts(outbox_ids, user_id, ntfy.server, payload)
+        queued += 1
+        print(f"  📤 {user['name']}님 요약 발송 예약: {len(user_missed)}건")
     
-    conn.commit()
     db.close()
     
+    # 발송 (실패 시 워커가 재시도, 미발송분은 큐에 남음)
+    if queued:
+        get_outbox_worker(db.db_path).drain()
+    
     print("\n✅ 놓친 알림 요약 전송 완료!")
     print("="*70)
 
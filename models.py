@@ -3,6 +3,7 @@ Peewee ORM 모델 정의
 """
 
 from peewee import *
+from playhouse.migrate import SqliteMigrator, migrate
 import datetime as dt
 
 # 데이터베이스 연결
@@ -47,11 +48,24 @@ class UserWatchlist(BaseModel):
         )
 
 
+class Ticker(BaseModel):
+    """종목 정보 (가격/알림 테이블은 ticker 코드로 참조)"""
+    id = AutoField()
+    symbol = CharField(unique=True)
+    name = CharField(null=True)
+    country = CharField(null=True)   # KR, US
+    exchange = CharField(null=True)  # KOSPI, KOSDAQ, NASDAQ, NYSE, ETF / NAS, NYS, AMS
+    currency = CharField(null=True)  # KRW, USD
+    updated_at = DateTimeField(default=dt.datetime.now)
+
+    class Meta:
+        table_name = 'tickers'
+
+
 class DailyPrice(BaseModel):
     """일봉 데이터"""
     id = AutoField()
     ticker = CharField()
-    ticker_name = CharField()
     date = DateField()
     open = FloatField(null=True)
     high = FloatField(null=True)
@@ -71,11 +85,13 @@ class MinutePrice(BaseModel):
     """분봉 데이터"""
     id = AutoField()
     ticker = CharField()
-    ticker_name = CharField()
     datetime = DateTimeField()
     datetime_utc = DateTimeField(null=True)
     market_date = DateField(null=True)
-    price = FloatField()
+    open = FloatField(null=True)
+    high = FloatField(null=True)
+    low = FloatField(null=True)
+    price = FloatField()  # 종가
     volume = IntegerField(null=True)
     created_at = DateTimeField(default=dt.datetime.now)
 
@@ -112,6 +128,26 @@ class StatisticsCache(BaseModel):
         )
 
 
+class VolatilityState(BaseModel):
+    """일일 수익률 롤링 통계 상태 (증분 변동성 계산용)"""
+    id = AutoField()
+    ticker = CharField()
+    window = IntegerField()
+    count = IntegerField(default=0)
+    sum_return = FloatField(default=0)
+    sum_sq_return = FloatField(default=0)
+    first_date = DateField(null=True)  # 윈도우 첫 수익률의 기준일
+    last_date = DateField(null=True)   # 마지막 반영 일봉
+    last_close = FloatField(null=True)
+    updated_at = DateTimeField(default=dt.datetime.now)
+
+    class Meta:
+        table_name = 'volatility_state'
+        indexes = (
+            (('ticker', 'window'), True),  # UNIQUE
+        )
+
+
 class Setting(BaseModel):
     """설정"""
     key = CharField(primary_key=True)
@@ -124,13 +160,37 @@ class Setting(BaseModel):
         table_name = 'settings'
 
 
+class StockListing(BaseModel):
+    """거래소 상장 종목 목록 스냅샷 (종목 검색/종목명 조회용)"""
+    id = AutoField()
+    country = CharField()  # KR, US
+    ticker = CharField()
+    name = CharField()
+    market = CharField()   # KOSPI, KOSDAQ, NASDAQ, NYSE, ETF
+    updated_at = DateTimeField(default=dt.datetime.now)
+
+    class Meta:
+        table_name = 'stock_listings'
+        indexes = (
+            (('country', 'ticker'), True),  # UNIQUE
+        )
+
+
+class ExchangeCode(BaseModel):
+    """해외 종목 거래소 코드 (KIS API rsym 기준)"""
+    ticker = CharField(primary_key=True)
+    exchange = CharField()  # NAS, NYS, AMS
+    updated_at = DateTimeField(default=dt.datetime.now)
+
+    class Meta:
+        table_name = 'exchange_codes'
+
+
 class AlertHistory(BaseModel):
     """알림 이력"""
     id = AutoField()
     user = ForeignKeyField(User, column_name='user_id', backref='alerts', null=True, on_delete='SET NULL')
     ticker = CharField()
-    ticker_name = CharField()
-    country = CharField()
     alert_level = CharField()
     alert_date = CharField()
     target_price = FloatField()
@@ -144,6 +204,66 @@ class AlertHistory(BaseModel):
         table_name = 'alert_history'
         indexes = (
             (('user', 'ticker', 'alert_date', 'alert_level'), True),  # UNIQUE
+            (('user', 'alert_time'), False),    # 사용자 알림 내역 (최신순)
+            (('ticker', 'alert_time'), False),  # 관심 종목 알림 내역 (최신순)
+        )
+
+
+# 발송 큐 상태
+OUTBOX_PENDING = 'pending'        # 발송 대기 (재시도 포함)
+OUTBOX_HELD = 'held'              # 알림 시간 외 기록 (아침 요약으로 발송)
+OUTBOX_SENT = 'sent'              # 발송 완료
+OUTBOX_SUMMARIZED = 'summarized'  # 놓친 알림 요약에 포함되어 발송
+OUTBOX_FAILED = 'failed'          # 재시도 한도 초과
+
+
+class AlertOutbox(BaseModel):
+    """알림 발송 큐 (발송 성공 시까지 재시도)"""
+    id = AutoField()
+    alert = ForeignKeyField(AlertHistory, column_name='alert_id', null=True, on_delete='CASCADE')
+    user = ForeignKeyField(User, column_name='user_id', null=True, on_delete='SET NULL')
+    server = CharField()
+    topic = CharField()
+    payload = TextField()  # ntfy JSON body
+    status = CharField(default=OUTBOX_PENDING)
+    attempts = IntegerField(default=0)
+    next_attempt_at = DateTimeField(default=dt.datetime.now)
+    last_error = TextField(null=True)
+    created_at = DateTimeField(default=dt.datetime.now)
+    sent_at = DateTimeField(null=True)
+
+    class Meta:
+        table_name = 'alert_outbox'
+        indexes = (
+            (('status', 'next_attempt_at'), False),
+        )
+
+
+class BacktestResult(BaseModel):
+    """변동성 매수 전략 파라미터 스윕 결과 (실행 ID × 파라미터 × 종목)"""
+    id = AutoField()
+    run_id = CharField()
+    ticker = CharField()
+    window = IntegerField()        # 표준편차 계산 기간 (거래일)
+    years = IntegerField()         # 백테스트 기간 (년, 0이면 전체)
+    sigma_1 = FloatField()         # 1차 매수 기준 배수
+    sigma_2 = FloatField()         # 2차 매수 기준 배수
+    amount_1 = FloatField()
+    amount_2 = FloatField()
+    period_days = IntegerField()
+    buy_1_count = IntegerField()
+    buy_2_count = IntegerField()
+    total_invested = FloatField()
+    final_value = FloatField()
+    total_return_pct = FloatField()
+    buy_hold_return_pct = FloatField()
+    outperformance = FloatField()
+    created_at = DateTimeField(default=dt.datetime.now)
+
+    class Meta:
+        table_name = 'backtest_results'
+        indexes = (
+            (('run_id', 'window', 'years', 'sigma_1', 'sigma_2'), False),
         )
 
 
@@ -154,17 +274,169 @@ ALL_MODELS = [
     DailyPrice,
     MinutePrice,
     StatisticsCache,
+    VolatilityState,
     Setting,
+    Ticker,
+    ExchangeCode,
+    StockListing,
     AlertHistory,
+    AlertOutbox,
+    BacktestResult,
 ]
 
 
+def _add_missing_columns(models):
+    """기존 테이블에 모델에 새로 추가된 컬럼 반영 (nullable 컬럼만)"""
+    migrator = SqliteMigrator(db)
+    operations = []
+    for model in models:
+        table = model._meta.table_name
+        existing = {column.name for column in db.get_columns(table)}
+        for field in model._meta.sorted_fields:
+            if field.column_name not in existing and field.null:
+                operations.append(migrator.add_column(table, field.column_name, field))
+    if operations:
+        migrate(*operations)
+
+
+# 국가별 통화
+CURRENCIES = {'KR': 'KRW', 'US': 'USD'}
+
+# tickers 테이블로 옮긴 컬럼 (이전 스키마 DB 마이그레이션 대상)
+MOVED_TICKER_COLUMNS = {
+    'daily_prices': ('ticker_name',),
+    'minute_prices': ('ticker_name',),
+    'alert_history': ('ticker_name', 'country'),
+}
+
+
+def _pending_ticker_columns() -> dict:
+    """아직 삭제되지 않은 종목명/국가 컬럼 {table: [column, ...]}"""
+    pending = {}
+    for table, columns in MOVED_TICKER_COLUMNS.items():
+        existing = {column.name for column in db.get_columns(table)}
+        found = [column for column in columns if column in existing]
+        if found:
+            pending[table] = found
+    return pending
+
+
+def _normalize_tickers():
+    """
+    이전 스키마 DB 마이그레이션 (1회): 가격/알림 테이블의 종목명/국가를 tickers로 옮기고 컬럼 삭제
+    - 종목명 우선순위: 일봉 → 분봉 → 알림 이력 → 통계 캐시 → 관심 종목 → 상장 목록
+      (종목 코드와 같은 이름은 종목명이 없는 것으로 처리)
+    - 삭제 후 VACUUM으로 파일 크기 축소
+    """
+    if not _pending_ticker_columns():
+        return
+
+    print("🔧 종목 정보 정규화 중 (가격/알림 테이블 → tickers)...")
+    now = str(dt.datetime.now())
+    with db.atomic('IMMEDIATE'):
+        pending = _pending_ticker_columns()  # 다른 프로세스가 먼저 마이그레이션했는지 재확인
+        if not pending:
+            return
+
+        sources = []
+        for table, order in (('daily_prices', 'date'), ('minute_prices', 'datetime'),
+                             ('alert_history', 'alert_time')):
+            if 'ticker_name' in pending.get(table, ()):
+                country = 'country' if 'country' in pending[table] else 'NULL'
+                # 종목별 가장 최근 행의 이름 (SQLite: MAX()와 함께 조회한 컬럼은 그 행의 값)
+                sources.append(f"""
+                    SELECT ticker, name, country, NULL FROM (
+                        SELECT ticker, ticker_name AS name, {country} AS country, MAX({order})
+                        FROM {table}
+                        WHERE ticker_name NOT IN ('', ticker)
+                        GROUP BY ticker
+                    )
+                """)
+        sources += [
+            "SELECT ticker, NULLIF(ticker_name, ticker), country, NULL FROM statistics_cache",
+            "SELECT ticker, NULLIF(name, ''), country, NULL FROM user_watchlist",
+            "SELECT ticker, name, country, market FROM stock_listings "
+            "WHERE ticker IN (SELECT symbol FROM tickers)",
+            "SELECT ticker, NULL, 'US', exchange FROM exchange_codes "
+            "WHERE ticker IN (SELECT symbol FROM tickers)",
+        ]
+        # 이름이 없던 종목도 등록
+        sources += [f"SELECT DISTINCT ticker, NULL, NULL, NULL FROM {table}" for table in pending]
+
+        for source in sources:
+            db.execute_sql(f"""
+                WITH s (symbol, name, country, exchange) AS ({source})
+                INSERT INTO tickers (symbol, name, country, exchange, updated_at)
+                SELECT symbol, name, country, exchange, ? FROM s
+                WHERE true
+                ON CONFLICT (symbol) DO UPDATE SET
+                    name = COALESCE(tickers.name, excluded.name),
+                    country = COALESCE(tickers.country, excluded.country),
+                    exchange = COALESCE(tickers.exchange, excluded.exchange)
+            """, (now,))
+
+        db.execute_sql("UPDATE tickers SET country = CASE WHEN symbol GLOB '[0-9]*' THEN 'KR' ELSE 'US' END "
+                       "WHERE country IS NULL")
+        for country, currency in CURRENCIES.items():
+            db.execute_sql("UPDATE tickers SET currency = ? WHERE currency IS NULL AND country = ?",
+                           (currency, country))
+
+        migrator = SqliteMigrator(db)
+        migrate(*[migrator.drop_column(table, column)
+                  for table, columns in pending.items() for column in columns])
+
+    count = Ticker.select().count()
+    try:
+        db.execute_sql('VACUUM')
+    except OperationalError as e:
+        print(f"⚠️ VACUUM 실패 (다음에 수동 실행): {e}")
+    db.execute_sql('ANALYZE')
+    print(f"✅ 종목 정보 정규화 완료: {count}개 종목 "
+          f"({', '.join(f'{t}.{c}' for t, cols in pending.items() for c in cols)} 삭제)")
+
+
+# 알림 대상(사용자/관심 종목) 변경 시 버전 증가 (다른 프로세스의 캐시 무효화용)
+SUBSCRIBERS_VERSION_KEY = 'subscribers_version'
+
+
+def _create_triggers():
+    """알림 대상 변경 감지 트리거 생성"""
+    db.execute_sql(
+        "INSERT OR IGNORE INTO settings (key, value, description, created_at, updated_at) "
+        "VALUES (?, '0', '알림 대상 변경 버전', datetime('now'), datetime('now'))",
+        (SUBSCRIBERS_VERSION_KEY,)
+    )
+    for table in ('users', 'user_watchlist'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            db.execute_sql(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE settings SET value = CAST(value AS INTEGER) + 1
+                    WHERE key = '{SUBSCRIBERS_VERSION_KEY}';
+                END
+            """)
+
+
+_initialized_path = None
+
+
 def init_db(db_path: str = 'data/stock_data.db'):
-    """데이터베이스 초기화"""
+    """데이터베이스 초기화 (스키마 생성은 프로세스당 1회)"""
+    global _initialized_path
+    
+    if _initialized_path == db_path:
+        db.connect(reuse_if_open=True)
+        return db
+    
     db.init(db_path)
     db.connect(reuse_if_open=True)
     # 테이블이 없으면 생성 (기존 데이터 유지)
     db.create_tables(ALL_MODELS, safe=True)
+    _add_missing_columns(ALL_MODELS)
+    _normalize_tickers()
+    _create_triggers()
+    _initialized_path = db_path
     print(f"✅ Peewee DB 초기화 완료: {db_path}")
     return db
 
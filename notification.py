@@ -4,6 +4,40 @@
 """
 from database import StockDatabase
 from ntfy_alert import NtfyAlert
+from alert_outbox import get_outbox_worker
+
+# 프로세스 공용 DB 연결 (알림마다 연결/스키마 확인 반복 방지)
+_db = None
+
+# 종목별 알림 대상 캐시 (users/user_watchlist 변경 시 버전이 바뀌면 다시 로드)
+_subscribers = {}  # {ticker: [(user_id, ntfy_topic, investment_amount)]}
+_subscribers_version = None
+
+
+def _get_db() -> StockDatabase:
+    """공용 StockDatabase 반환"""
+    global _db
+    if _db is None:
+        _db = StockDatabase()
+    return _db
+
+
+def get_ticker_subscribers(ticker: str) -> list:
+    """
+    종목 알림 대상 사용자 조회 (캐시)
+    
+    Returns:
+        [(user_id, ntfy_topic, investment_amount), ...]
+    """
+    global _subscribers, _subscribers_version
+    
+    db = _get_db()
+    version = db.get_subscribers_version()
+    if version != _subscribers_version:
+        _subscribers = db.get_alert_subscribers()
+        _subscribers_version = version
+    
+    return _subscribers.get(ticker, [])
 
 
 def send_notification(user_id: int, message: str, title: str = None) -> bool:
@@ -18,11 +52,8 @@ def send_notification(user_id: int, message: str, title: str = None) -> bool:
     Returns:
         성공 여부
     """
-    db = StockDatabase()
-    
     # 사용자별 ntfy 토픽 조회
-    topic = db.get_user_ntfy_topic(user_id)
-    db.close()
+    topic = _get_db().get_user_ntfy_topic(user_id)
     
     if not topic:
         print(f"❌ 사용자 {user_id}의 ntfy 토픽이 설정되지 않았습니다.")
@@ -38,9 +69,7 @@ def send_stock_alert(user_id: int, ticker: str, name: str, current_price: float,
     """
     주식 알림 전송
     """
-    db = StockDatabase()
-    topic = db.get_user_ntfy_topic(user_id)
-    db.close()
+    topic = _get_db().get_user_ntfy_topic(user_id)
     
     if not topic:
         print(f"❌ 사용자 {user_id}의 ntfy 토픽이 설정되지 않았습니다.")
@@ -58,9 +87,7 @@ def send_morning_report(user_id: int, report: str) -> bool:
     """
     아침 리포트 전송
     """
-    db = StockDatabase()
-    topic = db.get_user_ntfy_topic(user_id)
-    db.close()
+    topic = _get_db().get_user_ntfy_topic(user_id)
     
     if not topic:
         print(f"❌ 사용자 {user_id}의 ntfy 토픽이 설정되지 않았습니다.")
@@ -77,16 +104,12 @@ def notify_all_users(message: str, title: str = None) -> int:
     Returns:
         성공한 사용자 수
     """
-    db = StockDatabase()
-    
-    conn = db.connect()
-    cursor = conn.cursor()
+    cursor = _get_db().connect().cursor()
     cursor.execute('''
         SELECT id, ntfy_topic FROM users 
         WHERE enabled = 1 AND notification_enabled = 1 AND ntfy_topic IS NOT NULL
     ''')
     users = cursor.fetchall()
-    db.close()
     
     success_count = 0
     for user_id, topic in users:
@@ -102,39 +125,29 @@ def send_stock_alert_to_all_with_check(ticker: str, name: str, current_price: fl
                                        target_price: float, signal_type: str = "1차 매수", 
                                        sigma: float = 1.0, country: str = 'US',
                                        prev_close: float = None, alert_level: str = '1x',
-                                       drop_rate: float = 0, alert_date: str = None) -> tuple:
+                                       drop_rate: float = 0, alert_date: str = None,
+                                       subscribers: list = None, hold: bool = False) -> tuple:
     """
     모든 활성 사용자에게 주식 알림 전송 (중복 체크 + DB 저장 포함)
     
+    알림은 이력과 함께 발송 큐(alert_outbox)에 기록되고, 실제 발송은
+    백그라운드 워커가 처리합니다 (실패 시 재시도, 성공 시 이력 sent=1).
+    
     Args:
         alert_date: 알림 날짜 (None이면 오늘, 시뮬레이션 시 지정)
+        subscribers: 미리 조회한 [(user_id, ntfy_topic, investment_amount)] (None이면 캐시에서 조회)
+        hold: True면 발송하지 않고 보류 (알림 시간 외, 아침 놓친 알림 요약으로 발송)
     
     Returns:
-        (success_count, skip_count) 튜플
+        (success_count, skip_count) 튜플 (success_count: 발송 큐 등록 수)
     """
     import os
     from datetime import date
     
-    db = StockDatabase()
-    
-    conn = db.connect()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT DISTINCT u.id, u.ntfy_topic, uw.investment_amount
-        FROM users u
-        JOIN user_watchlist uw ON u.id = uw.user_id
-        WHERE u.enabled = 1 
-          AND u.notification_enabled = 1 
-          AND u.ntfy_topic IS NOT NULL
-          AND uw.ticker = ?
-          AND uw.enabled = 1
-    ''', (ticker,))
-    
-    users = cursor.fetchall()
+    db = _get_db()
+    users = subscribers if subscribers is not None else get_ticker_subscribers(ticker)
     
     if not users:
-        db.close()
         return (0, 0)
     
     base_url = os.environ.get('WEB_BASE_URL', '')
@@ -149,8 +162,15 @@ def send_stock_alert_to_all_with_check(ticker: str, name: str, current_price: fl
         if not topic:
             continue
         
-        # 먼저 DB에 저장 시도 (중복이면 False 반환)
-        saved = db.record_alert(
+        ntfy = NtfyAlert(topic)
+        payload = ntfy.build_stock_alert(
+            ticker, name, current_price, target_price, 
+            signal_type, sigma, country=country, base_url=base_url,
+            investment_amount=investment_amount, prev_close=prev_close
+        )
+        
+        # 이력 + 발송 큐 저장 (중복이면 None)
+        outbox_id = db.enqueue_alert(
             user_id=user_id,
             ticker=ticker,
             ticker_name=name,
@@ -159,85 +179,24 @@ def send_stock_alert_to_all_with_check(ticker: str, name: str, current_price: fl
             target_price=target_price,
             current_price=current_price,
             drop_rate=drop_rate,
-            sent=True,
-            alert_date=today
+            server=ntfy.server,
+            payload=payload,
+            alert_date=today,
+            hold=hold
         )
         
-        if not saved:
+        if outbox_id is None:
             # 중복이므로 알림 스킵
             skip_count += 1
             continue
         
-        # 새 알림이면 발송
-        ntfy = NtfyAlert(topic)
-        if ntfy.send_stock_alert(
-            ticker, name, current_price, target_price, 
-            signal_type, sigma, country=country, base_url=base_url,
-            investment_amount=investment_amount, prev_close=prev_close
-        ):
-            success_count += 1
+        success_count += 1
     
-    db.close()
-    return (success_count, skip_count)
-
-
-def send_stock_alert_to_all(ticker: str, name: str, current_price: float,
-                            target_price: float, signal_type: str = "1차 매수", 
-                            sigma: float = 1.0, country: str = 'US',
-                            prev_close: float = None) -> int:
-    """
-    모든 활성 사용자에게 주식 알림 전송
-    (해당 종목을 관심 종목으로 등록한 사용자만)
-    
-    Args:
-        prev_close: 전일 종가 (하락률 계산용)
-    
-    Returns:
-        성공한 사용자 수
-    """
-    import os
-    
-    db = StockDatabase()
-    
-    conn = db.connect()
-    cursor = conn.cursor()
-    
-    # 해당 종목을 관심 종목으로 등록하고, ntfy 토픽이 설정된 활성 사용자 조회
-    # 사용자별 종목 투자금액도 함께 조회
-    cursor.execute('''
-        SELECT DISTINCT u.id, u.ntfy_topic, uw.investment_amount
-        FROM users u
-        JOIN user_watchlist uw ON u.id = uw.user_id
-        WHERE u.enabled = 1 
-          AND u.notification_enabled = 1 
-          AND u.ntfy_topic IS NOT NULL
-          AND uw.ticker = ?
-          AND uw.enabled = 1
-    ''', (ticker,))
+    # 발송 워커 깨우기 (네트워크 발송은 백그라운드에서)
+    if success_count and not hold:
+        get_outbox_worker(db.db_path).wake()
     
-    users = cursor.fetchall()
-    db.close()
-    
-    if not users:
-        print(f"⚠️ {ticker} 종목을 관심 종목으로 등록한 활성 사용자가 없습니다.")
-        return 0
-    
-    # 웹 대시보드 URL (환경변수에서 가져오기)
-    base_url = os.environ.get('WEB_BASE_URL', '')
-    
-    success_count = 0
-    for user_id, topic, investment_amount in users:
-        if topic:
-            ntfy = NtfyAlert(topic)
-            if ntfy.send_stock_alert(
-                ticker, name, current_price, target_price, 
-                signal_type, sigma, country=country, base_url=base_url,
-                investment_amount=investment_amount, prev_close=prev_close
-            ):
-                success_count += 1
-                print(f"✅ 사용자 {user_id}에게 {ticker} 알림 전송 완료")
-    
-    return success_count
+    return (success_count, skip_count)
 
 
 # 테스트
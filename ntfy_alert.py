@@ -1,10 +1,94 @@
 """
 ntfy 푸시 알림 모듈
 https://ntfy.sh 또는 셀프호스팅 ntfy 서버 사용
+- Keep-Alive 세션 공유, 429/5xx 재시도(지수 백오프)
+- 같은 토픽 알림 여러 건을 한 메시지로 병합 (발송 큐는 alert_outbox)
 """
+import os
+import threading
+from typing import Dict, List, Optional
+
 import requests
-import json
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MAX_PARALLEL = int(os.environ.get('NTFY_MAX_PARALLEL', '8'))  # 동시 발송 수 (연결 풀 크기)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 1.0      # 1s, 2s, 4s
+RETRY_STATUS = (429, 500, 502, 503, 504)
+REQUEST_TIMEOUT = 10      # 초
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """ntfy 공용 세션 (Keep-Alive + 재시도)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    status_forcelist=RETRY_STATUS,
+                    allowed_methods=frozenset(['POST']),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_PARALLEL,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def post_payload(server: str, payload: Dict) -> bool:
+    """ntfy JSON 발송 (동기)"""
+    try:
+        response = get_session().post(server, json=payload, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code == 200:
+            print(f"✅ ntfy 알림 전송 성공: {payload.get('title') or payload['message'][:30]}")
+            return True
+        print(f"❌ ntfy 알림 실패: {response.status_code} - {response.text}")
+        return False
+
+    except Exception as e:
+        print(f"❌ ntfy 알림 오류: {e}")
+        return False
+
+
+def merge_payloads(payloads: List[Dict]) -> Dict:
+    """같은 토픽 알림 여러 건을 한 메시지로 병합"""
+    if len(payloads) == 1:
+        return payloads[0]
+
+    first = payloads[0]
+    merged = {
+        'topic': first['topic'],
+        'title': f"🔔 알림 {len(payloads)}건",
+        'message': '\n\n'.join(
+            f"{p['title']}\n{p['message']}" if p.get('title') else p['message']
+            for p in payloads
+        ),
+    }
+
+    priority = max(p.get('priority', 3) for p in payloads)
+    if priority != 3:
+        merged['priority'] = priority
+
+    tags = list(dict.fromkeys(tag for p in payloads for tag in p.get('tags', [])))
+    if tags:
+        merged['tags'] = tags
+
+    clicks = {p.get('click') for p in payloads}
+    if len(clicks) == 1 and None not in clicks:
+        merged['click'] = clicks.pop()
+
+    return merged
 
 
 class NtfyAlert:
@@ -39,7 +123,11 @@ class NtfyAlert:
         Returns:
             성공 여부
         """
-        # JSON body 방식 사용 (이모지/유니코드 지원)
+        return post_payload(self.server, self.build_payload(message, title, priority, tags, click_url))
+    
+    def build_payload(self, message: str, title: Optional[str] = None, priority: int = 3,
+                       tags: Optional[list] = None, click_url: Optional[str] = None) -> dict:
+        """ntfy JSON body 생성 (이모지/유니코드 지원)"""
         payload = {
             "topic": self.topic,
             "message": message
@@ -57,25 +145,13 @@ class NtfyAlert:
         if click_url:
             payload["click"] = click_url
         
-        try:
-            response = requests.post(
-                self.server,
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                print(f"✅ ntfy 알림 전송 성공: {title or message[:30]}")
-                return True
-            else:
-                print(f"❌ ntfy 알림 실패: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ ntfy 알림 오류: {e}")
-            return False
+        return payload
     
-    def send_stock_alert(self, 
+    def send_stock_alert(self, *args, **kwargs) -> bool:
+        """주식 알림 전송 (인자는 build_stock_alert와 동일)"""
+        return post_payload(self.server, self.build_stock_alert(*args, **kwargs))
+    
+    def build_stock_alert(self, 
                          ticker: str, 
                          name: str,
                          current_price: float,
@@ -85,9 +161,9 @@ class NtfyAlert:
                          country: str = 'US',
                          base_url: str = None,
                          investment_amount: float = None,
-                         prev_close: float = None) -> bool:
+                         prev_close: float = None) -> dict:
         """
-        주식 알림 전송
+        주식 알림 메시지 생성 (ntfy JSON body)
         
         Args:
             ticker: 종목 코드
@@ -176,7 +252,7 @@ class NtfyAlert:
         if url_base:
             click_url = f"{url_base.rstrip('/')}/stocks/chart/{ticker}"
         
-        return self.send(
+        return self.build_payload(
             message=message,
             title=title,
             priority=priority,
@@ -0,0 +1,169 @@
+"""
+일봉 데이터 소스 (로컬 우선)
+
+조회 순서:
+1. SQLite (daily_prices)
+2. 부족한 최근 구간만 FinanceDataReader → 한국투자증권 API 순으로 조회
+3. 새로 받은 일봉은 DB에 저장 후 병합해서 반환
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import FinanceDataReader as fdr
+import pandas as pd
+
+from database import StockDatabase
+
+# 기간 시작 부분 허용 오차 (휴장일/상장일 차이)
+START_TOLERANCE_DAYS = 7
+
+# 미국장(한국시간 22:30~07:00) → 미국 거래일
+US_SESSION_SHIFT = timedelta(hours=12)
+
+# 현재 거래일에 이미 최신 여부를 확인한 종목 (휴장일 반복 조회 방지)
+_tail_checked = {}  # {ticker: 'YYYY-MM-DD'}
+
+
+def daily_frame_to_rows(ticker: str, name: str, df: pd.DataFrame) -> list:
+    """일봉 DataFrame → insert_daily_prices_bulk용 튜플 리스트 (컬럼 단위 변환)"""
+    close = df['Close'].astype(float)
+    columns = [
+        df[col].astype(float).fillna(close) if col in df else close
+        for col in ('Open', 'High', 'Low')
+    ]
+    volume = df['Volume'].fillna(0).astype('int64') if 'Volume' in df else [0] * len(df)
+    dates = df.index.strftime('%Y-%m-%d')
+
+    return list(zip(
+        [ticker] * len(df), [name] * len(df), dates,
+        *(col.tolist() for col in columns), close.tolist(),
+        [int(v) for v in volume]
+    ))
+
+
+def _last_business_day(today: datetime) -> str:
+    """오늘 이전 마지막 평일 (YYYY-MM-DD)"""
+    day = today.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.strftime('%Y-%m-%d')
+
+
+def session_date(country: str, now: datetime) -> str:
+    """
+    진행 중(또는 다음)인 거래일 (YYYY-MM-DD, 한국시간 기준 now)
+    - 이 날짜보다 이전 일봉만 확정 일봉 (미국장은 한국시간 다음날 새벽까지 이어짐)
+    """
+    if country == 'US':
+        now = now - US_SESSION_SHIFT
+    return now.strftime('%Y-%m-%d')
+
+
+def _fetch_remote(ticker: str, start_date: datetime, end_date: datetime,
+                  is_korean: bool) -> Optional[pd.DataFrame]:
+    """원격 조회 (FDR → KIS API)"""
+    # 1차: FDR
+    try:
+        print(f"  📥 [{ticker}] FDR 데이터 조회 중... ({start_date.strftime('%Y-%m-%d')} ~ {end_date.strftime('%Y-%m-%d')})")
+        df = fdr.DataReader(ticker, start_date, end_date)
+        if df is not None and not df.empty:
+            print(f"  ✅ [{ticker}] FDR 데이터 {len(df)}개 로드 완료")
+            return df
+    except Exception as e:
+        print(f"  ⚠️ [{ticker}] FDR 데이터 조회 실패: {e}")
+
+    # 2차: KIS API
+    try:
+        print(f"  📥 [{ticker}] KIS API로 재시도...")
+        from kis_api import KISApi
+        api = KISApi()
+
+        if is_korean:
+            df = api.get_daily_price_history(ticker,
+                start_date.strftime('%Y%m%d'),
+                end_date.strftime('%Y%m%d'))
+        else:
+            exchange = api.get_exchange_code(ticker)
+            df = api.get_overseas_daily_price_history(ticker, exchange,
+                start_date.strftime('%Y%m%d'),
+                end_date.strftime('%Y%m%d'))
+
+        api.close()
+
+        if df is not None and not df.empty:
+            print(f"  ✅ [{ticker}] KIS API 데이터 {len(df)}개 로드 완료")
+            return df
+        print(f"  ❌ [{ticker}] KIS API 데이터도 없음")
+    except Exception as e:
+        print(f"  ❌ [{ticker}] KIS API 조회도 실패: {e}")
+
+    return None
+
+
+def get_daily_history(ticker: str, start_date: datetime, end_date: datetime = None,
+                      country: str = 'KR', ticker_name: str = None,
+                      db: StockDatabase = None) -> Optional[pd.DataFrame]:
+    """
+    일봉 데이터 조회 (DB 우선, 누락 구간만 원격 조회 후 저장)
+
+    Args:
+        ticker: 종목 코드
+        start_date: 시작일
+        end_date: 종료일 (기본값: 오늘)
+        country: 국가 코드 ('KR' 또는 'US')
+        ticker_name: 종목명 (DB 저장용)
+        db: StockDatabase (없으면 새로 생성)
+
+    Returns:
+        DataFrame (index: 날짜, columns: Open/High/Low/Close/Volume) 또는 None
+    """
+    now = datetime.now()
+    end_date = end_date or now
+    db = db or StockDatabase()
+    today = now.strftime('%Y-%m-%d')
+    current_session = session_date(country, now)
+
+    local = db.get_daily_prices_range(ticker, start_date.strftime('%Y-%m-%d'),
+                                      end_date.strftime('%Y-%m-%d'))
+    if not local.empty:
+        local = (local.rename(columns=str.capitalize)
+                      .set_index('Date')
+                      .rename_axis(None))
+
+    # 원격 조회 구간 결정
+    if local.empty or local.index[0] > start_date + timedelta(days=START_TOLERANCE_DAYS):
+        # 로컬 데이터 없음/앞부분 부족 → 전체 조회
+        # (상장 기간이 요청 기간보다 짧은 종목은 같은 거래일에 다시 조회하지 않음)
+        if not local.empty and _tail_checked.get(ticker) == current_session:
+            return local
+        fetch_start = start_date
+    else:
+        last_date = local.index[-1].strftime('%Y-%m-%d')
+        # 마지막 일봉이 그 거래일 장중에 저장됐으면 잠정 종가 → 다시 받아 덮어씀
+        saved_at = db.get_daily_price_saved_at(ticker, last_date)
+        provisional = saved_at is not None and session_date(country, saved_at) <= last_date
+        is_fresh = ((not provisional and last_date >= _last_business_day(end_date))
+                    or end_date.strftime('%Y-%m-%d') < today
+                    or _tail_checked.get(ticker) == current_session)
+        if is_fresh:
+            return local
+        fetch_start = local.index[-1] if provisional else local.index[-1] + timedelta(days=1)
+
+    remote = _fetch_remote(ticker, fetch_start, end_date, country == 'KR')
+    _tail_checked[ticker] = current_session
+
+    if remote is None or remote.empty:
+        return local if not local.empty else None
+
+    remote.index = pd.to_datetime(remote.index)
+    remote = remote[remote.index >= pd.Timestamp(fetch_start.date())]
+
+    # 확정된 일봉만 저장 (진행 중인 거래일 봉은 장중 값일 수 있음)
+    confirmed = remote[remote.index.strftime('%Y-%m-%d') < current_session]
+    if not confirmed.empty:
+        db.insert_daily_prices_bulk(daily_frame_to_rows(ticker, ticker_name or ticker, confirmed))
+
+    columns = [col for col in ('Open', 'High', 'Low', 'Close', 'Volume') if col in remote]
+    merged = pd.concat([local, remote[columns]]) if not local.empty else remote
+    return merged[~merged.index.duplicated(keep='last')].sort_index()
@@ -0,0 +1,153 @@
+"""
+자주 실행되는 쿼리 실행 계획 점검 (EXPLAIN QUERY PLAN)
+- 실시간 모니터 종목 수집, 알림 대상 조회, 놓친 알림, 알림 내역, 차트 분봉,
+  일봉 컬럼형 로딩, 분봉 재생/보관 쿼리를 실제 코드와 같은 문장으로 점검
+- 계속 커지는 테이블(FACT_TABLES)을 인덱스 없이 전부 읽는 단계(SCAN)가 있으면 실패
+  (users/user_watchlist/tickers 같은 작은 테이블은 통계에 따라 전체 스캔이 더 싸서
+   플래너가 SCAN을 고르므로 판정하지 않음)
+
+사용법:
+    python query_plan.py              # 점검 (전체 스캔 발견 시 종료 코드 1)
+    python query_plan.py -v           # 쿼리별 실행 계획 출력
+    python query_plan.py --analyze    # 통계 갱신(ANALYZE) 후 점검
+"""
+
+import argparse
+import json
+import re
+import sys
+from typing import Dict, List
+
+from database import (StockDatabase, RECENT_MINUTES_SQL, TICKER_ALERTS_SQL,
+                      WATCHED_STOCKS_SQL)
+
+# 데이터가 계속 쌓이는 테이블 (전체 스캔 금지)
+FACT_TABLES = frozenset({'daily_prices', 'minute_prices', 'alert_history', 'alert_outbox',
+                         'statistics_cache', 'backtest_results'})
+
+_SAMPLE_TICKERS = json.dumps(['005930', 'AAPL'])
+
+# FROM/JOIN 뒤의 테이블과 별칭 (SQL 키워드는 별칭으로 보지 않음)
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?(\w+)"?)?', re.IGNORECASE)
+_KEYWORDS = {'on', 'where', 'join', 'left', 'inner', 'cross', 'order', 'group', 'limit', 'using'}
+
+
+def hot_queries() -> Dict[str, tuple]:
+    """
+    점검 대상 쿼리
+
+    Returns:
+        {이름: (sql, params)}
+    """
+    from alert_replay import MINUTE_BARS_SQL
+    from minute_archive import ARCHIVE_TICKERS_SQL
+
+    queries = {
+        # 실시간 모니터 초기화 (활성 사용자 → 관심 종목 → 종목명)
+        'watched_stocks': (WATCHED_STOCKS_SQL, ()),
+        # 알림 발송 대상 (구독 변경 시에만 전체 조회)
+        'alert_subscribers': StockDatabase._alert_subscribers_query().sql(),
+        # 놓친 알림 요약
+        'held_alerts': StockDatabase._held_alerts_query().sql(),
+        # 알림 내역 (웹)
+        'user_alerts': StockDatabase._user_alerts_query(1).sql(),
+        'user_ticker_alerts': StockDatabase._user_alerts_query(1, '005930').sql(),
+        'ticker_alerts': (TICKER_ALERTS_SQL, (_SAMPLE_TICKERS, 50)),
+        # 차트 분봉 (최근 390개)
+        'recent_minutes': (RECENT_MINUTES_SQL, ('005930', 390)),
+        # 일봉 컬럼형 로딩 (종목별 최근 N일 / 기간)
+        'daily_columnar_days': StockDatabase._daily_columnar_sql(['005930', 'AAPL'], days=252),
+        'daily_columnar_range': StockDatabase._daily_columnar_sql(
+            ['005930', 'AAPL'], start_date='2024-01-01', end_date='2024-12-31'),
+        # 분봉 재생 / 보관
+        'replay_minute_bars': (MINUTE_BARS_SQL, (_SAMPLE_TICKERS, '2024-01-01 00:00:00',
+                                                 '2024-02-01 00:00:00')),
+        'archive_tickers': (ARCHIVE_TICKERS_SQL, ('2024-01-01 08:00:00',)),
+    }
+    return {name: (sql, tuple(params)) for name, (sql, params) in queries.items()}
+
+
+def explain(db: StockDatabase, sql: str, params: tuple = ()) -> List[str]:
+    """실행 계획 단계 설명 목록"""
+    return [row[3] for row in db.connect().execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    """{별칭 또는 테이블명: 테이블명}"""
+    aliases = {}
+    for table, alias in _TABLE_PATTERN.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(sql: str, plan: List[str], tables: set = FACT_TABLES) -> List[str]:
+    """
+    tables 전체 스캔 단계 (인덱스 전체 스캔 포함, CTE/가상 테이블/서브쿼리 스캔은 제외)
+    """
+    aliases = _table_aliases(sql)
+    scans = []
+    for step in plan:
+        match = re.match(r'SCAN (\w+)', step)
+        if not match:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if table in tables:
+            scans.append(f"{table}: {step}")
+    return scans
+
+
+def check_query_plans(db: StockDatabase = None, verbose: bool = False) -> Dict[str, List[str]]:
+    """
+    점검 대상 쿼리 실행 계획 확인
+
+    Returns:
+        {쿼리 이름: [전체 스캔 단계, ...]} (문제 없으면 빈 dict)
+    """
+    own_db = db is None
+    db = db or StockDatabase()
+    try:
+        regressions = {}
+        for name, (sql, params) in hot_queries().items():
+            plan = explain(db, sql, params)
+            scans = full_scans(sql, plan)
+            if scans:
+                regressions[name] = scans
+            if verbose:
+                print(f"\n{'❌' if scans else '✅'} {name}")
+                for step in plan:
+                    print(f"      {step}")
+        return regressions
+    finally:
+        if own_db:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='자주 실행되는 쿼리 실행 계획 점검')
+    parser.add_argument('--db', default='data/stock_data.db', help='DB 경로')
+    parser.add_argument('--analyze', action='store_true', help='점검 전에 ANALYZE 실행')
+    parser.add_argument('-v', '--verbose', action='store_true', help='실행 계획 출력')
+    args = parser.parse_args()
+
+    db = StockDatabase(args.db)
+    try:
+        if args.analyze:
+            db.analyze()
+            print("✅ ANALYZE 완료")
+        regressions = check_query_plans(db, verbose=args.verbose)
+    finally:
+        db.close()
+
+    if regressions:
+        print(f"\n❌ 전체 테이블 스캔: {len(regressions)}개 쿼리")
+        for name, scans in regressions.items():
+            for scan in scans:
+                print(f"   {name} → {scan}")
+        sys.exit(1)
+    print(f"\n✅ 쿼리 {len(hot_queries())}개 실행 계획 정상 (전체 스캔 없음)")
+
+
+if __name__ == "__main__":
+    main()
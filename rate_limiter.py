@@ -0,0 +1,41 @@
+"""
+토큰 버킷 요청 속도 제한 (여러 스레드가 같은 버킷 공유)
+"""
+
+import threading
+import time
+
+# 한국투자증권 REST API 초당 호출 한도 (실전투자 20건/초, 여유분 제외)
+KIS_REQUESTS_PER_SEC = 15
+
+
+class TokenBucket:
+    """토큰 버킷 (rate: 초당 충전 토큰 수, capacity: 최대 버스트)"""
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """토큰 1개 예약 후 대기해야 할 시간(초) 반환"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """토큰 획득 (블로킹)"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+# 프로세스 공용 KIS API 버킷
+kis_rate_limiter = TokenBucket(KIS_REQUESTS_PER_SEC)
@@ -5,12 +5,17 @@
 - DEBUG_MODE=true로 24시간 활성화 가능
 """
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time
 from pathlib import Path
 from kis_websocket import KISWebSocket
-from database import StockDatabase
+from database import StockDatabase, shutdown_executor
 from volatility_analysis import analyze_daily_volatility
-from notification import send_stock_alert_to_all
+from rolling_volatility import RollingVolatility
+from minute_bar_writer import MinuteBarWriter
+from alert_index import ThresholdIndex
+from alert_outbox import get_outbox_worker
+import kis_http
 from config import load_config
 import FinanceDataReader as fdr
 import os
@@ -20,16 +25,23 @@ from log_utils import log, log_section, log_success, log_error, log_warning, log
 class HybridRealtimeMonitor:
     """하이브리드 실시간 모니터링"""
     
+    # 미국 주식 폴링 설정
+    US_POLL_INTERVAL = 60     # 조회 주기 (초)
+    US_POLL_CONCURRENCY = 8   # 동시 조회 종목 수
+    US_POLL_TIMEOUT = 10      # 종목별 조회 타임아웃 (초)
+    MINUTE_FLUSH_INTERVAL = 10  # 분봉 버퍼 저장 주기 (초)
+    
     def __init__(self):
         self.db = StockDatabase()
         self.ws = None  # WebSocket (한국 주식용)
+        self.minute_writer = MinuteBarWriter(self.db, flush_interval=self.MINUTE_FLUSH_INTERVAL)
         self.config = load_config()
         
         # 종목별 매수 목표가 캐시
         self.target_prices = {}  # {ticker: {'1x': price, '2x': price, 'name': name, 'country': country}}
         
-        # 알림 전송 이력 (중복 방지)
-        self.alert_history = {}  # {ticker: {'1x': timestamp, '2x': timestamp}}
+        # 목표가 인덱스 (당일 발생 레벨 기록으로 중복 방지)
+        self.threshold_index = ThresholdIndex({})
         
         # 디버그 모드 (시간 제한 없음)
         self.debug_mode = os.environ.get('DEBUG_MODE', 'false').lower() == 'true'
@@ -82,32 +94,7 @@ class HybridRealtimeMonitor:
         log_section("🚀 하이브리드 실시간 매수 알림 시스템 초기화")
         
         # 활성 사용자의 관심 종목 수집 (국가 정보 포함)
-        users = self.db.get_all_users()
-        
-        conn = self.db.connect()
-        cursor = conn.cursor()
-        
-        unique_stocks = {}  # {ticker: {'name': name, 'country': country}}
-        
-        for user in users:
-            if not user['enabled']:
-                continue
-            
-            cursor.execute('''
-                SELECT uw.ticker, dp.ticker_name, uw.country
-                FROM user_watchlist uw
-                LEFT JOIN daily_prices dp ON uw.ticker = dp.ticker
-                WHERE uw.user_id = ? AND uw.enabled = 1
-                GROUP BY uw.ticker
-            ''', (user['id'],))
-            
-            for row in cursor.fetchall():
-                ticker, name, country = row
-                if ticker not in unique_stocks:
-                    unique_stocks[ticker] = {
-                        'name': name or ticker,
-                        'country': country or 'US'
-                    }
+        unique_stocks = self.db.get_watched_stocks()  # {ticker: {'name': name, 'country': country}}
         
         if not unique_stocks:
             print("⚠️  활성 종목이 없습니다.")
@@ -122,6 +109,14 @@ class HybridRealtimeMonitor:
         print(f"🇰🇷 한국 주식: {len(korean_stocks)}개 (WebSocket, 09:00~15:30)")
         print(f"🇺🇸 미국 주식: {len(us_stocks)}개 (폴링, 22:30~07:00)")
         
+        # 저장된 일봉으로 롤링 변동성 상태 갱신 (네트워크 호출 없음)
+        volatility = RollingVolatility(self.db)
+        try:
+            applied = volatility.sync(list(unique_stocks.keys()))
+            print(f"\n📈 롤링 변동성 갱신: 신규 일봉 {applied}개 반영")
+        except Exception as e:
+            print(f"\n⚠️  롤링 변동성 갱신 실패: {e}")
+        
         # 매수 목표가 계산
         for ticker, info in unique_stocks.items():
             name = info['name']
@@ -130,7 +125,10 @@ class HybridRealtimeMonitor:
             print(f"\n📊 {name} ({ticker}) 분석 중...")
             
             try:
-                data = analyze_daily_volatility(ticker, name)
+                data = volatility.get_targets(ticker)
+                if not data:
+                    # 저장된 일봉이 부족하면 전체 분석
+                    data = analyze_daily_volatility(ticker, name, country=country)
                 
                 if data:
                     self.target_prices[ticker] = {
@@ -171,6 +169,9 @@ class HybridRealtimeMonitor:
                 print("   한국 주식도 분봉으로 모니터링합니다.")
                 self.ws = None
         
+        # 틱 판정용 목표가 인덱스
+        self.threshold_index = ThresholdIndex(self.target_prices)
+        
         print(f"\n✅ 초기화 완료: {len(self.target_prices)}개 종목 모니터링 준비")
         return len(self.target_prices) > 0
     
@@ -182,27 +183,20 @@ class HybridRealtimeMonitor:
             ticker: 종목코드
             current_price: 현재가
         """
-        if ticker not in self.target_prices:
+        # 목표가 인덱스로 판정 (대부분의 틱은 비교 1회로 종료)
+        levels = self.threshold_index.crossed(ticker, current_price)
+        if not levels:
             return
         
         targets = self.target_prices[ticker]
         name = targets['name']
-        country = targets['country']
         
         # 알림 시간 체크 (국가별)
-        is_alert_time = self._is_alert_time(country)
-        
-        # 테스트 매수 목표가 도달 확인 (0.5x)
-        if current_price <= targets['05x']:
-            await self._send_buy_alert(ticker, name, current_price, '05x', targets, send_now=is_alert_time)
+        is_alert_time = self._is_alert_time(targets['country'])
         
-        # 1차 매수 목표가 도달 확인
-        if current_price <= targets['1x']:
-            await self._send_buy_alert(ticker, name, current_price, '1x', targets, send_now=is_alert_time)
-        
-        # 2차 매수 목표가 도달 확인
-        if current_price <= targets['2x']:
-            await self._send_buy_alert(ticker, name, current_price, '2x', targets, send_now=is_alert_time)
+        # 도달한 레벨별 알림 (0.5x → 1x → 2x)
+        for level in levels:
+            await self._send_buy_alert(ticker, name, current_price, level, targets, send_now=is_alert_time)
     
     async def _send_buy_alert(self, ticker: str, name: str, current_price: float, level: str, targets: dict, send_now: bool = True):
         """
@@ -213,13 +207,7 @@ class HybridRealtimeMonitor:
         """
         from notification import send_stock_alert_to_all_with_check
         
-        # 중복 알림 방지 (5분 내 동일 종목+레벨 알림 방지 - 메모리 캐시)
         now = datetime.now()
-        cache_key = f"{ticker}_{level}"
-        if cache_key in self.alert_history:
-            last_alert = self.alert_history[cache_key]
-            if (now - last_alert).seconds < 300:  # 5분
-                return
         
         # 알림 레벨 텍스트
         if level == '05x':
@@ -265,8 +253,8 @@ class HybridRealtimeMonitor:
                 import traceback
                 traceback.print_exc()
         else:
-            # 알림 시간 외에는 DB에만 기록 (중복 체크 포함)
-            success_count, skip_count = send_stock_alert_to_all_with_check(
+            # 알림 시간 외에는 발송 큐에 보류로만 기록 (중복 체크 포함, 아침 놓친 알림 요약으로 발송)
+            send_stock_alert_to_all_with_check(
                 ticker=ticker,
                 name=name,
                 current_price=current_price,
@@ -276,19 +264,11 @@ class HybridRealtimeMonitor:
                 country=country,
                 prev_close=prev_close,
                 alert_level=level,
-                drop_rate=drop_rate
+                drop_rate=drop_rate,
+                hold=True
             )
-            # sent=False로 저장은 send_stock_alert_to_all_with_check에서 처리하지 않으므로
-            # 여기서는 로그만 출력
             print(f"💾 {name} ({ticker}) {level_text} 매수 시점 (장외: {now.strftime('%H:%M:%S')})")
-        
-        # 메모리 캐시 업데이트
-        self.alert_history[cache_key] = now
-        
-        # 알림 이력 기록 (중복 방지용)
-        if ticker not in self.alert_history:
-            self.alert_history[ticker] = {}
-        self.alert_history[ticker][level] = now
+
     
     async def monitor_korean_stocks_ws(self):
         """한국 주식 WebSocket 모니터링"""
@@ -310,18 +290,14 @@ class HybridRealtimeMonitor:
                 ticker = price_info['ticker']
                 current_price = price_info['current_price']
                 
-                # 분봉 데이터 DB 저장
+                # 1분봉 버퍼에 반영 (주기적으로 일괄 저장)
                 if ticker in korean_stocks:
-                    try:
-                        self.db.insert_minute_price(
-                            ticker=ticker,
-                            ticker_name=korean_stocks[ticker]['name'],
-                            datetime_str=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            price=current_price,
-                            volume=price_info.get('volume', 0)
-                        )
-                    except Exception as e:
-                        log_debug(f"  분봉 저장 오류 ({ticker}): {e}")
+                    self.minute_writer.add_tick(
+                        ticker,
+                        korean_stocks[ticker]['name'],
+                        current_price,
+                        price_info.get('trade_volume', 0)
+                    )
                 
                 await self.check_and_alert(ticker, current_price)
             
@@ -335,14 +311,50 @@ class HybridRealtimeMonitor:
         except Exception as e:
             print(f"⚠️  WebSocket 오류: {e}")
     
+    async def _fetch_us_price(self, kis_api, ticker: str, semaphore: asyncio.Semaphore,
+                              executor: ThreadPoolExecutor):
+        """미국 주식 현재가 조회 (동시 실행 제한 + 타임아웃, 속도 제한은 kis_http에서 처리)"""
+        loop = asyncio.get_running_loop()
+        
+        async with semaphore:
+            # 1순위: KIS API
+            if kis_api:
+                try:
+                    price_info = await asyncio.wait_for(
+                        loop.run_in_executor(executor, kis_api.get_overseas_stock_price_auto, ticker),
+                        timeout=self.US_POLL_TIMEOUT
+                    )
+                    if price_info:
+                        return price_info['current_price']
+                except asyncio.TimeoutError:
+                    print(f"  ⚠️  KIS API 타임아웃 ({ticker})")
+                except Exception as e:
+                    print(f"  ⚠️  KIS API 오류 ({ticker}): {e}")
+            
+            # 2순위: FDR (Fallback)
+            try:
+                today = datetime.now()
+                df = await asyncio.wait_for(
+                    loop.run_in_executor(executor, fdr.DataReader, ticker, today.date(), today),
+                    timeout=self.US_POLL_TIMEOUT
+                )
+                if df is not None and not df.empty:
+                    return float(df['Close'].iloc[-1])
+            except asyncio.TimeoutError:
+                log_debug(f"  FDR 타임아웃 ({ticker})")
+            except Exception as e:
+                log_debug(f"  FDR 오류 ({ticker}): {e}")
+        
+        return None
+    
     async def monitor_us_stocks_poll(self):
-        """미국 주식 폴링 모니터링 (1분 간격) - KIS API 우선"""
+        """미국 주식 폴링 모니터링 (1분 간격, 종목 동시 조회) - KIS API 우선"""
         us_stocks = {t: p for t, p in self.target_prices.items() if p['country'] == 'US'}
         
         if not us_stocks:
             return
         
-        print(f"\n🇺🇸 미국 주식 폴링 모니터링 시작... ({len(us_stocks)}개)")
+        print(f"\n🇺🇸 미국 주식 폴링 모니터링 시작... ({len(us_stocks)}개, 동시 {self.US_POLL_CONCURRENCY}개)")
         
         # KIS API 초기화
         kis_api = None
@@ -354,57 +366,50 @@ class HybridRealtimeMonitor:
             print(f"  ⚠️  KIS API 비활성화: {e}")
             print(f"     FinanceDataReader로 대체합니다.")
         
-        while True:
-            # 미국장 시간 체크
-            if not self._is_alert_time('US'):
-                now_time = datetime.now().strftime('%H:%M')
-                log_debug(f"미국장 시간 외 ({now_time}) - 22:30~07:00만 모니터링")
-                await asyncio.sleep(60)
-                continue
-            
-            for ticker, targets in us_stocks.items():
-                try:
-                    current_price = None
-                    
-                    # 1순위: KIS API
-                    if kis_api:
-                        try:
-                            price_info = kis_api.get_overseas_stock_price_auto(ticker)
-                            if price_info:
-                                current_price = price_info['current_price']
-                        except Exception as e:
-                            print(f"  ⚠️  KIS API 오류 ({ticker}): {e}")
-                    
-                    # 2순위: FDR (Fallback)
-                    if current_price is None:
-                        try:
-                            df = fdr.DataReader(ticker, datetime.now().date(), datetime.now())
-                            if df is not None and not df.empty:
-                                current_price = float(df['Close'].iloc[-1])
-                        except Exception as e:
-                            log_debug(f"  FDR 오류 ({ticker}): {e}")
-                    
-                    # 알림 확인 + 분봉 데이터 저장
-                    if current_price:
-                        # 분봉 데이터 DB 저장
-                        try:
-                            self.db.insert_minute_price(
-                                ticker=ticker,
-                                ticker_name=targets['name'],
-                                datetime_str=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                                price=current_price,
-                                volume=0
-                            )
-                        except Exception as e:
-                            log_debug(f"  분봉 저장 오류 ({ticker}): {e}")
-                        
-                        await self.check_and_alert(ticker, current_price)
+        # 블로킹 HTTP 호출은 전용 스레드 풀에서 실행 (이벤트 루프/WebSocket 보호)
+        semaphore = asyncio.Semaphore(self.US_POLL_CONCURRENCY)
+        executor = ThreadPoolExecutor(max_workers=self.US_POLL_CONCURRENCY,
+                                      thread_name_prefix='us-poll')
+        
+        try:
+            while True:
+                # 미국장 시간 체크
+                if not self._is_alert_time('US'):
+                    now_time = datetime.now().strftime('%H:%M')
+                    log_debug(f"미국장 시간 외 ({now_time}) - 22:30~07:00만 모니터링")
+                    await asyncio.sleep(self.US_POLL_INTERVAL)
+                    continue
                 
-                except Exception as e:
-                    print(f"⚠️  {ticker} 조회 오류: {e}")
-            
-            # 1분 대기
-            await asyncio.sleep(60)
+                started = asyncio.get_running_loop().time()
+                tickers = list(us_stocks.keys())
+                results = await asyncio.gather(
+                    *(self._fetch_us_price(kis_api, t, semaphore, executor) for t in tickers),
+                    return_exceptions=True
+                )
+                
+                prices = {}
+                for ticker, result in zip(tickers, results):
+                    if isinstance(result, Exception):
+                        print(f"⚠️  {ticker} 조회 오류: {result}")
+                    elif result:
+                        prices[ticker] = result
+                        self.minute_writer.add_tick(ticker, us_stocks[ticker]['name'], result)
+                
+                # 알림 확인
+                for ticker, price in prices.items():
+                    try:
+                        await self.check_and_alert(ticker, price)
+                    except Exception as e:
+                        print(f"⚠️  {ticker} 알림 확인 오류: {e}")
+                
+                elapsed = asyncio.get_running_loop().time() - started
+                log_debug(f"🇺🇸 폴링 {len(prices)}/{len(tickers)}개 ({elapsed:.1f}초)")
+                
+                # 다음 주기까지 대기 (조회 시간 제외)
+                await asyncio.sleep(max(0, self.US_POLL_INTERVAL - elapsed))
+        finally:
+            # 작업 스레드의 DB 연결(토큰/거래소 코드 조회)도 닫음
+            shutdown_executor(executor, self.US_POLL_CONCURRENCY, wait=False)
     
     async def start_monitoring(self):
         """모니터링 시작"""
@@ -419,11 +424,18 @@ class HybridRealtimeMonitor:
         print("="*70)
         
         try:
-            # 한국/미국 주식 동시 모니터링
-            await asyncio.gather(
-                self.monitor_korean_stocks_ws(),
-                self.monitor_us_stocks_poll()
-            )
+            # 이전 실행에서 발송하지 못한 알림부터 발송
+            get_outbox_worker(self.db.db_path).wake()
+            
+            # 한국/미국 주식 동시 모니터링 + 분봉 주기 저장
+            writer_task = asyncio.create_task(self.minute_writer.run())
+            try:
+                await asyncio.gather(
+                    self.monitor_korean_stocks_ws(),
+                    self.monitor_us_stocks_poll()
+                )
+            finally:
+                writer_task.cancel()
         
         except KeyboardInterrupt:
             print("\n\n⏸️  사용자가 종료했습니다.")
@@ -440,9 +452,18 @@ class HybridRealtimeMonitor:
             await self.ws.disconnect()
             self.ws.close()
         
+        # 버퍼에 남은 분봉 저장
+        await self.minute_writer.close()
+        
+        # 발송 큐에 남은 알림 발송 (실패분은 DB에 남아 다음 실행 시 재시도)
+        get_outbox_worker(self.db.db_path).close()
+        
         if self.db:
             self.db.close()
         
+        kis_http.print_latency_stats()
+        kis_http.close_session()
+        
         print("✅ 정리 완료")
 
 
@@ -29,8 +29,6 @@ def reset_alert_history(db_path='data/stock_data.db'):
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
             ticker TEXT NOT NULL,
-            ticker_name TEXT NOT NULL,
-            country TEXT NOT NULL,
             alert_level TEXT NOT NULL,
             alert_date TEXT NOT NULL,
             target_price REAL NOT NULL,
@@ -0,0 +1,235 @@
+"""
+롤링 변동성 (증분 계산)
+종목별 일일 수익률의 합계/제곱합을 DB(volatility_state)에 유지하고
+새 일봉이 들어오면 윈도우에 들어오는 수익률을 더하고 빠지는 수익률을 빼서 O(1)로 갱신
+
+- 표준편차: 표본 표준편차 (ddof=1, pandas .std()와 동일)
+- 수익률 단위: % (volatility_analysis와 동일)
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import StockDatabase, int_dates_to_datetime64
+
+DEFAULT_WINDOW = 252  # 약 1년 (거래일)
+MIN_RETURNS = 30      # 통계 계산 최소 수익률 개수
+
+
+def _ymd_to_str(ymd) -> str:
+    """YYYYMMDD 정수 → 'YYYY-MM-DD'"""
+    return str(int_dates_to_datetime64(np.asarray([ymd]))[0])
+
+
+class RollingVolatility:
+    """종목별 롤링 변동성 상태 관리"""
+
+    def __init__(self, db: StockDatabase = None, window: int = DEFAULT_WINDOW):
+        self.db = db or StockDatabase()
+        self.window = window
+
+    # ========================================
+    # 상태 생성 / 갱신
+    # ========================================
+
+    def rebuild(self, tickers: List[str] = None) -> int:
+        """
+        일봉 데이터로 상태 전체 재계산
+
+        Args:
+            tickers: 종목 리스트 (None이면 전체)
+
+        Returns:
+            저장된 종목 수
+        """
+        prices = self.db.load_daily_prices_columnar(tickers, days=self.window + 1)
+
+        states = []
+        for ticker in prices.tickers:
+            close = prices.view(ticker, 'close')
+            if len(close) < 2:
+                continue
+
+            dates = prices.view(ticker, 'date')
+            returns = np.diff(close) / close[:-1] * 100
+
+            states.append({
+                'ticker': ticker,
+                'window': self.window,
+                'count': len(returns),
+                'sum_return': float(returns.sum()),
+                'sum_sq_return': float(np.dot(returns, returns)),
+                'first_date': _ymd_to_str(dates[0]),
+                'last_date': _ymd_to_str(dates[-1]),
+                'last_close': float(close[-1]),
+            })
+
+        if states:
+            self.db.save_volatility_states(states)
+        return len(states)
+
+    def _apply(self, state: Dict, date: str, close: float) -> bool:
+        """상태에 일봉 1개 반영 (O(1))"""
+        if state['last_date'] and date <= state['last_date']:
+            return False
+
+        r = (close / state['last_close'] - 1) * 100
+        state['count'] += 1
+        state['sum_return'] += r
+        state['sum_sq_return'] += r * r
+
+        # 윈도우를 벗어난 가장 오래된 수익률 제거
+        if state['count'] > self.window:
+            oldest = self.db.get_closes_from(state['ticker'], state['first_date'], limit=2)
+            if len(oldest) == 2:
+                (_, base_close), (next_date, next_close) = oldest
+                r_old = (next_close / base_close - 1) * 100
+                state['count'] -= 1
+                state['sum_return'] -= r_old
+                state['sum_sq_return'] -= r_old * r_old
+                state['first_date'] = next_date
+
+        state['last_date'] = date
+        state['last_close'] = close
+        return True
+
+    def update(self, ticker: str, date: str, close: float) -> Optional[Dict]:
+        """
+        새 일봉 1개 반영 후 목표가 반환
+
+        Args:
+            ticker: 종목 코드
+            date: 일봉 날짜 (YYYY-MM-DD)
+            close: 종가
+        """
+        state = self.db.get_volatility_state(ticker, self.window)
+        if state is None:
+            self.rebuild([ticker])
+        elif self._apply(state, str(date)[:10], float(close)):
+            self.db.save_volatility_states([state])
+        return self.get_targets(ticker)
+
+    def sync(self, tickers: List[str]) -> int:
+        """
+        DB에 저장된 일봉 중 아직 반영되지 않은 봉만 상태에 반영 (네트워크 호출 없음)
+        - 마지막으로 반영한 일봉의 종가가 바뀐 종목은 상태 재계산
+
+        Returns:
+            반영된 일봉 수
+        """
+        states = self.db.get_volatility_states(tickers, self.window)
+
+        missing = [t for t in tickers if t not in states]
+        if missing:
+            self.rebuild(missing)
+        if not states:
+            return 0
+
+        start_date = min(s['last_date'] for s in states.values())
+        prices = self.db.load_daily_prices_columnar(list(states.keys()), start_date=start_date)
+
+        applied = 0
+        changed = []
+        revised = []
+        for ticker, state in states.items():
+            dates = prices.view(ticker, 'date')
+            if len(dates) == 0:
+                continue
+
+            close = prices.view(ticker, 'close')
+            last_ymd = int(state['last_date'].replace('-', ''))
+            new = np.flatnonzero(dates > last_ymd)
+
+            # 이미 반영한 마지막 일봉의 종가가 수정됐으면 (잠정 종가 → 확정 종가) 다시 계산
+            last = np.flatnonzero(dates == last_ymd)
+            if len(last) and float(close[last[0]]) != state['last_close']:
+                revised.append(ticker)
+                applied += len(new) + 1
+                continue
+
+            for i in new:
+                if self._apply(state, _ymd_to_str(dates[i]), float(close[i])):
+                    applied += 1
+            if len(new):
+                changed.append(state)
+
+        if changed:
+            self.db.save_volatility_states(changed)
+        if revised:
+            self.rebuild(revised)
+        return applied
+
+    # ========================================
+    # 조회
+    # ========================================
+
+    def get_stats(self, ticker: str) -> Optional[Dict]:
+        """평균/표준편차 조회 (수익률 개수 부족 시 None)"""
+        state = self.db.get_volatility_state(ticker, self.window)
+        if not state or state['count'] < MIN_RETURNS:
+            return None
+
+        n = state['count']
+        mean_return = state['sum_return'] / n
+        variance = (state['sum_sq_return'] - state['sum_return'] ** 2 / n) / (n - 1)
+
+        return {
+            'count': n,
+            'mean_return': mean_return,
+            'std_return': math.sqrt(max(variance, 0.0)),
+            'current_price': state['last_close'],
+            'data_date': state['last_date'],
+        }
+
+    def get_targets(self, ticker: str) -> Optional[Dict]:
+        """
+        매수 목표가 조회 (analyze_daily_volatility 결과와 같은 키)
+        """
+        stats = self.get_stats(ticker)
+        if not stats:
+            return None
+
+        std_return = stats['std_return']
+        current_price = stats['current_price']
+
+        drop_05x = std_return * 0.5
+        drop_1x = std_return
+        drop_2x = std_return * 2
+
+        return {
+            **stats,
+            'drop_05x': drop_05x,
+            'drop_1x': drop_1x,
+            'drop_2x': drop_2x,
+            'target_05x': current_price * (1 - drop_05x / 100),
+            'target_1x': current_price * (1 - drop_1x / 100),
+            'target_2x': current_price * (1 - drop_2x / 100),
+        }
+
+    def cache_targets(self, ticker: str, ticker_name: str = None,
+                      country: str = None) -> Optional[Dict]:
+        """목표가 계산 후 당일 통계 캐시에 저장"""
+        targets = self.get_targets(ticker)
+        if not targets:
+            return None
+
+        self.db.update_statistics_cache(
+            ticker=ticker,
+            date=datetime.now().strftime('%Y-%m-%d'),
+            ticker_name=ticker_name,
+            country=country,
+            data_date=targets['data_date'],
+            mean_return=targets['mean_return'],
+            std_dev=targets['std_return'],
+            current_price=targets['current_price'],
+            target_05sigma=targets['target_05x'],
+            target_1sigma=targets['target_1x'],
+            target_2sigma=targets['target_2x'],
+            drop_05x=targets['drop_05x'],
+            drop_1x=targets['drop_1x'],
+            drop_2x=targets['drop_2x']
+        )
+        return targets
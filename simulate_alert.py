@@ -3,6 +3,7 @@
 과거 분봉 데이터 기반 알림 시뮬레이션
 - 특정 날짜의 분봉 데이터를 순회하며 알림 발생 시점 확인
 - 실제 알림 발송 테스트 가능
+- 기간 재생(--end)은 alert_replay 사용 (로컬 DB만)
 """
 
 import argparse
@@ -36,10 +37,10 @@ def simulate_alerts(ticker: str, target_date: str, send_alert: bool = False):
     
     # 종목 정보 가져오기
     cursor.execute('''
-        SELECT DISTINCT ticker_name FROM minute_prices WHERE ticker = ?
+        SELECT name FROM tickers WHERE symbol = ?
     ''', (ticker,))
     row = cursor.fetchone()
-    name = row[0] if row else ticker
+    name = row[0] if row and row[0] else ticker
     
     # 국가 판별
     country = 'KR' if ticker.isdigit() or (len(ticker) == 6 and ticker[0].isdigit()) else 'US'
@@ -289,10 +290,16 @@ def main():
     parser = argparse.ArgumentParser(description='과거 분봉 데이터 알림 시뮬레이션')
     parser.add_argument('--ticker', '-t', required=True, help='종목 코드')
     parser.add_argument('--date', '-d', required=True, help='시뮬레이션 날짜 (YYYY-MM-DD)')
+    parser.add_argument('--end', '-e', help='종료 날짜 (지정 시 저장된 일봉/분봉으로 기간 재생, KIS 조회 없음)')
     parser.add_argument('--send', '-s', action='store_true', help='실제 알림 발송')
     
     args = parser.parse_args()
     
+    if args.end:
+        from alert_replay import replay_alerts, print_report
+        print_report(replay_alerts([args.ticker], args.date, args.end))
+        return
+    
     simulate_alerts(args.ticker, args.date, args.send)
 
 
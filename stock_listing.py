@@ -0,0 +1,196 @@
+"""
+거래소 상장 종목 목록 스냅샷
+- FDR 종목 목록을 stock_listings 테이블에 저장 (첫 요청에서 다운로드하지 않음)
+- 갱신은 한 트랜잭션으로 통째로 교체 → 읽는 쪽은 항상 완전한 이전/새 목록만 봄
+- 프로세스별 메모리 스냅샷은 DB 버전이 바뀌면 다시 로드 (RELOAD_CHECK_SECONDS마다 확인)
+- 백그라운드 스레드가 STOCK_LISTING_REFRESH_HOURS마다 갱신 (여러 프로세스 중 한 곳만)
+
+사용법:
+    python stock_listing.py          # KR/US 종목 목록 즉시 갱신
+    python stock_listing.py KR
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from database import StockDatabase
+from stock_search import StockSearchIndex, get_search_index as _get_search_index
+
+# 국가별 종목 목록 출처 (FDR 시장 코드, 저장할 시장명)
+LISTING_SOURCES = {
+    'KR': [('KOSPI', 'KOSPI'), ('KOSDAQ', 'KOSDAQ'), ('ETF/KR', 'ETF')],
+    'US': [('NASDAQ', 'NASDAQ'), ('NYSE', 'NYSE'), ('ETF/US', 'ETF')],
+}
+
+REFRESH_HOURS = float(os.environ.get('STOCK_LISTING_REFRESH_HOURS', '24'))
+REFRESH_CHECK_SECONDS = 600   # 백그라운드 스레드 갱신 필요 여부 확인 주기
+RELOAD_CHECK_SECONDS = 60     # 메모리 스냅샷의 DB 버전 확인 주기
+
+
+class ListingSnapshot:
+    """한 버전의 종목 목록 (읽기 전용, 교체는 참조 바꾸기로)"""
+
+    def __init__(self, version: int, rows: List[tuple]):
+        self.version = version
+        self.stocks = [{'ticker': ticker, 'name': name, 'market': market}
+                       for ticker, name, market in rows]
+        self.names = {}
+        for ticker, name, _ in rows:
+            self.names.setdefault(ticker, name)
+        self.checked_at = time.monotonic()
+
+
+_snapshots: Dict[str, ListingSnapshot] = {}
+_lock = threading.Lock()
+_refresh_thread = None
+_thread_lock = threading.Lock()
+
+
+def fetch_listing(country: str, strict: bool = True) -> List[tuple]:
+    """
+    FDR에서 종목 목록 다운로드
+
+    Args:
+        strict: True면 한 시장이라도 실패 시 빈 리스트 (일부만 있는 목록으로 교체 방지)
+
+    Returns:
+        [(ticker, name, market), ...]
+    """
+    import FinanceDataReader as fdr
+
+    rows = []
+    for source, market in LISTING_SOURCES[country]:
+        try:
+            df = fdr.StockListing(source)
+        except Exception as e:
+            print(f"❌ {source} 종목 목록 다운로드 실패: {e}")
+            if strict:
+                return []
+            continue
+
+        code_column = 'Code' if 'Code' in df.columns else 'Symbol'
+        tickers = df[code_column].fillna('').astype(str).str.strip()
+        names = df['Name'].fillna('').astype(str).str.strip()
+        valid = tickers != ''
+        rows.extend((ticker, name, market)
+                    for ticker, name in zip(tickers[valid].tolist(), names[valid].tolist()))
+    return rows
+
+
+def _claim_refresh(db: StockDatabase, country: str, version: int) -> bool:
+    """갱신 권한 획득 (목록이 없으면 REFRESH_CHECK_SECONDS 후 재시도 허용)"""
+    max_age = REFRESH_HOURS if version else REFRESH_CHECK_SECONDS / 3600
+    return db.claim_stock_listing_refresh(country, max_age)
+
+
+def refresh_listing(country: str, db: StockDatabase = None) -> bool:
+    """
+    종목 목록 다운로드 후 DB 스냅샷 교체 (다운로드 실패 시 기존 목록 유지)
+
+    Returns:
+        교체 여부
+    """
+    own_db = db is None
+    db = db or StockDatabase()
+    try:
+        has_snapshot = db.get_stock_listing_version(country) > 0
+        print(f"📥 {country} 종목 목록 다운로드 중...")
+        rows = fetch_listing(country, strict=has_snapshot)
+        if not rows:
+            print(f"⚠️ {country} 종목 목록 갱신 실패 (기존 목록 유지)")
+            return False
+
+        version = db.replace_stock_listings(country, rows)
+        print(f"✅ {country} 종목 목록 {len(rows)}개 저장 (버전 {version})")
+        return True
+    finally:
+        if own_db:
+            db.close()
+
+
+def get_snapshot(country: str) -> ListingSnapshot:
+    """
+    현재 종목 목록 스냅샷 (메모리, DB 버전이 바뀌면 다시 로드)
+
+    DB에 목록이 한 번도 저장되지 않았으면 이 자리에서 한 번 다운로드합니다.
+    """
+    snapshot = _snapshots.get(country)
+    if snapshot is not None and time.monotonic() - snapshot.checked_at < RELOAD_CHECK_SECONDS:
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshots.get(country)
+        if snapshot is not None and time.monotonic() - snapshot.checked_at < RELOAD_CHECK_SECONDS:
+            return snapshot
+
+        db = StockDatabase()
+        try:
+            version = db.get_stock_listing_version(country)
+            if version == 0 and _claim_refresh(db, country, 0) and refresh_listing(country, db):
+                version = db.get_stock_listing_version(country)
+
+            if snapshot is not None and snapshot.version == version:
+                snapshot.checked_at = time.monotonic()
+                return snapshot
+
+            snapshot = ListingSnapshot(version, db.get_stock_listings(country))
+        finally:
+            db.close()
+
+        if version == 0:
+            return snapshot  # 다른 곳에서 다운로드 중이거나 실패 → 다음 요청에서 다시 확인
+        _snapshots[country] = snapshot
+        if snapshot.stocks:
+            print(f"✅ {country} 종목 목록 {len(snapshot.stocks)}개 로드됨 (버전 {snapshot.version})")
+        return snapshot
+
+
+def get_listing(country: str) -> List[Dict]:
+    """국가별 종목 목록 ([{'ticker', 'name', 'market'}, ...])"""
+    return get_snapshot(country).stocks
+
+
+def find_name(country: str, ticker: str) -> Optional[str]:
+    """종목 코드로 종목명 조회 (없으면 None)"""
+    return get_snapshot(country).names.get(ticker)
+
+
+def get_search_index(country: str) -> StockSearchIndex:
+    """현재 종목 목록 버전의 검색 인덱스"""
+    snapshot = get_snapshot(country)
+    return _get_search_index(country, lambda: snapshot.stocks, version=snapshot.version)
+
+
+def _refresh_loop():
+    db = StockDatabase()
+    try:
+        while True:
+            for country in LISTING_SOURCES:
+                try:
+                    if _claim_refresh(db, country, db.get_stock_listing_version(country)):
+                        refresh_listing(country, db)
+                    get_search_index(country)  # 새 버전 미리 로드 (첫 검색 대기 방지)
+                except Exception as e:
+                    print(f"❌ {country} 종목 목록 갱신 오류: {e}")
+            time.sleep(REFRESH_CHECK_SECONDS)
+    finally:
+        db.close()
+
+
+def start_background_refresh():
+    """종목 목록 백그라운드 갱신 스레드 시작 (프로세스당 1회)"""
+    global _refresh_thread
+    with _thread_lock:
+        if _refresh_thread is None:
+            _refresh_thread = threading.Thread(target=_refresh_loop, name='stock-listing',
+                                               daemon=True)
+            _refresh_thread.start()
+
+
+if __name__ == "__main__":
+    countries = [c.upper() for c in sys.argv[1:]] or list(LISTING_SOURCES)
+    for country in countries:
+        refresh_listing(country)
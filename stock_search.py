@@ -0,0 +1,267 @@
+"""
+종목 검색 인덱스 (자동완성용)
+- 티커/종목명을 소문자로 미리 변환해 한 문자열(blob)로 이어 붙이고 str.find로 부분 검색
+- 정렬된 티커/종목명 배열로 접두어 검색 (bisect)
+- 한글: 초성 검색 (ㅅㅅㅈㅈ → 삼성전자), 입력 중인 마지막 글자 (삼성저 → 삼성전자)
+- 국가별 인덱스를 data/stock_search_{country}.pkl에 저장해 다음 실행 시 바로 로드
+  (종목 목록 버전이 바뀌면 다시 생성)
+"""
+
+import os
+import pickle
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+INDEX_DIR = 'data'
+INDEX_VERSION = 1
+INDEX_MAX_AGE_DAYS = 7   # 저장된 인덱스 재사용 기간
+
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_CHOSEONG_SET = frozenset(CHOSEONG)
+_HANGUL_BASE, _HANGUL_LAST = 0xAC00, 0xD7A3
+MAX_SCAN = 200   # 한글 검색 시 정렬 전 수집할 최대 후보 수
+
+
+def to_choseong(text: str) -> str:
+    """한글 음절을 초성으로 변환 (그 외 문자는 그대로, 길이 유지)"""
+    chars = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            chars.append(CHOSEONG[(code - _HANGUL_BASE) // 588])
+        else:
+            chars.append(ch)
+    return ''.join(chars)
+
+
+def _is_hangul(ch: str) -> bool:
+    return ch in _CHOSEONG_SET or _HANGUL_BASE <= ord(ch) <= _HANGUL_LAST
+
+
+def _char_matches(q: str, n: str, is_last: bool) -> bool:
+    """
+    검색어 글자 q가 종목명 글자 n과 맞는지
+    - 초성(ㅅ)은 같은 초성 음절과 일치
+    - 마지막 글자가 받침 없는 음절(저)이면 받침만 다른 음절(전)과도 일치 (입력 중)
+    """
+    if q == n:
+        return True
+    if q in _CHOSEONG_SET:
+        return to_choseong(n) == q
+    if is_last:
+        qc, nc = ord(q) - _HANGUL_BASE, ord(n) - _HANGUL_BASE
+        if 0 <= qc <= _HANGUL_LAST - _HANGUL_BASE and 0 <= nc <= _HANGUL_LAST - _HANGUL_BASE:
+            return qc % 28 == 0 and qc // 28 == nc // 28
+    return False
+
+
+class StockSearchIndex:
+    """종목 검색 인덱스 (국가별)"""
+
+    def __init__(self, stocks: List[Dict]):
+        """
+        Args:
+            stocks: [{'ticker', 'name', 'market'}, ...]
+        """
+        seen = set()
+        self.tickers, self.names, self.markets = [], [], []
+        for stock in stocks:
+            ticker = str(stock.get('ticker') or '').strip()
+            if not ticker or ticker in seen:
+                continue
+            seen.add(ticker)
+            self.tickers.append(ticker)
+            self.names.append(str(stock.get('name') or '').strip())
+            self.markets.append(stock.get('market', ''))
+
+        lower_tickers = [t.lower() for t in self.tickers]
+        lower_names = [self._clean(n.lower()) for n in self.names]
+
+        # 부분 검색용: "ticker\tname\n..." (offsets[i] = i번째 종목 시작 위치)
+        self.blob, self.offsets = self._join([f"{t}\t{n}" for t, n in zip(lower_tickers, lower_names)])
+        # 초성 검색용: 종목명 초성 (원래 이름과 글자 위치 동일)
+        self.name_lower = lower_names
+        self.cho_blob, self.cho_offsets = self._join([to_choseong(n) for n in lower_names])
+
+        # 접두어 검색용 정렬 배열 (값, 종목 번호)
+        ticker_order = sorted(range(len(lower_tickers)), key=lower_tickers.__getitem__)
+        self.sorted_tickers = [lower_tickers[i] for i in ticker_order]
+        self.ticker_order = array('l', ticker_order)
+        name_order = sorted(range(len(lower_names)), key=lower_names.__getitem__)
+        self.sorted_names = [lower_names[i] for i in name_order]
+        self.name_order = array('l', name_order)
+
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        return text.replace('\t', ' ').replace('\n', ' ')
+
+    @staticmethod
+    def _join(parts: List[str]):
+        offsets = array('l')
+        pos = 0
+        for part in parts:
+            offsets.append(pos)
+            pos += len(part) + 1
+        return '\n'.join(parts) + '\n', offsets
+
+    def _entry_at(self, offsets: array, pos: int) -> int:
+        """blob 위치 → 종목 번호"""
+        return bisect_left(offsets, pos + 1) - 1
+
+    def _prefix(self, sorted_values: List[str], order: array, prefix: str, limit: int):
+        start = bisect_left(sorted_values, prefix)
+        for i in range(start, min(start + limit, len(sorted_values))):
+            if not sorted_values[i].startswith(prefix):
+                break
+            yield order[i]
+
+    def _substring(self, blob: str, offsets: array, needle: str, accept=None):
+        """
+        부분 일치 종목 (종목당 1번, accept(entry, start)가 거절하면 같은 종목의 다음 일치 확인)
+        """
+        pos = blob.find(needle)
+        while pos != -1:
+            entry = self._entry_at(offsets, pos)
+            start = pos - offsets[entry]
+            if accept is not None and not accept(entry, start):
+                pos = blob.find(needle, pos + 1)
+                continue
+            yield entry, start
+            # 같은 종목 안의 다음 일치는 건너뜀
+            next_start = offsets[entry + 1] if entry + 1 < len(offsets) else len(blob)
+            pos = blob.find(needle, next_start)
+
+    def _search_hangul(self, q: str, limit: int) -> List[int]:
+        """한글(초성/입력 중 글자 포함) 검색: 종목명 시작 일치 우선"""
+        cho = to_choseong(q)
+        last = len(q) - 1
+        prefix_hits, other_hits = [], []
+
+        def accept(entry, start):
+            name = self.name_lower[entry]
+            return all(_char_matches(qc, name[start + i], i == last) for i, qc in enumerate(q))
+
+        for entry, start in self._substring(self.cho_blob, self.cho_offsets, cho, accept):
+            (prefix_hits if start == 0 else other_hits).append(entry)
+            if len(prefix_hits) >= limit or len(prefix_hits) + len(other_hits) >= MAX_SCAN:
+                break
+        return (prefix_hits + other_hits)[:limit]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        종목 검색 (티커 일치 → 티커 접두어 → 종목명 접두어 → 부분 일치 순)
+
+        Returns:
+            [{'ticker', 'name', 'market'}, ...]
+        """
+        q = self._clean(query.strip().lower())
+        if not q or limit <= 0:
+            return []
+
+        if any(_is_hangul(ch) for ch in q):
+            entries = self._search_hangul(q, limit)
+        else:
+            entries = []
+            seen = set()
+
+            def add(entry):
+                if entry not in seen:
+                    seen.add(entry)
+                    entries.append(entry)
+                return len(entries) >= limit
+
+            done = False
+            for source in (self._prefix(self.sorted_tickers, self.ticker_order, q, limit),
+                           self._prefix(self.sorted_names, self.name_order, q, limit),
+                           (entry for entry, _ in self._substring(self.blob, self.offsets, q))):
+                for entry in source:
+                    if add(entry):
+                        done = True
+                        break
+                if done:
+                    break
+
+        return [{'ticker': self.tickers[i], 'name': self.names[i], 'market': self.markets[i]}
+                for i in entries]
+
+    # ========================================
+    # 저장/로드
+    # ========================================
+
+    def save(self, path: str):
+        """인덱스 저장 (임시 파일 → rename)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((INDEX_VERSION, self.__dict__), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['StockSearchIndex']:
+        """저장된 인덱스 로드 (버전 불일치/손상 시 None)"""
+        try:
+            with open(path, 'rb') as f:
+                version, state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if version != INDEX_VERSION:
+            return None
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+
+_indexes: Dict[str, StockSearchIndex] = {}
+_lock = threading.Lock()
+
+
+def index_path(country: str) -> str:
+    return os.path.join(INDEX_DIR, f"stock_search_{country.lower()}.pkl")
+
+
+def _is_current(index: StockSearchIndex, version: Optional[int]) -> bool:
+    if version is None:
+        return time.time() - index.built_at <= INDEX_MAX_AGE_DAYS * 86400
+    return getattr(index, 'source_version', None) == version
+
+
+def get_search_index(country: str, loader, version: int = None) -> StockSearchIndex:
+    """
+    국가별 검색 인덱스 (메모리 → 디스크 → loader()로 생성 후 저장)
+
+    Args:
+        loader: 종목 리스트 조회 함수 ([{'ticker', 'name', 'market'}, ...])
+        version: 종목 목록 버전 (인덱스 버전과 다르면 다시 생성, None이면 생성 후
+            INDEX_MAX_AGE_DAYS 경과 시 다시 생성)
+    """
+    index = _indexes.get(country)
+    if index is not None and (version is None or _is_current(index, version)):
+        return index
+
+    with _lock:
+        index = _indexes.get(country)
+        if index is not None and (version is None or _is_current(index, version)):
+            return index
+
+        path = index_path(country)
+        index = StockSearchIndex.load(path)
+        if index is None or not _is_current(index, version):
+            stocks = loader()
+            if stocks:
+                index = StockSearchIndex(stocks)
+                index.source_version = version
+                index.save(path)
+                print(f"✅ {country} 종목 검색 인덱스 생성: {len(index)}개")
+            elif index is None:
+                return StockSearchIndex([])  # 로드 실패 시 저장/캐시하지 않음
+
+        _indexes[country] = index
+        return index
@@ -3,11 +3,21 @@
 -- SQLite3
 -- =====================================================
 
+-- 종목 정보 (가격/알림 테이블은 ticker 코드로 참조, 종목명/국가는 여기에만 저장)
+CREATE TABLE IF NOT EXISTS tickers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL UNIQUE,
+    name TEXT,
+    country TEXT,
+    exchange TEXT,
+    currency TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- 일봉 데이터 테이블
 CREATE TABLE IF NOT EXISTS daily_prices (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     ticker TEXT NOT NULL,
-    ticker_name TEXT NOT NULL,
     date DATE NOT NULL,
     open REAL,
     high REAL,
@@ -22,10 +32,12 @@ CREATE TABLE IF NOT EXISTS daily_prices (
 CREATE TABLE IF NOT EXISTS minute_prices (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     ticker TEXT NOT NULL,
-    ticker_name TEXT NOT NULL,
     datetime TIMESTAMP NOT NULL,
     datetime_utc TIMESTAMP,
     market_date DATE,
+    open REAL,
+    high REAL,
+    low REAL,
     price REAL NOT NULL,
     volume INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -53,6 +65,39 @@ CREATE TABLE IF NOT EXISTS statistics_cache (
     UNIQUE(ticker, date)
 );
 
+-- 롤링 변동성 상태 (증분 계산)
+CREATE TABLE IF NOT EXISTS volatility_state (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    window INTEGER NOT NULL,
+    count INTEGER DEFAULT 0,
+    sum_return REAL DEFAULT 0,
+    sum_sq_return REAL DEFAULT 0,
+    first_date DATE,
+    last_date DATE,
+    last_close REAL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(ticker, window)
+);
+
+-- 해외 종목 거래소 코드 (KIS API rsym 기준)
+CREATE TABLE IF NOT EXISTS exchange_codes (
+    ticker TEXT PRIMARY KEY,
+    exchange TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 거래소 상장 종목 목록 스냅샷 (종목 검색/종목명 조회용, 주기적으로 통째로 교체)
+CREATE TABLE IF NOT EXISTS stock_listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    country TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    name TEXT NOT NULL,
+    market TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(country, ticker)
+);
+
 -- 사용자 테이블
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -92,8 +137,6 @@ CREATE TABLE IF NOT EXISTS alert_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER,
     ticker TEXT NOT NULL,
-    ticker_name TEXT NOT NULL,
-    country TEXT NOT NULL,
     alert_level TEXT NOT NULL,
     alert_date TEXT NOT NULL,
     target_price REAL NOT NULL,
@@ -105,6 +148,46 @@ CREATE TABLE IF NOT EXISTS alert_history (
     UNIQUE(user_id, ticker, alert_date, alert_level)
 );
 
+-- 알림 발송 큐 (pending → sent, 실패 시 재시도 / 알림 시간 외에는 held → summarized)
+CREATE TABLE IF NOT EXISTS alert_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id INTEGER,
+    user_id INTEGER,
+    server TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    FOREIGN KEY (alert_id) REFERENCES alert_history(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+);
+
+-- 변동성 매수 전략 파라미터 스윕 결과 (backtest_sweep.py)
+CREATE TABLE IF NOT EXISTS backtest_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    window INTEGER NOT NULL,
+    years INTEGER NOT NULL,
+    sigma_1 REAL NOT NULL,
+    sigma_2 REAL NOT NULL,
+    amount_1 REAL NOT NULL,
+    amount_2 REAL NOT NULL,
+    period_days INTEGER NOT NULL,
+    buy_1_count INTEGER NOT NULL,
+    buy_2_count INTEGER NOT NULL,
+    total_invested REAL NOT NULL,
+    final_value REAL NOT NULL,
+    total_return_pct REAL NOT NULL,
+    buy_hold_return_pct REAL NOT NULL,
+    outperformance REAL NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- =====================================================
 -- 인덱스
 -- =====================================================
@@ -113,6 +196,37 @@ CREATE INDEX IF NOT EXISTS idx_daily_ticker_date ON daily_prices(ticker, date);
 CREATE INDEX IF NOT EXISTS idx_minute_ticker_datetime ON minute_prices(ticker, datetime);
 CREATE INDEX IF NOT EXISTS idx_stats_ticker_date ON statistics_cache(ticker, date);
 CREATE INDEX IF NOT EXISTS idx_user_watchlist ON user_watchlist(user_id, ticker);
-CREATE INDEX IF NOT EXISTS idx_alert_history_user ON alert_history(user_id);
-CREATE INDEX IF NOT EXISTS idx_alert_history_ticker ON alert_history(ticker);
+CREATE INDEX IF NOT EXISTS idx_alert_history_user_time ON alert_history(user_id, alert_time);
+CREATE INDEX IF NOT EXISTS idx_alert_history_ticker_time ON alert_history(ticker, alert_time);
+CREATE INDEX IF NOT EXISTS idx_alert_outbox_status ON alert_outbox(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_backtest_results_run ON backtest_results(run_id, window, years, sigma_1, sigma_2);
+
+-- =====================================================
+-- 알림 대상 변경 버전 (users/user_watchlist 변경 시 증가, 구독자 캐시 무효화용)
+-- =====================================================
 
+INSERT OR IGNORE INTO settings (key, value, description) VALUES ('subscribers_version', '0', '알림 대상 변경 버전');
+CREATE TRIGGER IF NOT EXISTS trg_users_insert_version AFTER INSERT ON users
+BEGIN
+    UPDATE settings SET value = CAST(value AS INTEGER) + 1 WHERE key = 'subscribers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_users_update_version AFTER UPDATE ON users
+BEGIN
+    UPDATE settings SET value = CAST(value AS INTEGER) + 1 WHERE key = 'subscribers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_users_delete_version AFTER DELETE ON users
+BEGIN
+    UPDATE settings SET value = CAST(value AS INTEGER) + 1 WHERE key = 'subscribers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_user_watchlist_insert_version AFTER INSERT ON user_watchlist
+BEGIN
+    UPDATE settings SET value = CAST(value AS INTEGER) + 1 WHERE key = 'subscribers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_user_watchlist_update_version AFTER UPDATE ON user_watchlist
+BEGIN
+    UPDATE settings SET value = CAST(value AS INTEGER) + 1 WHERE key = 'subscribers_version';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_user_watchlist_delete_version AFTER DELETE ON user_watchlist
+BEGIN
+    UPDATE settings SET value = CAST(value AS INTEGER) + 1 WHERE key = 'subscribers_version';
+END;
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 한국 주식 종목명 업데이트 스크립트
-DB에 저장된 한국 주식의 ticker_name을 KIS API에서 조회하여 업데이트합니다.
+DB에 저장된 한국 주식의 종목명(tickers.name)을 KIS API에서 조회하여 업데이트합니다.
 """
 from database import StockDatabase
 from kis_api import KISApi
@@ -20,9 +20,9 @@ def update_korean_stock_names():
     
     # 1. 한국 주식 조회 (country='KR' 또는 숫자 티커)
     cursor.execute('''
-        SELECT DISTINCT ticker, ticker_name 
-        FROM daily_prices 
-        WHERE country = 'KR' OR (ticker GLOB '[0-9]*' AND length(ticker) = 6)
+        SELECT symbol, name 
+        FROM tickers 
+        WHERE country = 'KR' OR (symbol GLOB '[0-9]*' AND length(symbol) = 6)
     ''')
     kr_stocks = cursor.fetchall()
     
@@ -31,34 +31,34 @@ def update_korean_stock_names():
     updated_count = 0
     failed_count = 0
     
+    # 종목명이 없거나 티커와 같은 종목만 조회
+    targets = [ticker for ticker, current_name in kr_stocks
+               if not current_name or current_name == ticker]
     for ticker, current_name in kr_stocks:
-        print(f"  {ticker}: {current_name}", end=" → ")
-        
-        # 이미 종목명이 있고 티커와 다르면 스킵
-        if current_name and current_name != ticker:
-            print(f"(유지)")
+        if ticker not in targets:
+            print(f"  {ticker}: {current_name} → (유지)")
+    
+    # KIS API에서 종목명 일괄 조회
+    prices = kis.get_prices(targets, country='KR')
+    
+    for ticker, current_name in kr_stocks:
+        if ticker not in targets:
             continue
         
-        # KIS API에서 종목명 조회
-        try:
-            price_data = kis.get_stock_price(ticker)
-            if price_data and 'name' in price_data and price_data['name']:
-                new_name = price_data['name']
-                
-                # DB 업데이트
-                cursor.execute('''
-                    UPDATE daily_prices 
-                    SET ticker_name = ? 
-                    WHERE ticker = ?
-                ''', (new_name, ticker))
-                
-                print(f"✅ {new_name}")
-                updated_count += 1
-            else:
-                print(f"❌ API 응답 없음")
-                failed_count += 1
-        except Exception as e:
-            print(f"❌ 오류: {e}")
+        print(f"  {ticker}: {current_name}", end=" → ")
+        
+        result = prices[ticker]
+        price_data = result['data']
+        if price_data and price_data.get('name'):
+            new_name = price_data['name']
+            
+            # DB 업데이트
+            db.save_tickers([(ticker, new_name, 'KR')])
+            
+            print(f"✅ {new_name}")
+            updated_count += 1
+        else:
+            print(f"❌ {result['error'] or 'API 응답 없음'}")
             failed_count += 1
     
     conn.commit()
@@ -106,12 +106,12 @@ def show_current_data():
     conn = db.connect()
     cursor = conn.cursor()
     
-    # daily_prices
-    print("\n📊 daily_prices (한국 주식):")
+    # tickers
+    print("\n📊 tickers (한국 주식):")
     cursor.execute('''
-        SELECT DISTINCT ticker, ticker_name, country 
-        FROM daily_prices 
-        WHERE country = 'KR' OR ticker GLOB '[0-9]*'
+        SELECT symbol, name, country 
+        FROM tickers 
+        WHERE country = 'KR' OR symbol GLOB '[0-9]*'
         LIMIT 20
     ''')
     for row in cursor.fetchall():
@@ -122,13 +122,9 @@ def show_current_data():
     # user_watchlist
     print("\n📋 user_watchlist:")
     cursor.execute('''
-        SELECT uw.ticker, uw.country, dp.ticker_name
+        SELECT uw.ticker, uw.country, t.name
         FROM user_watchlist uw
-        LEFT JOIN (
-            SELECT ticker, MAX(ticker_name) as ticker_name 
-            FROM daily_prices 
-            GROUP BY ticker
-        ) dp ON uw.ticker = dp.ticker
+        LEFT JOIN tickers t ON uw.ticker = t.symbol
     ''')
     for row in cursor.fetchall():
         ticker, country, name = row
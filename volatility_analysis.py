@@ -3,7 +3,6 @@
 하루에 얼마나 오르고 내리는지의 표준편차를 사용
 """
 
-import FinanceDataReader as fdr
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -14,6 +13,7 @@ import os
 import platform
 import subprocess
 from pathlib import Path
+from price_source import get_daily_history
 
 # 전역 폰트 설정 변수
 _FONT_CONFIGURED = False
@@ -186,51 +186,9 @@ def analyze_daily_volatility(ticker, ticker_name, investment_amount=1000000, cou
     end_date = datetime.now()
     start_date = end_date - timedelta(days=365)
     
-    df = None
-    close_prices = None
-    
-    # 1차: FDR로 시도
-    try:
-        print(f"  📥 [{ticker}] FDR 데이터 조회 중... ({start_date.strftime('%Y-%m-%d')} ~ {end_date.strftime('%Y-%m-%d')})")
-        df = fdr.DataReader(ticker, start_date, end_date)
-        
-        if df is not None and not df.empty:
-            print(f"  ✅ [{ticker}] FDR 데이터 {len(df)}개 로드 완료")
-            close_prices = df['Close']
-            
-    except Exception as e:
-        print(f"  ⚠️ [{ticker}] FDR 데이터 조회 실패: {e}")
-    
-    # 2차: FDR 실패 시 KIS API로 시도
-    if close_prices is None or (hasattr(close_prices, 'empty') and close_prices.empty):
-        try:
-            print(f"  📥 [{ticker}] KIS API로 재시도...")
-            from kis_api import KISApi
-            api = KISApi()
-            
-            if is_korean:
-                kis_df = api.get_daily_price_history(ticker, 
-                    start_date.strftime('%Y%m%d'), 
-                    end_date.strftime('%Y%m%d'))
-            else:
-                exchange = api.get_exchange_code(ticker)
-                kis_df = api.get_overseas_daily_price_history(ticker, exchange,
-                    start_date.strftime('%Y%m%d'),
-                    end_date.strftime('%Y%m%d'))
-            
-            api.close()
-            
-            if kis_df is not None and not kis_df.empty:
-                print(f"  ✅ [{ticker}] KIS API 데이터 {len(kis_df)}개 로드 완료")
-                df = kis_df
-                close_prices = df['Close']
-            else:
-                print(f"  ❌ [{ticker}] KIS API 데이터도 없음")
-                return None
-                
-        except Exception as e:
-            print(f"  ❌ [{ticker}] KIS API 조회도 실패: {e}")
-            return None
+    # DB 우선 조회 (누락된 최근 구간만 FDR/KIS API로 보충)
+    df = get_daily_history(ticker, start_date, end_date, country=country, ticker_name=ticker_name)
+    close_prices = df['Close'] if df is not None else None
     
     if close_prices is None or (hasattr(close_prices, 'empty') and close_prices.empty):
         print(f"  ❌ [{ticker}] 데이터를 가져올 수 없습니다")
@@ -352,6 +310,34 @@ def analyze_daily_volatility(ticker, ticker_name, investment_amount=1000000, cou
     print("\n" + "="*70)
     
     # 데이터 반환 (시각화용)
+    return _volatility_result(ticker, ticker_name, country, close_prices, daily_returns,
+                              investment_amount)
+
+
+def _volatility_result(ticker, ticker_name, country, close_prices, daily_returns,
+                       investment_amount, stats=None):
+    """
+    분석 결과 dict 생성 (analyze_daily_volatility / analyze_volatility_batch 공용)
+    
+    Args:
+        stats: 미리 계산한 통계 (mean_return, std_return, max_gain, max_loss, up_days, down_days)
+    """
+    if stats is None:
+        stats = {
+            'mean_return': daily_returns.mean(),
+            'std_return': daily_returns.std(),
+            'max_gain': daily_returns.max(),
+            'max_loss': daily_returns.min(),
+            'up_days': (daily_returns > 0).sum(),
+            'down_days': (daily_returns < 0).sum(),
+        }
+    
+    current_price = close_prices.iloc[-1]
+    std_return = stats['std_return']
+    drop_05x = std_return * 0.5
+    drop_1x = std_return
+    drop_2x = std_return * 2
+    
     # 마지막 거래일 (데이터 기준일)
     last_date = close_prices.index[-1]
     if hasattr(last_date, 'date'):
@@ -365,33 +351,82 @@ def analyze_daily_volatility(ticker, ticker_name, investment_amount=1000000, cou
         'ticker': ticker,
         'ticker_name': ticker_name,
         'country': country,
-        'is_korean': is_korean,
+        'is_korean': country == 'KR',
         'close_prices': close_prices,
         'daily_returns': daily_returns,
         'current_price': current_price,
         'data_date': data_date,  # 마지막 거래일 (해당 시장 기준)
-        'mean_return': mean_return,
+        'mean_return': stats['mean_return'],
         'std_return': std_return,
-        'max_gain': max_gain,
-        'max_loss': max_loss,
+        'max_gain': stats['max_gain'],
+        'max_loss': stats['max_loss'],
         'drop_05x': drop_05x,
-        'target_05x': target_05x,
-        'target_1x': target_1x,
-        'target_2x': target_2x,
+        'target_05x': current_price * (1 - drop_05x / 100),
+        'target_1x': current_price * (1 - drop_1x / 100),
+        'target_2x': current_price * (1 - drop_2x / 100),
         'drop_1x': drop_1x,
         'drop_2x': drop_2x,
-        'up_days': up_days,
-        'down_days': down_days,
+        'up_days': stats['up_days'],
+        'down_days': stats['down_days'],
         'investment_amount': investment_amount
     }
 
 
-def visualize_volatility(data):
+def analyze_volatility_batch(histories, investment_amount=1000000):
+    """
+    여러 종목 일일 변동성 일괄 분석 (출력 없음)
+    
+    전 종목 종가를 (종목, 날짜) 한 시리즈로 합쳐 종목별 groupby 한 번으로
+    수익률/통계를 계산합니다. 결과는 analyze_daily_volatility와 같은 형식입니다.
+    
+    Args:
+        histories: {ticker: (ticker_name, country, close_prices)}
+        investment_amount: 투자 금액
+    
+    Returns:
+        {ticker: 분석 결과 dict} (데이터가 2일 미만인 종목 제외)
+    """
+    closes = {ticker: prices for ticker, (_, _, prices) in histories.items()
+              if prices is not None and len(prices) >= 2}
+    if not closes:
+        return {}
+    
+    close_all = pd.concat(closes, names=['ticker', 'date'])
+    prev_all = close_all.groupby(level='ticker', sort=False).shift(1)
+    returns_all = ((close_all / prev_all - 1) * 100).dropna()
+    
+    grouped = returns_all.groupby(level='ticker', sort=False)
+    stats = pd.DataFrame({
+        'mean_return': grouped.mean(),
+        'std_return': grouped.std(),
+        'max_gain': grouped.max(),
+        'max_loss': grouped.min(),
+        'up_days': (returns_all > 0).groupby(level='ticker', sort=False).sum(),
+        'down_days': (returns_all < 0).groupby(level='ticker', sort=False).sum(),
+    })
+    stats_by_ticker = stats.to_dict('index')
+    
+    results = {}
+    for ticker, daily_returns in grouped:
+        ticker_name, country, close_prices = histories[ticker]
+        results[ticker] = _volatility_result(
+            ticker, ticker_name, country, close_prices,
+            daily_returns.droplevel('ticker'), investment_amount, stats=stats_by_ticker[ticker]
+        )
+    return results
+
+
+# 차트 모양이 바뀌면 증가 (chart_cache 키에 포함되어 기존 캐시 무효화)
+CHART_VERSION = 1
+
+
+def visualize_volatility(data, output_path=None):
     """
     일일 변동성을 시각화합니다.
     
     Args:
         data: analyze_daily_volatility의 반환 데이터
+        output_path: 저장 경로 (기본: charts/{ticker}/{오늘}_{ticker}_{종목명}_volatility.png)
     """
     # 차트 생성 전 폰트 재설정
     font_path = setup_korean_font()
@@ -576,12 +611,16 @@ def visualize_volatility(data):
     plt.tight_layout()
     
     # 파일 저장 (날짜 prefix + 종목별 폴더)
-    today = datetime.now().strftime('%Y-%m-%d')
-    ticker_folder = Path('charts') / data['ticker']
-    ticker_folder.mkdir(parents=True, exist_ok=True)
-    
-    safe_name = ticker_name.replace(' ', '_').replace('/', '_')
-    filename = ticker_folder / f"{today}_{data['ticker']}_{safe_name}_volatility.png"
+    if output_path:
+        filename = Path(output_path)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+    else:
+        today = datetime.now().strftime('%Y-%m-%d')
+        ticker_folder = Path('charts') / data['ticker']
+        ticker_folder.mkdir(parents=True, exist_ok=True)
+        
+        safe_name = ticker_name.replace(' ', '_').replace('/', '_')
+        filename = ticker_folder / f"{today}_{data['ticker']}_{safe_name}_volatility.png"
     
     # 이미 같은 날짜의 차트가 있으면 덮어쓰기 (중복 방지)
     plt.savefig(filename, dpi=150, bbox_inches='tight')
@@ -34,6 +34,10 @@ def create_app():
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(stocks_bp, url_prefix='/stocks')
     
+    # 종목 목록 스냅샷 백그라운드 갱신 (검색/종목명 조회는 DB 스냅샷 사용)
+    import stock_listing
+    stock_listing.start_background_refresh()
+    
     # 차트 이미지 서빙
     @app.route('/charts/<path:filename>')
     @login_required
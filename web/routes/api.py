@@ -5,89 +5,11 @@ from datetime import datetime
 from flask import Blueprint, jsonify, request, session
 from web.auth import login_required
 from database import StockDatabase
-from volatility_analysis import analyze_daily_volatility
-import FinanceDataReader as fdr
+import analysis_cache
+import stock_listing
 
 api_bp = Blueprint('api', __name__)
 
-# 종목 리스트 캐시
-_kr_stock_list = None
-_us_stock_list = None
-
-def get_kr_stock_list():
-    """한국 주식 종목 리스트 조회 (캐시)"""
-    global _kr_stock_list
-    if _kr_stock_list is None:
-        try:
-            print("📥 한국 종목 리스트 로딩 중...")
-            # KOSPI + KOSDAQ + ETF
-            kospi = fdr.StockListing('KOSPI')
-            kosdaq = fdr.StockListing('KOSDAQ')
-            etf = fdr.StockListing('ETF/KR')
-            
-            _kr_stock_list = []
-            
-            for _, row in kospi.iterrows():
-                _kr_stock_list.append({
-                    'ticker': row.get('Code', row.get('Symbol', '')),
-                    'name': row.get('Name', ''),
-                    'market': 'KOSPI'
-                })
-            
-            for _, row in kosdaq.iterrows():
-                _kr_stock_list.append({
-                    'ticker': row.get('Code', row.get('Symbol', '')),
-                    'name': row.get('Name', ''),
-                    'market': 'KOSDAQ'
-                })
-            
-            for _, row in etf.iterrows():
-                _kr_stock_list.append({
-                    'ticker': row.get('Code', row.get('Symbol', '')),
-                    'name': row.get('Name', ''),
-                    'market': 'ETF'
-                })
-            
-            print(f"✅ 한국 종목 {len(_kr_stock_list)}개 로드됨")
-        except Exception as e:
-            print(f"❌ 한국 종목 리스트 로드 실패: {e}")
-            _kr_stock_list = []
-    
-    return _kr_stock_list
-
-def get_us_stock_list():
-    """미국 주식 종목 리스트 조회 (캐시)"""
-    global _us_stock_list
-    if _us_stock_list is None:
-        try:
-            print("📥 미국 종목 리스트 로딩 중...")
-            # NASDAQ + NYSE + ETF
-            nasdaq = fdr.StockListing('NASDAQ')
-            nyse = fdr.StockListing('NYSE')
-            
-            _us_stock_list = []
-            
-            for _, row in nasdaq.iterrows():
-                _us_stock_list.append({
-                    'ticker': row.get('Symbol', ''),
-                    'name': row.get('Name', ''),
-                    'market': 'NASDAQ'
-                })
-            
-            for _, row in nyse.iterrows():
-                _us_stock_list.append({
-                    'ticker': row.get('Symbol', ''),
-                    'name': row.get('Name', ''),
-                    'market': 'NYSE'
-                })
-            
-            print(f"✅ 미국 종목 {len(_us_stock_list)}개 로드됨")
-        except Exception as e:
-            print(f"❌ 미국 종목 리스트 로드 실패: {e}")
-            _us_stock_list = []
-    
-    return _us_stock_list
-
 
 @api_bp.route('/stocks')
 @login_required
@@ -124,23 +46,23 @@ def get_stock_analysis(ticker):
         }), 404
     
     try:
-        data = analyze_daily_volatility(ticker, stock_info['name'], country=stock_info['country'])
-        if data:
+        summary = analysis_cache.get_summary(ticker, stock_info['name'], stock_info['country'])
+        if summary:
             return jsonify({
                 'success': True,
                 'data': {
                     'ticker': ticker,
                     'name': stock_info['name'],
                     'country': stock_info['country'],
-                    'current_price': data['current_price'],
-                    'target_05x': data['target_05x'],
-                    'target_1x': data['target_1x'],
-                    'target_2x': data['target_2x'],
-                    'drop_05x': data['drop_05x'],
-                    'drop_1x': data['drop_1x'],
-                    'drop_2x': data['drop_2x'],
-                    'std_return': data['std_return'],
-                    'volatility': data['std_return']  # 이미 퍼센트 값
+                    'current_price': summary['current_price'],
+                    'target_05x': summary['target_05x'],
+                    'target_1x': summary['target_1x'],
+                    'target_2x': summary['target_2x'],
+                    'drop_05x': summary['drop_05x'],
+                    'drop_1x': summary['drop_1x'],
+                    'drop_2x': summary['drop_2x'],
+                    'std_return': summary['std_return'],
+                    'volatility': summary['std_return']  # 이미 퍼센트 값
                 }
             })
     except Exception as e:
@@ -155,6 +77,16 @@ def get_stock_analysis(ticker):
     }), 500
 
 
+@api_bp.route('/cache/stats')
+@login_required
+def get_cache_stats():
+    """분석 캐시 통계 API (적중/미스)"""
+    return jsonify({
+        'success': True,
+        'data': analysis_cache.cache_stats()
+    })
+
+
 @api_bp.route('/stocks/<ticker>/price')
 @login_required
 def get_stock_price(ticker):
@@ -199,6 +131,46 @@ def get_stock_price(ticker):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@api_bp.route('/stocks/prices')
+@login_required
+def get_stock_prices():
+    """관심 종목 실시간 가격 일괄 조회 API"""
+    try:
+        from kis_api import KISApi
+        
+        db = StockDatabase()
+        watchlist = db.get_user_watchlist_with_names(session.get('user'))
+        db.close()
+        
+        if not watchlist:
+            return jsonify({'success': True, 'data': []})
+        
+        api = KISApi()
+        prices = api.get_prices({s['ticker']: s['country'] for s in watchlist})
+        api.close()
+        
+        now = datetime.now().isoformat()
+        data = []
+        for stock in watchlist:
+            result = prices.get(stock['ticker'], {})
+            price_data = result.get('data') or {}
+            data.append({
+                'ticker': stock['ticker'],
+                'name': stock['name'],
+                'success': result.get('success', False),
+                'error': result.get('error'),
+                'current_price': price_data.get('current_price', 0),
+                'change': price_data.get('change', 0),
+                'change_rate': price_data.get('change_rate', 0),
+                'timestamp': now
+            })
+        
+        return jsonify({'success': True, 'data': data})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @api_bp.route('/user/notification', methods=['POST'])
 @login_required
 def toggle_notification():
@@ -241,21 +213,8 @@ def get_alert_history():
     # 사용자의 관심 종목만 필터링
     watchlist = db.get_user_watchlist(username)
     
-    conn = db.connect()
-    cursor = conn.cursor()
-    
-    placeholders = ','.join(['?' for _ in watchlist])
-    cursor.execute(f'''
-        SELECT ticker, ticker_name, country, alert_level, target_price, 
-               current_price, drop_rate, alert_time, sent
-        FROM alert_history
-        WHERE ticker IN ({placeholders})
-        ORDER BY alert_time DESC
-        LIMIT ?
-    ''', (*watchlist, limit))
-    
     alerts = []
-    for row in cursor.fetchall():
+    for row in db.get_ticker_alerts(watchlist, limit):
         alerts.append({
             'ticker': row[0],
             'name': row[1],
@@ -283,7 +242,7 @@ def search_stocks():
     종목 검색 API
     
     Query params:
-        q: 검색어 (종목명 또는 티커)
+        q: 검색어 (종목명, 티커 또는 한글 초성)
         country: KR 또는 US (기본값: KR)
         limit: 결과 수 (기본값: 10)
     """
@@ -297,30 +256,13 @@ def search_stocks():
             'data': []
         })
     
-    query_lower = query.lower()
-    results = []
+    index = stock_listing.get_search_index('KR' if country == 'KR' else 'US')
     
-    if country == 'KR':
-        stock_list = get_kr_stock_list()
-    else:
-        stock_list = get_us_stock_list()
-    
-    for stock in stock_list:
-        ticker = stock.get('ticker', '')
-        name = stock.get('name', '')
-        market = stock.get('market', '')
-        
-        # 이름 또는 티커로 검색 (대소문자 무시)
-        if query_lower in name.lower() or query_lower in ticker.lower():
-            results.append({
-                'ticker': ticker,
-                'name': name,
-                'market': market,
-                'country': country
-            })
-            
-            if len(results) >= limit:
-                break
+    # 티커 일치 → 티커 접두어 → 종목명 접두어 → 부분 일치 순 (한글은 초성 검색 지원)
+    results = [
+        {**stock, 'country': country}
+        for stock in index.search(query, limit)
+    ]
     
     return jsonify({
         'success': True,
@@ -427,30 +369,9 @@ def verify_ticker():
         if result and result.get('current_price', 0) > 0:
             name = result.get('name', ticker)
             
-            # KIS API에서 이름이 티커와 같으면 FDR에서 이름 찾기
+            # KIS API에서 이름이 티커와 같으면 종목 목록(ETF 포함)에서 이름 찾기
             if name == ticker:
-                if country == 'US':
-                    us_stocks = get_us_stock_list()
-                    for stock in us_stocks:
-                        if stock['ticker'] == ticker:
-                            name = stock['name']
-                            break
-                    
-                    # 일반 주식 리스트에서 못 찾으면 ETF 리스트에서 찾기
-                    if name == ticker:
-                        try:
-                            etf_list = fdr.StockListing('ETF/US')
-                            matched = etf_list[etf_list['Symbol'] == ticker]
-                            if len(matched) > 0:
-                                name = matched.iloc[0]['Name']
-                        except:
-                            pass
-                else:  # KR
-                    kr_stocks = get_kr_stock_list()
-                    for stock in kr_stocks:
-                        if stock['ticker'] == ticker:
-                            name = stock['name']
-                            break
+                name = stock_listing.find_name('KR' if country == 'KR' else 'US', ticker) or name
             
             return jsonify({
                 'success': True,
@@ -500,52 +421,24 @@ def get_chart_data(ticker):
         return jsonify({'success': False, 'error': '종목 없음'}), 404
     
     try:
-        # 일봉 데이터 + 변동성 분석
-        data = analyze_daily_volatility(ticker, stock_info['name'], country=stock_info['country'], create_chart=False)
+        # 변동성 분석 + 최근 일봉 OHLC (캐시)
+        cached = analysis_cache.get_chart_data(ticker, stock_info['name'], stock_info['country'])
         
-        if not data:
+        if not cached:
             db.close()
             return jsonify({'success': False, 'error': '데이터 없음'}), 404
         
-        # pandas Series를 JSON 변환 가능 형태로
-        close_prices = data['close_prices']
-        
-        # OHLC 데이터 변환 (FDR로 다시 조회 필요)
-        from datetime import timedelta
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=90)  # 최근 90일
-        
-        df = fdr.DataReader(ticker, start_date, end_date)
-        
-        ohlc_data = []
-        if df is not None and not df.empty:
-            for idx, row in df.iterrows():
-                ohlc_data.append({
-                    'x': idx.strftime('%Y-%m-%d'),
-                    'o': float(row.get('Open', row.get('Close', 0))),
-                    'h': float(row.get('High', row.get('Close', 0))),
-                    'l': float(row.get('Low', row.get('Close', 0))),
-                    'c': float(row.get('Close', 0))
-                })
+        data = cached['summary']
+        ohlc_data = cached['ohlc']
         
         # 분봉 데이터 (있는 경우)
         minute_data = []
         if data_type == 'minute':
-            conn = db.connect()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT datetime, price FROM minute_prices
-                WHERE ticker = ?
-                ORDER BY datetime DESC
-                LIMIT 390
-            ''', (ticker,))
-            
-            for row in cursor.fetchall():
+            for dt, price in db.get_recent_minute_prices(ticker, limit=390):
                 minute_data.append({
-                    'x': row[0],
-                    'y': float(row[1])
+                    'x': dt,
+                    'y': float(price)
                 })
-            minute_data.reverse()
         
         db.close()
         
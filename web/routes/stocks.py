@@ -6,7 +6,7 @@ from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from web.auth import login_required
 from database import StockDatabase
-from volatility_analysis import analyze_daily_volatility
+import analysis_cache
 
 stocks_bp = Blueprint('stocks', __name__)
 
@@ -58,27 +58,13 @@ def add_stock():
         # 이름이 없으면 자동 조회
         if not name or name == ticker:
             if country == 'KR':
-                # 한국 주식: FDR에서 한글명 조회
+                # 한국 주식: 종목 목록 스냅샷(KOSPI/KOSDAQ/ETF)에서 한글명 조회
                 try:
-                    import FinanceDataReader as fdr
-                    etf_list = fdr.StockListing('ETF/KR')
-                    matched = etf_list[etf_list['Code'] == ticker]
-                    if len(matched) > 0:
-                        name = matched.iloc[0]['Name']
-                        print(f"📝 한국 ETF 한글명 조회: {ticker} → {name}")
-                    else:
-                        # KOSPI/KOSDAQ에서 조회
-                        kospi = fdr.StockListing('KOSPI')
-                        matched = kospi[kospi['Code'] == ticker]
-                        if len(matched) > 0:
-                            name = matched.iloc[0]['Name']
-                            print(f"📝 KOSPI 한글명 조회: {ticker} → {name}")
-                        else:
-                            kosdaq = fdr.StockListing('KOSDAQ')
-                            matched = kosdaq[kosdaq['Code'] == ticker]
-                            if len(matched) > 0:
-                                name = matched.iloc[0]['Name']
-                                print(f"📝 KOSDAQ 한글명 조회: {ticker} → {name}")
+                    import stock_listing
+                    listed_name = stock_listing.find_name('KR', ticker)
+                    if listed_name:
+                        name = listed_name
+                        print(f"📝 한글명 조회: {ticker} → {name}")
                 except Exception as e:
                     print(f"⚠️ 한글명 조회 실패: {e}")
             
@@ -97,12 +83,12 @@ def add_stock():
             
             # 백그라운드에서 분석 및 차트 생성
             try:
-                from volatility_analysis import analyze_daily_volatility, visualize_volatility
+                from chart_cache import get_chart
                 print(f"📊 [{ticker}] 초기 분석 및 차트 생성 시작...")
                 
-                data = analyze_daily_volatility(ticker, name, country=country)
+                data = analysis_cache.get_analysis(ticker, name, country)
                 if data:
-                    chart_path = visualize_volatility(data)
+                    chart_path = get_chart(data)
                     if chart_path:
                         print(f"✅ [{ticker}] 차트 생성 완료: {chart_path}")
                         flash(f'📈 {name} 차트가 생성되었습니다!', 'info')
@@ -215,7 +201,7 @@ def view_alerts():
 @login_required
 def view_chart(ticker):
     """차트 보기"""
-    from volatility_analysis import visualize_volatility
+    from chart_cache import get_chart
     
     username = session.get('user')
     
@@ -229,35 +215,35 @@ def view_chart(ticker):
     analysis = None
     if stock_info:
         try:
-            data = analyze_daily_volatility(ticker, stock_info['name'], country=stock_info['country'])
+            data = analysis_cache.get_analysis(ticker, stock_info['name'], stock_info['country'])
             if data:
                 analysis = data
         except Exception as e:
             print(f"분석 오류 ({ticker}): {e}")
     
+    # 현재 분석 기준 차트 (같은 입력이면 캐시 사용, 없을 때만 생성)
+    current_chart = None
+    if analysis:
+        try:
+            chart_path = get_chart(analysis)
+            current_chart = f"{ticker}/{os.path.basename(chart_path)}"
+        except Exception as e:
+            print(f"❌ [{ticker}] 차트 생성 실패: {e}")
+            import traceback
+            traceback.print_exc()
+    
     # 차트 파일 찾기
     charts_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'charts', ticker)
     chart_files = []
     
     if os.path.exists(charts_dir):
-        files = [f for f in os.listdir(charts_dir) if f.endswith('.png')]
+        files = [f for f in os.listdir(charts_dir) if f.endswith('.png') and not f.startswith('.')]
         files.sort(reverse=True)
-        chart_files = [f"{ticker}/{f}" for f in files[:5]]  # 최근 5개
+        chart_files = [f"{ticker}/{f}" for f in files if f"{ticker}/{f}" != current_chart]
     
-    # 차트가 없으면 실시간 생성
-    if not chart_files and analysis:
-        try:
-            print(f"📊 [{ticker}] 차트가 없어서 실시간 생성 중...")
-            chart_path = visualize_volatility(analysis)
-            if chart_path:
-                # 새로 생성된 차트 파일 추가
-                chart_filename = os.path.basename(chart_path)
-                chart_files = [f"{ticker}/{chart_filename}"]
-                print(f"✅ [{ticker}] 차트 생성 완료: {chart_path}")
-        except Exception as e:
-            print(f"❌ [{ticker}] 차트 생성 실패: {e}")
-            import traceback
-            traceback.print_exc()
+    if current_chart:
+        chart_files.insert(0, current_chart)
+    chart_files = chart_files[:5]  # 최근 5개
     
     return render_template('stocks/chart.html',
                           username=username,